@@ -1,80 +1,594 @@
 import streamlit as st
 import pandas as pd
-import geopandas as gpd
-import folium
-from streamlit_folium import folium_static
-from shapely import wkt
 import base64
-import plotly.express as px
-import plotly.figure_factory as ff
-import plotly.graph_objects as go
-from PIL import Image
-import requests
 import os
-
-# Define the path to your local CSV file
-comments_file = "comments.csv"
-
-# Cache the data loading and processing function
-@st.cache_data
-def load_data(file_path):
+import json
+import copy
+import functools
+import uuid
+import artifact_cache
+import data_versioning
+import warmup
+from page_loader import lazy_module, register_dataset, get_dataset, prepare_page, startup_profile
+from instrumentation import span, timed, fragment_scope, begin_rerun, end_rerun, current_rerun, payloads_enabled, recent_reruns, to_jsonl, to_prometheus
+
+# Shared datasets (shared_datasets.py) rely on Copy-on-Write, the default from pandas 3; older versions need it switched on
+if int(pd.__version__.split('.')[0]) < 3:
+    pd.set_option('mode.copy_on_write', True)
+
+# Heavy modules are imported on first use by the page that needs them
+gpd = lazy_module('geopandas')
+folium = lazy_module('folium')
+streamlit_folium = lazy_module('streamlit_folium')
+wkt = lazy_module('shapely.wkt')
+px = lazy_module('plotly.express')
+ff = lazy_module('plotly.figure_factory')
+go = lazy_module('plotly.graph_objects')
+Image = lazy_module('PIL.Image')
+shared_datasets = lazy_module('shared_datasets')
+map_viewport = lazy_module('map_viewport')
+geometry_tiers = lazy_module('geometry_tiers')
+vector_tiles = lazy_module('vector_tiles')
+borough_partitions = lazy_module('borough_partitions')
+tract_profiles = lazy_module('tract_profiles')
+column_stats = lazy_module('column_stats')
+spatial_stats = lazy_module('spatial_stats')
+food_swamp = lazy_module('food_swamp')
+coverage_forecast = lazy_module('coverage_forecast')
+
+# Define the path to your local CSV file (FOOD_DESERT_COMMENTS_FILE overrides it, e.g. for load tests)
+comments_file = os.environ.get("FOOD_DESERT_COMMENTS_FILE", "comments.csv")
+
+# On-disk cache of derived artifacts shared by every worker process and restart (FOOD_DESERT_ARTIFACT_DIR,
+# capped at FOOD_DESERT_ARTIFACT_CACHE_MB; 0 turns it off)
+@st.cache_resource
+def artifact_store():
+    max_mb = int(os.environ.get("FOOD_DESERT_ARTIFACT_CACHE_MB", "512"))
+    if max_mb <= 0:
+        return None
+    return artifact_cache.ArtifactCache(os.environ.get("FOOD_DESERT_ARTIFACT_DIR", artifact_cache.DEFAULT_DIRECTORY), max_mb << 20)
+
+# Parsed tract table of one dataset version; kept on disk so a restarted worker skips the WKT parse
+@artifact_cache.persistent(artifact_store)
+def parse_dataset(file_path, version):
+    if file_path.endswith('.parquet'):
+        # GeoParquet tract stores written by atlas_ingest.py
+        return gpd.read_parquet(file_path).to_crs(epsg=4326)
     data = pd.read_csv(file_path)
     data['geometry'] = data['geometry'].apply(wkt.loads)
     gdf = gpd.GeoDataFrame(data, geometry='geometry')
     gdf.set_crs(epsg=4326, inplace=True)  # Set CRS to WGS84
     return gdf
 
-# Load and process the data
-lila_data_path = 'LILAZones_geo.csv'
-gdf_lila = load_data(lila_data_path)
+# Parse each version of a dataset once per process; every session shares the same read-only frame
+@st.cache_resource
+def read_dataset(file_path, version):
+    return shared_datasets.freeze(parse_dataset(file_path, version))
 
-supermarket_data_path = "supermarkets.csv"
-gdf_supermarkets = load_data(supermarket_data_path)
+# Memory budget for loaded tract partitions (FOOD_DESERT_PARTITION_BUDGET_MB, and a FOOD_DESERT_MIN_FREE_MB floor of free memory)
+@st.cache_resource
+def partition_budget():
+    return borough_partitions.PartitionBudget(int(os.environ.get("FOOD_DESERT_PARTITION_BUDGET_MB", "1024")) << 20,
+                                              int(os.environ.get("FOOD_DESERT_MIN_FREE_MB", "256")) << 20)
+
+# The dataset as it is on disk now; a replaced file is loaded on the next rerun, no restart needed
+@timed("load_data")
+def load_data(file_path):
+    version = data_versioning.version(file_path)
+    gdf = read_dataset(file_path, version)
+    # Past the budget, the least recently used partitions leave the shared cache
+    for evicted in partition_budget().admit((file_path, version), gdf):
+        read_dataset.clear(*evicted)
+    return gdf
 
+# Small tables for the analysis page; st.cache_data hands each caller its own copy
+@st.cache_data
+def read_table(file_path, version):
+    return pd.read_csv(file_path)
+
+def load_table(file_path):
+    return read_table(file_path, data_versioning.version(file_path))
+
+# Summary statistics and histogram bins of every numeric column of a table, computed once per data version.
+# The result is read-only, so every session shares the same object
+@st.cache_resource(show_spinner=False)
+def read_column_stats(file_path, version):
+    return compute_column_stats(file_path, version)
+
+@artifact_cache.persistent(artifact_store, modules=['column_stats'])
+def compute_column_stats(file_path, version):
+    return column_stats.compute(column_stats.read_numeric(file_path))
+
+def load_column_stats(file_path):
+    return read_column_stats(file_path, data_versioning.version(file_path))
+
+# A coverage partition with its missing years (2016) interpolated and later years forecast, computed once per
+# data version and shared like the datasets
+@st.cache_resource(show_spinner="Forecasting tract coverage...")
+def read_coverage_series(file_path, version):
+    return shared_datasets.freeze(extend_coverage_series(file_path, version))
+
+@artifact_cache.persistent(artifact_store, modules=['coverage_forecast'])
+def extend_coverage_series(file_path, version):
+    return coverage_forecast.extend(load_data(file_path))
+
+def load_coverage_series(file_path):
+    return read_coverage_series(file_path, data_versioning.version(file_path))
+
+# Food swamp index of one borough, computed once per version of both coverage partitions and shared like the datasets.
+# Superseded versions are not evicted by name (the key has two versions), so the entry count is bounded instead
+@st.cache_resource(max_entries=16, show_spinner=False)
+def read_food_swamp(supermarket_path, supermarket_version, fast_food_path, fast_food_version):
+    return shared_datasets.freeze(compute_food_swamp(supermarket_path, supermarket_version, fast_food_path, fast_food_version))
+
+@artifact_cache.persistent(artifact_store, modules=['food_swamp', 'coverage_forecast'])
+def compute_food_swamp(supermarket_path, supermarket_version, fast_food_path, fast_food_version):
+    return food_swamp.compute(load_coverage_series(supermarket_path), load_coverage_series(fast_food_path))
+
+def load_food_swamp(supermarket_path, fast_food_path):
+    return read_food_swamp(supermarket_path, data_versioning.version(supermarket_path),
+                           fast_food_path, data_versioning.version(fast_food_path))
+
+# Drop the cached copies of a file's superseded version; frames still in use stay alive until their sessions finish
+@data_versioning.on_change
+def evict_superseded_version(file_path, old_version, new_version):
+    read_dataset.clear(file_path, old_version)
+    read_table.clear(file_path, old_version)
+    read_column_stats.clear(file_path, old_version)
+    read_coverage_series.clear(file_path, old_version)
+    partition_budget().discard((file_path, old_version))
+    # The model trains on the bundled tables: when one of them changes, every borough's predictions are stale
+    if os.path.abspath(file_path) in {os.path.abspath(path) for path in training_data_paths}:
+        read_food_desert_predictions.clear()
+    else:
+        read_food_desert_predictions.clear(file_path, old_version, training_version())
+
+# Tract datasets: the bundled Brooklyn tables, or one file per borough under FOOD_DESERT_PARTITIONS/<dataset>/ (see borough_partitions.py)
+lila_data_path = 'LILAZones_geo.csv'
+supermarket_data_path = "supermarkets.csv"
 fast_food_data_path = "Fast Food Restaurants.csv"
-gdf_fast_food = load_data(fast_food_data_path)
+tract_data_paths = {'lila': lila_data_path, 'supermarkets': supermarket_data_path, 'fast_food': fast_food_data_path}
+# Tables the food desert model trains on (features from the supermarket table, FoodDesert labels from the LILA zones)
+training_data_paths = [supermarket_data_path, lila_data_path]
+partitions_dir = os.environ.get("FOOD_DESERT_PARTITIONS", os.path.join(".cache", "partitions"))
+default_boroughs = ['047']  # Kings (Brooklyn)
+
+# Partition files of a dataset by county code; without partitions on disk the bundled CSV is the Brooklyn one
+def dataset_partitions(name):
+    return borough_partitions.partition_paths(os.path.join(partitions_dir, name)) or {'047': tract_data_paths[name]}
+
+# A dataset restricted to some boroughs; its partitions are read through load_data as the page uses them
+def borough_view(name, boroughs=None):
+    paths = dataset_partitions(name)
+    if boroughs is not None:
+        paths = {county: path for county, path in paths.items() if county in boroughs}
+    return borough_partitions.BoroughView(name, paths, load_data)
+
+# The Brooklyn view of a dataset, with its partitions read into the shared cache
+def default_view(name):
+    return borough_view(name, default_boroughs).load()
+
+# A coverage view whose partitions also carry the interpolated and forecast years
+def coverage_series_view(view):
+    if None in view.paths.values():
+        return borough_partitions.as_view(coverage_forecast.extended_for(next(view.frames())[1]), view.name)
+    return borough_partitions.BoroughView(view.name, view.paths, load_coverage_series)
+
+# Kind of each coverage year of a view (observed, imputed or forecast)
+def view_year_kinds(view):
+    for _, gdf in view.frames():
+        return coverage_forecast.year_kinds(gdf)
+    return {}
+
+# The food swamp index as a view over the boroughs both coverage views have; each partition is computed as it is read.
+# Plain frames (no files behind them) are joined right away
+def food_swamp_view(supermarket_view, fast_food_view):
+    if None in supermarket_view.paths.values() or None in fast_food_view.paths.values():
+        (_, supermarkets), (_, fast_food) = next(supermarket_view.frames()), next(fast_food_view.frames())
+        return borough_partitions.as_view(food_swamp.compute(supermarkets, fast_food), 'food_swamp')
+    fast_food_paths = {path: fast_food_view.paths[county] for county, path in supermarket_view.paths.items() if county in fast_food_view.paths}
+    return borough_partitions.BoroughView('food_swamp', {county: path for county, path in supermarket_view.paths.items() if path in fast_food_paths},
+                                          lambda path: load_food_swamp(path, fast_food_paths[path]))
+
+# Register the datasets; each is loaded the first time a page asks for it
+register_dataset('lila', functools.partial(default_view, 'lila'))
+register_dataset('supermarkets', functools.partial(default_view, 'supermarkets'))
+register_dataset('fast_food', functools.partial(default_view, 'fast_food'))
+
+# Tables behind the Data Analysis page
+socioeconomics_data_path = 'dataset_socioeconomics.csv'
+conv_stores_data_path = 'dataset_convStores.csv'
+eating_data_path = 'dataset_eating.csv'
+corr_plot_data_path = 'dataset_forCorrPlot.csv'
+
+# Modules and datasets each page needs
+PAGE_DEPENDENCIES = {
+    "Home": {"modules": ["PIL.Image"], "datasets": []},
+    "Data Analysis": {"modules": ["plotly.express", "plotly.figure_factory", "plotly.graph_objects", "column_stats"], "datasets": []},
+    "Data Visualization": {"modules": ["geopandas", "shapely.wkt", "shared_datasets", "map_viewport", "geometry_tiers", "vector_tiles", "folium", "streamlit_folium",
+                                       "food_swamp", "coverage_forecast"],
+                           "datasets": ["lila", "supermarkets", "fast_food"]},
+    "Food Policy Reports": {"modules": [], "datasets": []},
+    "Comments": {"modules": [], "datasets": []},
+    "Guide": {"modules": [], "datasets": []},
+}
+
+# Show the startup profile in the sidebar when the app is opened with ?profile=1
+def display_startup_profile():
+    if st.query_params.get("profile") != "1":
+        return
+    with st.sidebar.expander("Startup profile"):
+        profile = startup_profile()
+        if profile:
+            profile_df = pd.DataFrame(profile)
+            profile_df['ms'] = (profile_df.pop('seconds') * 1000).round(1)
+            st.dataframe(profile_df, hide_index=True)
+            st.caption(f"Total: {profile_df['ms'].sum():.0f} ms")
+        else:
+            st.caption("Nothing loaded yet.")
+        state = warmup_state()
+        if state is not None:
+            status = state.status()
+            if status['seconds'] is None:
+                st.caption("Warm-up not started.")
+            else:
+                st.caption(f"Warm-up {'ready in' if status['ready'] else 'running for'} {status['seconds']:.1f} s")
+            tasks_df = pd.DataFrame(status['tasks'])
+            tasks_df['ms'] = (tasks_df.pop('seconds') * 1000).round(1)
+            st.dataframe(tasks_df.dropna(axis=1, how='all'), hide_index=True)
+
+# Id of the browser session running this script, kept in its session state; groups that session's timed reruns
+def session_id():
+    if "instrumentation_session" not in st.session_state:
+        st.session_state["instrumentation_session"] = uuid.uuid4().hex[:12]
+    return st.session_state["instrumentation_session"]
+
+# Opt-in performance panel (?debug=1): stage timings of recent reruns, with exports
+def display_performance_panel():
+    if st.query_params.get("debug") != "1":
+        return
+    with st.sidebar.expander("Performance (debug)", expanded=True):
+        # The rerun history is shared by the whole process; this panel and its exports only show this session's
+        reruns = recent_reruns(session=session_id())
+        page_reruns = [rerun for rerun in reruns if not rerun.fragment]
+        if not page_reruns:
+            st.caption("No reruns recorded yet.")
+            return
+        last = page_reruns[-1]
+        st.caption(f"Last rerun ({last.label}): {last.seconds * 1000:.0f} ms, {last.cpu_seconds * 1000:.0f} ms CPU")
+        spans_df = pd.DataFrame([recorded.to_dict() for recorded in last.spans])
+        if not spans_df.empty:
+            spans_df['ms'] = (spans_df.pop('seconds') * 1000).round(1)
+            st.dataframe(spans_df.drop(columns=['id', 'parent']), hide_index=True)
+        st.download_button("Export spans (JSON lines)", to_jsonl(reruns), file_name="spans.jsonl", mime="application/json")
+        st.download_button("Export metrics (Prometheus)", to_prometheus(reruns), file_name="metrics.prom", mime="text/plain")
+
+# Size of folium layers' GeoJSON, measured only when payload tracking is on (outside the stage's span)
+def geojson_payload_bytes(*layers):
+    if not payloads_enabled():
+        return None
+    return sum(len(json.dumps(layer.data)) for layer in layers)
+
+# What the maps report back: the clicked feature (with its GEOID id) and the clicked point
+CLICK_OBJECTS = ["last_active_drawing", "last_object_clicked"]
+
+# The map built for `build_key` in this session, and whether it was just built. A rerun with the same key
+# (a click on the map) reuses it instead of rebuilding the layer. st_folium renames the elements of the map it
+# renders, so it always gets a copy of the stored map; the element is then identical on every rerun, and
+# Streamlit sends it as a reference to the copy the browser already has
+def session_map(name, build_key, build):
+    built = st.session_state.get(name)
+    fresh = built is None or built[0] != build_key
+    if fresh:
+        built = st.session_state[name] = (build_key, build())
+    return copy.deepcopy(built[1]), fresh
+
+# Render a folium map into the page, timing the HTML emission; returns the click state st_folium reports back
+def show_map(m, key, fresh=True, width=700, height=500):
+    with span("st_folium") as recorded:
+        map_state = streamlit_folium.st_folium(m, key=key, returned_objects=CLICK_OBJECTS, width=width, height=height)
+    # Measured after the span so the extra render is not counted in its time; a reused map ships nothing new
+    if payloads_enabled():
+        recorded.set(payload_bytes=len(m.get_root().render()) if fresh else 0, reused=not fresh)
+    return map_state
+
+# Tabs that track which one is open, so hidden tabs can be skipped (older Streamlit versions build every tab)
+def visualization_tabs(labels, key="visualization_tab"):
+    try:
+        return st.tabs(labels, key=key, on_change="rerun")
+    except TypeError:
+        return st.tabs(labels)
+
+def tab_is_open(tab):
+    return getattr(tab, 'open', None) is not False
+
+# Sidebar borough picker, shown once partitions cover more than Brooklyn; returns county codes
+def borough_selector():
+    available = sorted({county for name in tract_data_paths for county in dataset_partitions(name)})
+    if len(available) < 2:
+        return default_boroughs
+    selected = st.sidebar.multiselect("Boroughs", available, default=[county for county in default_boroughs if county in available],
+                                      format_func=borough_partitions.borough_name, key="boroughs")
+    return sorted(selected) or default_boroughs
+
+# CSV of every partition in a view, written one partition at a time
+def view_csv(view):
+    return ''.join(gdf.to_csv(index=False, header=position == 0) for position, (_, gdf) in enumerate(view.frames()))
+
+# Tab body that reruns on its own when its widgets change (st.fragment); such reruns are timed as their own rerun
+def map_tab(name):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with fragment_scope(name, measure_payloads=st.query_params.get("debug") == "1", session=session_id()):
+                return func(*args, **kwargs)
+        return st.fragment(wrapper)
+    return decorator
+
+# Identity of the data behind a view: each partition's file version (frames not read from a file count by object)
+def view_version(view):
+    if None in view.paths.values():
+        return tuple((county, id(gdf)) for county, gdf in view.frames())
+    return tuple((county, data_versioning.version(path)) for county, path in view.paths.items())
+
+# Local vector tile server, started once per process when FOOD_DESERT_TILE_PORT is set (0 picks a free port).
+# FOOD_DESERT_TILE_HOST is the interface it binds to, FOOD_DESERT_TILE_URL the base URL browsers fetch tiles from
+@st.cache_resource
+def tile_server():
+    port = os.environ.get("FOOD_DESERT_TILE_PORT")
+    if not port:
+        return None
+    return vector_tiles.start_server(os.environ.get("FOOD_DESERT_TILE_HOST", "127.0.0.1"), int(port),
+                                     public_url=os.environ.get("FOOD_DESERT_TILE_URL"))
+
+# (layer name, URL template) of a dataset on the tile server, or None when maps inline their geometry
+def tile_source(name, gdf, path):
+    server = tile_server()
+    if server is None:
+        return None
+    layer = server.layers.get(name)
+    if layer is None or layer.gdf is not gdf:
+        version = data_versioning.version(path)
+        # Coverage layers are the forecast-extended frames, so their tiles also change with the forecasting code
+        if 'coverage_years' in gdf.attrs:
+            version = f"{version}-{artifact_cache.module_version('coverage_forecast')}"
+        server.add_layer(vector_tiles.TileLayer(name, gdf, version=version))
+    return name, server.tile_url(name)
+
+# Tile sources for each borough partition of a view, or None when maps inline their geometry
+def tile_sources(view):
+    # Tiles are cached by file version, so frames that did not come from a file are always inlined
+    if tile_server() is None or None in view.paths.values():
+        return None
+    return [tile_source(f"{view.name}_{county}", gdf, view.paths[county]) for county, gdf in view.frames()]
+
+COVERAGE_STYLE = {'fill': True, 'color': 'black', 'weight': 1, 'opacity': 0.2, 'fillOpacity': 0.7}
+
+# Static maps never report their zoom, so they carry the detail tier that stays accurate two levels past the default zoom
+STATIC_MAP_DETAIL_ZOOM = 12
+
+# One TopoJSON layer (colors and tooltips) for some tracts of a dataset, at the detail tier for `zoom`.
+# Each feature's id is its GEOID, which a click on the map reports back
+def coverage_layer(gdf, tracts, year, coverage_ratio_col, rank_col, legend_name, colormap, zoom, county):
+    tiers = geometry_tiers.tiers_for(gdf)
+    fields = ['TRACTCE', coverage_ratio_col, rank_col]
+    topology = tiers.topojson(zoom, geometry_tiers.row_positions(gdf, tracts), geometry_tiers.feature_properties(tracts, fields),
+                              ids=tract_profiles.tract_geoids(tracts, county).tolist())
+    return folium.TopoJson(
+        topology,
+        f'objects.{geometry_tiers.DEFAULT_OBJECT_NAME}',
+        name='choropleth',
+        style_function=lambda feature: {**COVERAGE_STYLE, 'fillColor': colormap(feature['properties'][coverage_ratio_col])},
+        tooltip=folium.GeoJsonTooltip(
+            fields=fields,
+            aliases=['Census Tract Area', f'{year} {legend_name}', 'Rank'],
+            localize=True
+        )
+    )
+
+# The same layer drawn from the tile server; the rank filter and colors are applied in the browser
+def coverage_tile_layer(tiles, year, coverage_ratio_col, rank_col, selected_rank, legend_name, colormap):
+    layer_name, url = tiles
+    filters = {rank_col: [selected_rank]} if selected_rank and selected_rank != 'All' else None
+    return vector_tiles.folium_layer(
+        url, layer_name, vector_tiles.style_js(COVERAGE_STYLE, coverage_ratio_col, colormap, filters),
+        ['TRACTCE', coverage_ratio_col, rank_col], ['Census Tract Area', f'{year} {legend_name}', 'Rank'],
+        name='choropleth'
+    )
+
+# Mask of the tracts with the selected rank, or None for 'All'
+def rank_filter(rank_col, selected_rank):
+    if not selected_rank or selected_rank == 'All':
+        return None
+    return lambda gdf: gdf[rank_col] == selected_rank
+
+# Getis-Ord Gi* hot spots and global Moran's I of one partition's column (coverage ratios are tested as outlets
+# per resident), computed once per file version
+@st.cache_data(max_entries=64, show_spinner="Testing tracts for hot and cold spots...")
+@artifact_cache.persistent(artifact_store, modules=['spatial_stats', 'coverage_forecast'])
+def read_spatial_statistics(file_path, version, column):
+    gdf = load_coverage_series(file_path)
+    return spatial_stats.hot_spots(gdf, column), spatial_stats.moran(gdf, column)
+
+# (hot spots, Moran's I) of a column in each borough partition of a view, by county. Neighbours are looked up
+# within a partition, so tracts on a borough line only see the tracts of their own borough
+@timed("spatial_statistics")
+def spatial_statistics(view, column):
+    statistics = {}
+    for county, gdf in view.frames():
+        path = view.paths[county]
+        if path is None:
+            statistics[county] = spatial_stats.hot_spots(gdf, column), spatial_stats.moran(gdf, column)
+        else:
+            statistics[county] = read_spatial_statistics(path, data_versioning.version(path), column)
+    return statistics
+
+HOT_SPOT_COLORS = {
+    'Hot spot (99%)': '#b2182b', 'Hot spot (95%)': '#ef8a62', 'Hot spot (90%)': '#fddbc7',
+    'Cold spot (90%)': '#d1e5f0', 'Cold spot (95%)': '#67a9cf', 'Cold spot (99%)': '#2166ac',
+}
+
+# TopoJSON layer of a partition's significant hot and cold spot tracts, drawn over the choropleth
+def hot_spot_layer(gdf, spots, year, legend_name, zoom, county):
+    tracts = gdf[(spots['hot_spot'] != spatial_stats.NOT_SIGNIFICANT).to_numpy()]
+    if tracts.empty:
+        return None
+    fields = ['TRACTCE', 'hot_spot', 'gi_z', 'p_value']
+    properties = spots.loc[tracts.index].round({'gi_z': 2, 'p_value': 3}).assign(TRACTCE=tracts['TRACTCE'])
+    topology = geometry_tiers.tiers_for(gdf).topojson(zoom, geometry_tiers.row_positions(gdf, tracts),
+                                                      geometry_tiers.feature_properties(properties, fields),
+                                                      ids=tract_profiles.tract_geoids(tracts, county).tolist())
+    return folium.TopoJson(
+        topology,
+        f'objects.{geometry_tiers.DEFAULT_OBJECT_NAME}',
+        name='hot spots',
+        style_function=lambda feature: {**COVERAGE_STYLE, 'opacity': 0.6, 'fillOpacity': 0.8,
+                                        'fillColor': HOT_SPOT_COLORS[feature['properties']['hot_spot']]},
+        tooltip=folium.GeoJsonTooltip(
+            fields=fields,
+            aliases=['Census Tract Area', f'{year} {legend_name}', 'Gi* z-score', 'Pseudo p-value'],
+            localize=True
+        )
+    )
 
-# Function to create a folium map for a given year and optionally filter by rank
-def create_map(gdf, year, coverage_ratio_col, rank_col, selected_rank=None, legend_name="Coverage Ratio"):
+# Add the hot spot layers of a view's partitions (`hot_spots` maps county -> spots) to a map
+def add_hot_spot_layers(m, view, hot_spots, year, legend_name, zoom):
+    layers = folium.FeatureGroup(name='Hot spots (Gi*)')
+    with span("hot_spot_layer") as recorded:
+        drawn = []
+        for county, gdf in view.frames():
+            layer = hot_spot_layer(gdf, hot_spots[county], year, legend_name, zoom, county)
+            if layer is not None:
+                drawn.append(layer.add_to(layers))
+    recorded.set(payload_bytes=geojson_payload_bytes(*drawn))
+    layers.add_to(m)
+
+# Function to create a folium map for a given year and optionally filter by rank.
+# `gdf` is a tract GeoDataFrame or a BoroughView; a view's partitions are drawn one layer each, never concatenated.
+# `hot_spots` (county -> spatial_stats.hot_spots frame) adds the significant hot and cold spots over the choropleth
+@timed("create_map")
+def create_map(gdf, year, coverage_ratio_col, rank_col, selected_rank=None, legend_name="Coverage Ratio", tiles=None, hot_spots=None):
+    view = borough_partitions.as_view(gdf)
     # Create a base map
     m = folium.Map(location=[40.7128, -74.0060], zoom_start=10)  # Centered around New York
     
     # Check if columns exist
-    if coverage_ratio_col not in gdf.columns or rank_col not in gdf.columns:
+    if coverage_ratio_col not in view.columns or rank_col not in view.columns:
         st.error(f"Column '{coverage_ratio_col}' or '{rank_col}' does not exist in the data.")
         return m
     
-    # Filter GeoDataFrame if a specific rank is selected
-    gdf_filtered = gdf.copy()
-    if selected_rank and selected_rank != 'All':
-        gdf_filtered = gdf_filtered[gdf_filtered[rank_col] == selected_rank]
-    
-    folium.Choropleth(
-        geo_data=gdf_filtered,
-        name='choropleth',
-        data=gdf_filtered,
-        columns=['TRACTCE', coverage_ratio_col],
-        key_on='feature.properties.TRACTCE',
-        fill_color='YlOrRd',
-        fill_opacity=0.7,
-        line_opacity=0.2,
-        legend_name=legend_name
-    ).add_to(m)
+    # Ratios of the tracts with the selected rank (the shared frames are read-only, so no copy is needed)
+    keep = rank_filter(rank_col, selected_rank)
+    with span("create_map.filter") as recorded:
+        ratios = view.values(coverage_ratio_col, keep)
+        recorded.set(rows=len(ratios))
     
-    # Add tooltips
-    folium.GeoJson(
-        gdf_filtered,
-        style_function=lambda x: {'fillColor': '#ffffff00', 'color': '#00000000', 'weight': 0},
-        tooltip=folium.GeoJsonTooltip(
-            fields=['TRACTCE', coverage_ratio_col, rank_col],
-            aliases=['Census Tract Area', f'{year} {legend_name}', 'Rank'],
-            localize=True
-        )
-    ).add_to(m)
+    # Same bins and colors as folium.Choropleth's defaults
+    colormap = map_viewport.step_colormap(ratios, 'YlOrRd', legend_name)
+    colormap.add_to(m)
+    layers = folium.FeatureGroup(name='choropleth').add_to(m)
+
+    # With a tile server the browser fetches only the tiles in view
+    if tiles is not None:
+        with span("create_map.vector_tiles"):
+            for source in tiles:
+                coverage_tile_layer(source, year, coverage_ratio_col, rank_col, selected_rank, legend_name, colormap).add_to(layers)
+        # Only the significant tracts are inlined, so the hot spot layer stays small without tiles
+        if hot_spots is not None:
+            add_hot_spot_layers(m, view, hot_spots, year, legend_name, STATIC_MAP_DETAIL_ZOOM)
+        folium.LayerControl().add_to(m)
+        return m
+
+    with span("create_map.topojson") as recorded:
+        tract_layers = []
+        for county, partition in view.frames():
+            tracts = partition[keep(partition)] if keep else partition
+            if not tracts.empty:
+                tract_layers.append(coverage_layer(partition, tracts, year, coverage_ratio_col, rank_col, legend_name, colormap,
+                                                   STATIC_MAP_DETAIL_ZOOM, county).add_to(layers))
+    recorded.set(payload_bytes=geojson_payload_bytes(*tract_layers))
+    if hot_spots is not None:
+        add_hot_spot_layers(m, view, hot_spots, year, legend_name, STATIC_MAP_DETAIL_ZOOM)
     
     folium.LayerControl().add_to(m)
     return m
 
+# Interactive variant of create_map: a base map carrying the legend (and any hot spots), plus one layer with only the tracts in clip_box
+@timed("create_viewport_map")
+def create_viewport_map(gdf, year, coverage_ratio_col, rank_col, selected_rank=None, legend_name="Coverage Ratio", clip_box=None, zoom=10,
+                        hot_spots=None):
+    view = borough_partitions.as_view(gdf)
+    m = folium.Map(location=[40.7128, -74.0060], zoom_start=10)  # Centered around New York
+    if coverage_ratio_col not in view.columns or rank_col not in view.columns:
+        st.error(f"Column '{coverage_ratio_col}' or '{rank_col}' does not exist in the data.")
+        return m, None
+
+    keep = rank_filter(rank_col, selected_rank)
+    # Bins come from every tract, so colors and legend stay put while panning
+    colormap = map_viewport.step_colormap(view.values(coverage_ratio_col, keep), 'YlOrRd', legend_name)
+    colormap.add_to(m)
+    # The significant tracts are few, so they all ride on the base map and panning never resends them
+    if hot_spots is not None:
+        add_hot_spot_layers(m, view, hot_spots, year, legend_name, STATIC_MAP_DETAIL_ZOOM)
+
+    # Each borough partition is clipped on its own spatial index
+    with span("create_viewport_map.clip") as recorded:
+        clipped, total_rows = [], 0
+        for county, partition in view.frames():
+            filtered = partition[keep(partition)] if keep else partition
+            visible = map_viewport.tracts_in_box(filtered, clip_box)
+            total_rows += len(filtered)
+            if not visible.empty:
+                clipped.append((county, partition, visible))
+        recorded.set(rows=sum(len(visible) for _, _, visible in clipped), total_rows=total_rows)
+
+    # Geometry detail follows the zoom st_folium reports
+    layer = folium.FeatureGroup(name='choropleth')
+    if clipped:
+        with span("create_viewport_map.topojson") as recorded:
+            tract_layers = [coverage_layer(partition, visible, year, coverage_ratio_col, rank_col, legend_name, colormap, zoom,
+                                           county).add_to(layer)
+                            for county, partition, visible in clipped]
+        recorded.set(payload_bytes=geojson_payload_bytes(*tract_layers), zoom=zoom)
+    return m, layer
+
+# Render an interactive map whose tract layer follows the viewport st_folium reports back; returns its click state.
+# `build_key` names what the map shows besides the viewport (data, year, rank)
+def show_viewport_map(key, build_key, build_map, width=700, height=500):
+    clip_state = f"{key}_clip_box"
+    map_state = st.session_state.get(key) or {}
+    clip_box = map_viewport.next_clip_box(st.session_state.get(clip_state), map_state)
+    st.session_state[clip_state] = clip_box
+    zoom = map_state.get('zoom') or 10
+    # A click leaves the viewport as it was, so the same map and layer are sent again
+    (m, layer), _ = session_map(f"{key}_built", (build_key, clip_box, zoom), lambda: build_map(clip_box, zoom))
+    # The base map only changes with the year or rank; pans and zooms just swap the tract layer
+    with span("st_folium"):
+        return streamlit_folium.st_folium(m, key=key, feature_group_to_add=layer, returned_objects=["bounds", "zoom"] + CLICK_OBJECTS,
+                                          width=width, height=height)
+
+# Years that have a `{year}_{suffix}` column
+def coverage_years(gdf, suffix):
+    return sorted(int(column[:4]) for column in gdf.columns if column.endswith(f'_{suffix}'))
+
+# The forecast interval of a tract's coverage as an HTML line, or nothing for years with data
+def forecast_interval(row, year, coverage_ratio_col):
+    if f'{coverage_ratio_col} low' not in row.index:
+        return ''
+    low, high = row[f'{coverage_ratio_col} low'], row[f'{coverage_ratio_col} high']
+    high = "no outlet" if pd.isna(high) else f"{high:,.1f}"
+    return (f'<p><span style="color: #8A2BE2;">{coverage_forecast.INTERVAL:.0%} forecast interval: </span>'
+            f'{low:,.1f} to {high}</p>')
+
+# What a slider year without data shows: interpolated between its neighbours, or forecast from each tract's series
+def display_year_note(kinds, year):
+    observed = [known for known, kind in kinds.items() if kind == coverage_forecast.OBSERVED]
+    if kinds.get(year) == coverage_forecast.IMPUTED:
+        st.info(f"{year} is missing from the data: each tract's coverage is interpolated between the years around it.")
+    elif kinds.get(year) == coverage_forecast.FORECAST:
+        st.info(f"{year} is a forecast from each tract's {min(observed)}-{max(observed)} series (exponential smoothing), "
+                f"and its ranks follow the forecast. Select a rank to see the {coverage_forecast.INTERVAL:.0%} forecast interval.")
+
 # Function to display tooltip info in a styled format
 def display_tooltip_info(gdf_filtered, year, coverage_ratio_col):
     if not gdf_filtered.empty:
@@ -85,18 +599,201 @@ def display_tooltip_info(gdf_filtered, year, coverage_ratio_col):
                     <h4 style="color: #2E7D32;">Census Tract Area: {row['TRACTCE']}</h4>
                     <p><span style="color: #D32F2F;">The {year} Coverage ratio: </span>{row[coverage_ratio_col]}</p>
                     <p><span style="color: #1976D2;">Rank: </span>{row[f'{year}_rank']}</p>
+                    {forecast_interval(row, year, coverage_ratio_col)}
                 </div>
                 """,
                 unsafe_allow_html=True
             )
 
+# Predicted food desert probability of each tract in one supermarket partition, scored once per file version,
+# training data version (`training_version`) and model revision
+@st.cache_data(show_spinner="Scoring tracts with the food desert model...")
+@artifact_cache.persistent(artifact_store, modules=['tract_profiles', 'feature_pipeline', 'food_desert_models'])
+def read_food_desert_predictions(file_path, version, training_version):
+    return tract_profiles.food_desert_probabilities(load_data(file_path))
+
+# Combined version of the model's training tables
+def training_version():
+    return data_versioning.versions(*training_data_paths)
+
+def food_desert_predictions(view, county):
+    path = view.paths.get(county)
+    if path is None:
+        return None
+    return read_food_desert_predictions(path, data_versioning.version(path), training_version())
+
+# Coverage ratio and rank columns of a view's latest year, or none when it has no coverage years
+def latest_coverage_columns(view, suffix):
+    years = coverage_years(view, suffix)
+    return [f'{years[-1]}_{suffix}', f'{years[-1]}_rank'] if years else []
+
+LILA_PROFILE_FIELDS = ['Status', 'NTA Name', 'Food Index', ' Median Family Income ', 'SNAP Benefits %',
+                       'Education below high school diploma (Poverty Rate)']
+
+# Index joining the page's datasets on a normalized tract key, for combined tract profiles
+@timed("tract_index")
+def tract_index(datasets):
+    fields = {
+        'lila': LILA_PROFILE_FIELDS,
+        'supermarkets': latest_coverage_columns(datasets['supermarkets'], 'supermarket coverage ratio'),
+        'fast_food': latest_coverage_columns(datasets['fast_food'], 'Fast Food Coverage Ratio'),
+    }
+    return tract_profiles.TractIndex(datasets, fields, functools.partial(food_desert_predictions, datasets['supermarkets']))
+
+# One tract's LILA status, coverage ranks and predicted food desert probability in a single card
+def display_tract_profile(profile):
+    lila, supermarkets, fast_food = (profile['datasets'].get(name) for name in ['lila', 'supermarkets', 'fast_food'])
+    lines = []
+    if lila is not None:
+        lines.append(f"<p><strong style=\"color: #FF6347;\">{lila['Status']}</strong> ({lila['NTA Name']}): Food Index {lila['Food Index']}, "
+                     f"Median Family Income {lila[' Median Family Income '].strip()}, SNAP Benefits {lila['SNAP Benefits %']}, "
+                     f"Poverty Rate {lila['Education below high school diploma (Poverty Rate)']}</p>")
+    else:
+        lines.append("<p><strong style=\"color: #2E8B57;\">Not a LILA zone</strong></p>")
+    for label, coverage in [("Supermarket", supermarkets), ("Fast food", fast_food)]:
+        if coverage:
+            (ratio_col, ratio), (_, rank) = coverage.items()
+            lines.append(f"<p><span style=\"color: #1976D2;\">{label} coverage ({ratio_col[:4]}): </span>{ratio:,.1f}, rank {rank}</p>")
+    if profile.get('predicted') is not None:
+        lines.append(f"<p><span style=\"color: #8A2BE2;\">Predicted food desert probability: </span>{profile['predicted']:.0%}</p>")
+    st.markdown(f"""
+        <div style="border: 2px solid #ddd; border-radius: 10px; padding: 10px 20px; margin: 10px 0; background-color: #f9f9f9;">
+            <h4 style="color: #2E7D32;">Census Tract {int(profile['tract'])} ({borough_partitions.borough_name(profile['county'])})</h4>
+            {''.join(lines)}
+        </div>
+    """, unsafe_allow_html=True)
+
+# GEOID of the tract clicked on a map: the clicked feature's id, else the tract of `view` under the clicked point
+# (vector tile features have no id). `predicate` limits the lookup to the tracts the map draws
+def clicked_tract(map_state, view, predicate=None):
+    feature = (map_state or {}).get('last_active_drawing') or {}
+    if feature.get('id'):
+        return str(feature['id'])
+    point = (map_state or {}).get('last_object_clicked')
+    if not point:
+        return None
+    for county, gdf in view.frames():
+        geoid = tract_profiles.tract_at(gdf, point['lng'], point['lat'], county, predicate(gdf) if predicate else None)
+        if geoid is not None:
+            return geoid
+    return None
+
+# Detail panel for the tract clicked on a map, read from the tract index; the map itself is left as it is
+def display_clicked_tract(index, geoid):
+    if index is None:
+        return
+    if geoid is None or not index.has(geoid):
+        st.caption("Click a tract on the map for its combined profile.")
+        return
+    display_tract_profile(index.profile(geoid))
+
+# Per borough: Moran's I and the number of hot and cold spot tracts; then the hot spot layer's legend and how to read it
+def display_spatial_summary(statistics, reading):
+    for county, (spots, moran) in statistics.items():
+        labels = spots['hot_spot']
+        hot, cold = labels.str.startswith('Hot').sum(), labels.str.startswith('Cold').sum()
+        if moran is None:
+            clustering = "too few tracts with values to test for clustering"
+        else:
+            clustering = (f"Moran's I = {moran['I']:.3f} (expected {moran['expected']:.3f} without clustering; "
+                          f"one-sided pseudo p-value {moran['p_value']:.3f} from {moran['permutations']} permutations)")
+        st.markdown(f"**{borough_partitions.borough_name(county)}:** {clustering}. {hot} hot spot and {cold} cold spot tracts.")
+    swatches = ''.join(f'<span style="background-color: {color}; padding: 2px 8px; margin-right: 4px; border-radius: 3px;">{label}</span>'
+                       for label, color in HOT_SPOT_COLORS.items())
+    st.markdown(f"<div style=\"font-size: 0.85em;\">{swatches}</div>", unsafe_allow_html=True)
+    st.caption(reading)
+
+# Combined profiles of the tracts in (county, frame) pairs, e.g. a view's selected rows
+def display_tract_profiles(index, selected):
+    for county, gdf in selected:
+        for geoid in tract_profiles.tract_geoids(gdf, county):
+            display_tract_profile(index.profile(geoid))
+
+# Function to append a comment to the comments CSV file
+def save_comment(user_comment, path=comments_file):
+    # Load existing comments or create a new DataFrame if it doesn't exist
+    if os.path.exists(path):
+        comments_df = pd.read_csv(path)
+    else:
+        comments_df = pd.DataFrame(columns=["Comment"])
+
+    # Add the new comment to the DataFrame
+    new_comment = pd.DataFrame({"Comment": [user_comment]})
+    comments_df = pd.concat([comments_df, new_comment], ignore_index=True)
+
+    # Save the updated DataFrame back to the CSV file
+    comments_df.to_csv(path, index=False)
+
+# Function to read the most recent comments (the last 5 by default)
+def load_recent_comments(path=comments_file, count=5):
+    if not os.path.exists(path):
+        return []
+    comments_df = pd.read_csv(path)
+    return comments_df["Comment"].tail(count).tolist()
+
+# Size of a Plotly figure's JSON, measured only when payload tracking is on
+def figure_payload_bytes(fig):
+    if not payloads_enabled():
+        return None
+    return len(fig.to_json())
+
+# Correlation matrix of some columns of a table, cached per data version
+@st.cache_data(max_entries=64)
+def correlation_matrix(file_path, version, columns):
+    return read_table(file_path, version)[list(columns)].corr()
+
+# Function to build the annotated correlation heatmap for the selected columns
+def create_correlation_heatmap(corr_df, corr=None):
+    with span("analysis.correlation"):
+        if corr is None:
+            corr = corr_df.corr()
+    with span("analysis.correlation_heatmap") as recorded:
+        fig = ff.create_annotated_heatmap(
+            z=corr.values,
+            x=list(corr.columns),
+            y=list(corr.index),
+            annotation_text=corr.round(2).values,
+            colorscale='Viridis'
+        )
+    recorded.set(payload_bytes=figure_payload_bytes(fig))
+    return fig
+
+# Any numeric column of the tract table: its summary and histogram, looked up in the precomputed statistics.
+# A fragment, so switching columns reruns only this section
+@st.fragment
+def tract_column_explorer(file_path=supermarket_data_path):
+    with fragment_scope("column_explorer", measure_payloads=st.query_params.get("debug") == "1", session=session_id()):
+        stats = load_column_stats(file_path)
+        column = st.selectbox("Select a column", stats.columns, key="column_explorer_column")
+        st.dataframe(stats.describe(column).to_frame().T)
+
+        # The bins are drawn in the browser; only their edges and counts are sent
+        edges, counts = stats.histogram(column)
+        with span("analysis.column_histogram") as recorded:
+            fig = go.Figure(go.Bar(
+                x=(edges[:-1] + edges[1:]) / 2,
+                y=counts,
+                width=edges[1:] - edges[:-1],
+                customdata=list(zip(edges[:-1], edges[1:])),
+                hovertemplate='%{customdata[0]:,.4g} to %{customdata[1]:,.4g}: %{y} tracts<extra></extra>',
+                marker_line_color='black',
+                marker_line_width=1
+            ))
+            fig.update_layout(title=f'Histogram of {column}', xaxis_title=column, yaxis_title='Frequency', bargap=0)
+        recorded.set(payload_bytes=figure_payload_bytes(fig))
+        st.plotly_chart(fig)
+
+        with st.expander("Summary of every column"):
+            st.dataframe(stats.summary)
+
 # Function to handle data analysis page
 def run_data_analysis():
     # Load the datasets
-    socioeconomics_df = pd.read_csv('dataset_socioeconomics.csv')
-    convStores_df = pd.read_csv('dataset_convStores.csv')
-    eating_df = pd.read_csv('dataset_eating.csv')
-    corrPlot_df = pd.read_csv('dataset_forCorrPlot.csv')
+    with span("analysis.read_csv"):
+        socioeconomics_df = load_table(socioeconomics_data_path)
+        convStores_df = load_table(conv_stores_data_path)
+        eating_df = load_table(eating_data_path)
+        corrPlot_df = load_table(corr_plot_data_path)
 
     st.title("Interactive Data Analysis Page")
 
@@ -114,9 +811,11 @@ def run_data_analysis():
     filtered_income_df = socioeconomics_df[selected_races]
 
     # Create the plot
-    fig1 = px.box(filtered_income_df, 
-                 labels={'value': 'Family Income', 'variable': 'Race'},
-                 title='Family Income vs Race (2016-2020)')
+    with span("analysis.income_box") as recorded:
+        fig1 = px.box(filtered_income_df, 
+                     labels={'value': 'Family Income', 'variable': 'Race'},
+                     title='Family Income vs Race (2016-2020)')
+    recorded.set(payload_bytes=figure_payload_bytes(fig1))
 
     # Display the plot in Streamlit
     st.plotly_chart(fig1)
@@ -145,9 +844,11 @@ def run_data_analysis():
     filtered_convStores_df = convStores_df[(convStores_df['year'] >= selected_years_conv[0]) & (convStores_df['year'] <= selected_years_conv[1])]
 
     # Create the plot
-    fig2 = px.line(filtered_convStores_df, x='year', y=['Alcohol', 'Cigarettes', 'Food stores'],
-                  labels={'value': 'Employment Count', 'year': 'Year'},
-                  title='Employment in Convenience Stores Over Time')
+    with span("analysis.conv_stores_line") as recorded:
+        fig2 = px.line(filtered_convStores_df, x='year', y=['Alcohol', 'Cigarettes', 'Food stores'],
+                      labels={'value': 'Employment Count', 'year': 'Year'},
+                      title='Employment in Convenience Stores Over Time')
+    recorded.set(payload_bytes=figure_payload_bytes(fig2))
 
     # Display the plot in Streamlit
     st.plotly_chart(fig2)
@@ -177,9 +878,11 @@ def run_data_analysis():
     filtered_eating_df = eating_df[(eating_df['year'] >= selected_years_eating[0]) & (eating_df['year'] <= selected_years_eating[1])]
 
     # Create the plot
-    fig3 = px.line(filtered_eating_df, x='year', y=['Restaurants', 'Fast-foods', 'Snack places', 'Drinking places'],
-                  labels={'value': 'Employment Count', 'year': 'Year'},
-                  title='Employment in Eating Establishments Over Time')
+    with span("analysis.eating_line") as recorded:
+        fig3 = px.line(filtered_eating_df, x='year', y=['Restaurants', 'Fast-foods', 'Snack places', 'Drinking places'],
+                      labels={'value': 'Employment Count', 'year': 'Year'},
+                      title='Employment in Eating Establishments Over Time')
+    recorded.set(payload_bytes=figure_payload_bytes(fig3))
 
     # Display the plot in Streamlit
     st.plotly_chart(fig3)
@@ -201,14 +904,16 @@ def run_data_analysis():
     r3 = [x + bar_width for x in r2]
 
     # Create the plot
-    fig4 = go.Figure(data=[
-        go.Bar(name='Alcohol', x=years, y=convStores_df['Alcohol'], marker_color='blue', width=bar_width),
-        go.Bar(name='Food stores', x=years, y=convStores_df['Food stores'], marker_color='red', width=bar_width),
-        go.Bar(name='Cigarettes', x=years, y=convStores_df['Cigarettes'], marker_color='green', width=bar_width)
-    ])
+    with span("analysis.conv_stores_bar") as recorded:
+        fig4 = go.Figure(data=[
+            go.Bar(name='Alcohol', x=years, y=convStores_df['Alcohol'], marker_color='blue', width=bar_width),
+            go.Bar(name='Food stores', x=years, y=convStores_df['Food stores'], marker_color='red', width=bar_width),
+            go.Bar(name='Cigarettes', x=years, y=convStores_df['Cigarettes'], marker_color='green', width=bar_width)
+        ])
 
-    # Update layout
-    fig4.update_layout(barmode='group', xaxis_tickangle=-45, title='Mean Count by Year for Different Categories', xaxis_title='Year', yaxis_title='Mean Count')
+        # Update layout
+        fig4.update_layout(barmode='group', xaxis_tickangle=-45, title='Mean Count by Year for Different Categories', xaxis_title='Year', yaxis_title='Mean Count')
+    recorded.set(payload_bytes=figure_payload_bytes(fig4))
 
     # Display the plot in Streamlit
     st.plotly_chart(fig4)
@@ -232,15 +937,17 @@ def run_data_analysis():
     r4 = [x + bar_width for x in r3]
 
     # Create the plot
-    fig5 = go.Figure(data=[
-        go.Bar(name='Restaurants', x=years, y=eating_df['Restaurants'], marker_color='green', width=bar_width),
-        go.Bar(name='Fast-foods', x=years, y=eating_df['Fast-foods'], marker_color='red', width=bar_width),
-        go.Bar(name='Snack places', x=years, y=eating_df['Snack places'], marker_color='purple', width=bar_width),
-        go.Bar(name='Drinking places', x=years, y=eating_df['Drinking places'], marker_color='orange', width=bar_width)
-    ])
-
-    # Update layout
-    fig5.update_layout(barmode='group', xaxis_tickangle=-45, title='Mean Count by Year for Different Categories', xaxis_title='Year', yaxis_title='Mean Count')
+    with span("analysis.eating_bar") as recorded:
+        fig5 = go.Figure(data=[
+            go.Bar(name='Restaurants', x=years, y=eating_df['Restaurants'], marker_color='green', width=bar_width),
+            go.Bar(name='Fast-foods', x=years, y=eating_df['Fast-foods'], marker_color='red', width=bar_width),
+            go.Bar(name='Snack places', x=years, y=eating_df['Snack places'], marker_color='purple', width=bar_width),
+            go.Bar(name='Drinking places', x=years, y=eating_df['Drinking places'], marker_color='orange', width=bar_width)
+        ])
+
+        # Update layout
+        fig5.update_layout(barmode='group', xaxis_tickangle=-45, title='Mean Count by Year for Different Categories', xaxis_title='Year', yaxis_title='Mean Count')
+    recorded.set(payload_bytes=figure_payload_bytes(fig5))
 
     # Display the plot in Streamlit
     st.plotly_chart(fig5)
@@ -262,14 +969,8 @@ def run_data_analysis():
     filtered_corr_df = corrPlot_df[selected_columns]
 
     # Create the correlation heatmap
-    corr = filtered_corr_df.corr()
-    fig6 = ff.create_annotated_heatmap(
-        z=corr.values,
-        x=list(corr.columns),
-        y=list(corr.index),
-        annotation_text=corr.round(2).values,
-        colorscale='Viridis'
-    )
+    corr = correlation_matrix(corr_plot_data_path, data_versioning.version(corr_plot_data_path), tuple(selected_columns))
+    fig6 = create_correlation_heatmap(filtered_corr_df, corr)
 
     # Display the plot in Streamlit
     st.plotly_chart(fig6)
@@ -280,6 +981,16 @@ def run_data_analysis():
     This correlation heatmap visualizes the relationships between different variables in the dataset. Each cell in the heatmap shows the correlation coefficient between two variables, with colors representing the strength and direction of the correlation. Positive correlations are shown in one color gradient, while negative correlations are in another. This plot is useful for identifying which variables are strongly related, aiding in data analysis and decision-making.
     """)
 
+    ### 7. Tract Column Explorer
+    st.header("Tract Column Explorer")
+    tract_column_explorer()
+
+    # Explanation
+    st.markdown("""
+    #### Explanation:
+    Pick any numeric column of the Brooklyn census tract table to see its summary statistics (count, missing values, mean, standard deviation, minimum, quartiles and maximum) and a 30-bin histogram of its values across tracts. The expander lists the same summary for every column at once, which helps spot skewed, sparse or constant variables before using them in an analysis.
+    """)
+
     ### Baseline Analysis Median Family Income
     st.header("Baseline Analysis Median Family Income")
 
@@ -363,8 +1074,374 @@ def run_data_analysis():
     Using median family income data, we dissect Brooklyn’s tracts and established considerable differences that call for interventions. Redressing these imbalances through serious, inclusive economic development deploys for people, effective, quality public services, community development projects, etc. can meanwhile revolutionize the quality of lives of the affected populations. Also, investing in the priority areas known as food deserts can increase associated access of healthy food items and therefore benefit health of a nation’s people. This analysis can act as an important guide for policy makers, researchers and communal leaders who are involved in the process of striving for economic and social justice in Brooklyn.
     """)
 
-# Main function to create the app
-def main():
+# LILA zones tab: NTA / census tract search and the zone map
+@map_tab("lila_tab")
+def lila_zones_tab(gdf_lila, index=None):
+    # A BoroughView from the page, or a plain GeoDataFrame
+    lila_view = borough_partitions.as_view(gdf_lila, 'lila')
+    st.header("LILA (Food Desert Zones)")
+    st.markdown("""
+    The LILA (Low Income, Low Access) Zones map visualizes areas identified as food deserts according to the USDA's criteria. A food desert is a geographic area where residents have limited access to affordable and nutritious food, often due to the absence of supermarkets and grocery stores nearby. These zones are classified based on two key factors:
+
+    - **Low Income:** Areas where the poverty rate is 20% or higher, or where the median family income is at or below 80% of the statewide median.
+    - **Low Access:** Areas where at least 500 people, or 33% of the population, live more than 1 mile away from a supermarket in urban areas, or more than 10 miles away in rural areas.
+
+    **Significance:**
+    - **Understanding Food Insecurity:** LILA Zones highlight regions where food insecurity is most acute, indicating where residents may face significant challenges in accessing fresh, healthy food due to economic and geographical barriers.
+    - **Targeting Interventions:** By mapping these zones, policymakers and community leaders can more effectively allocate resources, such as food assistance programs, community gardens, or incentives for grocery stores to open in underserved areas.
+    - **Health Implications:** LILA Zones are often correlated with higher rates of diet-related illnesses, such as obesity, diabetes, and heart disease, due to the limited availability of healthy food options.
+    """)
+
+    # Initial filter
+    nta_options = ["All"] + lila_view.unique('NTA Name')
+    nta_selected = st.selectbox("Search for NTA Name:", nta_options)
+
+    # Filter the zones based on the selected NTA Name (a mask applied to each borough partition)
+    if nta_selected != "All":
+        zone_filter = lambda gdf: gdf['NTA Name'] == nta_selected
+    else:
+        zone_filter = None
+
+    # Census Tract Area filter based on the filtered zones
+    tract_options = ["All"] + lila_view.unique('Census Tract Area', zone_filter)
+    tract_selected = st.selectbox("Search for Census Tract Area:", tract_options)
+
+    # Update the filtering logic to highlight the selected Census Tract Area
+    if tract_selected != "All":
+        zone_filter = lambda gdf: gdf['Census Tract Area'] == tract_selected
+        # Ensure NTA dropdown is updated according to selected Census Tract Area
+        nta_options = ["All"] + lila_view.unique('NTA Name', zone_filter)
+        nta_selected = nta_options[1] if nta_selected == "All" else nta_selected
+
+    # Built once per data version and filter, so clicking a zone only redraws the panel below the map
+    tiles = tile_sources(lila_view)
+
+    def build_lila_map():
+        m = folium.Map(location=[40.7128, -74.0060], zoom_start=10)
+        lila_fields = ['Census Tract Area', 'NTA Name', 'Food Index', ' Median Family Income ', 'Education below high school diploma (Poverty Rate)', 'SNAP Benefits %']
+        lila_aliases = ['Census Tract Area:', 'NTA Name:', 'Food Index:', 'Median Family Income:', 'Poverty Rate:', 'SNAP Benefits:']
+        if tiles is not None:
+            # The tiles hold every zone; the browser hides the ones the filters leave out
+            if tract_selected != "All":
+                filters = {'Census Tract Area': [tract_selected]}
+            elif nta_selected != "All":
+                filters = {'NTA Name': [nta_selected]}
+            else:
+                filters = None
+            with span("lila_map.vector_tiles"):
+                style = vector_tiles.style_js({'fill': True, 'fillColor': 'red', 'color': 'red', 'weight': 1, 'fillOpacity': 0.6}, filters=filters)
+                for layer_name, url in tiles:
+                    vector_tiles.folium_layer(url, layer_name, style, lila_fields, lila_aliases).add_to(m)
+        else:
+            # One GeoJSON layer per borough partition; each feature's id is its GEOID, which a click reports back
+            with span("lila_map.geojson") as recorded:
+                lila_layers, rows = [], 0
+                for county, filtered_gdf in lila_view.select(zone_filter):
+                    rows += len(filtered_gdf)
+                    lila_layers.append(folium.GeoJson(
+                        filtered_gdf.set_axis(tract_profiles.tract_geoids(filtered_gdf, county).to_numpy()),
+                        style_function=lambda feature: {
+                            'fillColor': 'red',
+                            'color': 'red',
+                            'weight': 1,
+                            'fillOpacity': 0.6,
+                        },
+                        tooltip=folium.GeoJsonTooltip(
+                            fields=lila_fields,
+                            aliases=lila_aliases,
+                            localize=True
+                        )
+                    ).add_to(m))
+                recorded.set(rows=rows)
+            recorded.set(payload_bytes=geojson_payload_bytes(*lila_layers))
+        return m
+
+    m, fresh = session_map("lila_map_built", (view_version(lila_view), nta_selected, tract_selected, tuple(tiles or ())), build_lila_map)
+    map_state = show_map(m, "lila_map", fresh, width=800, height=600)
+    display_clicked_tract(index, clicked_tract(map_state, lila_view, zone_filter))
+
+    def display_info(details):
+        for i, row in details.iterrows():
+            st.markdown(f"""
+                <div style="border: 2px solid #ddd; border-radius: 10px; padding: 20px; margin: 20px 0; background-color: #f9f9f9;">
+                    <h4 style="color: #2E8B57;">{row['NTA Name']} - Census Tract Area: {row['Census Tract Area']}</h4>
+                    <p><strong style="color: #FF6347;">Food Index:</strong> {row['Food Index']}</p>
+                    <p><strong style="color: #4682B4;">Median Family Income:</strong> {row[' Median Family Income ']}</p>
+                    <p><strong style="color: #8A2BE2;">Poverty Rate:</strong> {row['Education below high school diploma (Poverty Rate)']}</p>
+                    <p><strong style="color: #DAA520;">SNAP Benefits:</strong> {row['SNAP Benefits %']}</p>
+                </div>
+            """, unsafe_allow_html=True)
+
+    if nta_selected != "All":
+        if tract_selected == "All":
+            st.subheader(f"Details for {nta_selected}")
+        for _, filtered_gdf in lila_view.select(zone_filter):
+            details = filtered_gdf[['NTA Name', 'Census Tract Area', 'Food Index', ' Median Family Income ', 'Education below high school diploma (Poverty Rate)', 'SNAP Benefits %']]
+            display_info(details)
+
+    # The selected tract across every dataset
+    if tract_selected != "All" and index is not None:
+        display_tract_profiles(index, lila_view.select(zone_filter))
+
+# Supermarket coverage tab: year slider, rank search and the choropleth
+@map_tab("supermarket_tab")
+def supermarket_coverage_tab(gdf_supermarkets, index=None):
+    # A BoroughView from the page, or a plain GeoDataFrame; its partitions gain the interpolated and forecast years
+    supermarket_view = coverage_series_view(borough_partitions.as_view(gdf_supermarkets, 'supermarkets'))
+    st.header("Supermarket Coverage Ratio")
+    st.markdown('''
+    ### Supermarket Coverage Ratio Map
+
+    **What is it?**
+
+    The Supermarket Coverage Ratio map illustrates the density of supermarkets in relation to the population within different census tracts. This map provides insights into how well different areas are served by supermarkets.
+
+    - **Supermarket Coverage Ratio:** This ratio is calculated by comparing the number of supermarkets in a given area to the population size. **A lower ratio** indicates poorer access to supermarkets (more people per supermarket), while **a higher ratio** suggests that an area may be better served (fewer people per supermarket).
+
+    **Ranking System:**
+
+    - **Rank Order:** Each census tract is assigned a rank based on supermarket coverage, with Rank 1 indicating the worst supermarket reachability (lower ratio), and higher ranks indicating progressively better coverage (higher ratios). This ranking helps quickly identify areas with the most and least supermarket access.
+
+    **Significance:**
+
+    - **Assessing Food Accessibility:** The Supermarket Coverage Ratio map helps identify areas with poor access to supermarkets versus those that are better served. This can highlight regions where residents may struggle to purchase fresh and healthy food.
+    - **Economic Insights:** Areas with high supermarket coverage ratios (better access) tend to have better economic conditions, as residents have more opportunities to buy affordable and nutritious food. Areas with lower ratios (poorer access) may face economic disadvantages, potentially limiting access to healthy food and contributing to cycles of poverty and poor health.
+    - **Planning and Development:** Urban planners and policymakers can use this map to promote the development of new supermarkets in underserved areas, thereby improving food access and local economies.
+    ''')
+
+
+
+    # Add a select slider for the years; interpolated (2016) and forecast years are marked as such
+    years = coverage_years(supermarket_view, 'supermarket coverage ratio')
+    kinds = view_year_kinds(supermarket_view)
+    year = st.select_slider(
+        "Select Year",
+        options=years,
+        value=min(years),
+        format_func=lambda x: coverage_forecast.year_label(x, kinds),
+        key="supermarket_year_slider"
+    )
+    display_year_note(kinds, year)
+
+    # Add a select box for Rank search
+    rank_options = ['All'] + sorted([rank for rank in supermarket_view.unique(f'{year}_rank') if rank.isdigit()], key=int)
+    selected_rank = st.selectbox(f"Select a Rank for the year {year} or 'All':", rank_options, key="supermarket_rank_select")
+
+    # Hot and cold spots are tested over every tract of a borough, whatever rank is selected
+    statistics = None
+    if st.toggle("Show hot and cold spots (Getis-Ord Gi*)", key="supermarket_hot_spots"):
+        statistics = spatial_statistics(supermarket_view, f'{year}_supermarket coverage ratio')
+    hot_spots = {county: spots for county, (spots, _) in statistics.items()} if statistics else None
+
+    # Create and display the map; the interactive mode only sends the tracts in view.
+    # Either map is built once per data version, year, rank and hot spot setting, so clicking a tract only redraws the panel below it
+    build_key = (view_version(supermarket_view), year, selected_rank, statistics is not None)
+    if st.toggle("Interactive map (send only the tracts in view)", key="supermarket_viewport_mode"):
+        map_state = show_viewport_map("supermarket_map", build_key, lambda clip_box, zoom: create_viewport_map(
+            supermarket_view, year, f'{year}_supermarket coverage ratio', f'{year}_rank', selected_rank, "Supermarket Coverage Ratio", clip_box, zoom,
+            hot_spots))
+    else:
+        tiles = tile_sources(supermarket_view)
+        m, fresh = session_map("supermarket_static_map_built", build_key + (tuple(tiles or ()),), lambda: create_map(
+            supermarket_view, year, f'{year}_supermarket coverage ratio', f'{year}_rank', selected_rank, "Supermarket Coverage Ratio", tiles, hot_spots))
+        map_state = show_map(m, "supermarket_static_map", fresh)
+    if statistics:
+        display_spatial_summary(statistics, "Tested on supermarkets per resident. Cold spots are tracts whose neighbourhood has significantly fewer supermarkets per resident than the borough as a whole (two-sided test): clusters of poor access, not single tracts.")
+    display_clicked_tract(index, clicked_tract(map_state, supermarket_view, rank_filter(f'{year}_rank', selected_rank)))
+
+    # Display the tooltip information below the map if a specific rank is selected
+    if selected_rank != 'All':
+        for _, filtered_gdf in supermarket_view.select(rank_filter(f'{year}_rank', selected_rank)):
+            display_tooltip_info(filtered_gdf, year, f'{year}_supermarket coverage ratio')
+        if index is not None:
+            with st.expander("Combined tract profiles"):
+                display_tract_profiles(index, supermarket_view.select(rank_filter(f'{year}_rank', selected_rank)))
+
+# Fast food coverage tab: year slider, rank search and the choropleth
+@map_tab("fast_food_tab")
+def fast_food_coverage_tab(gdf_fast_food, index=None):
+    # A BoroughView from the page, or a plain GeoDataFrame; its partitions gain the interpolated and forecast years
+    fast_food_view = coverage_series_view(borough_partitions.as_view(gdf_fast_food, 'fast_food'))
+    st.header("Fast Food Coverage Ratio")
+    st.markdown('''
+    ### Fast Food Coverage Ratio Map
+
+    **What is it?**
+
+    The Fast Food Coverage Ratio map shows the density of fast-food restaurants in relation to the population within different census tracts. It highlights areas where fast food is readily available.
+
+    - **Fast Food Coverage Ratio:** This ratio is determined by comparing the number of fast-food restaurants in a given area to the population size. **A higher ratio** indicates a greater density of fast-food outlets (more people per fast food restaurant), while **a lower ratio** suggests fewer fast-food options (fewer people per fast food restaurant).
+
+    **Ranking System:**
+
+    - **Rank Order:** Each census tract is assigned a rank based on fast food coverage, with Rank 1 indicating the highest concentration of fast-food outlets (highest ratio), and higher ranks indicating progressively lower densities of fast food (lower ratios). This ranking helps identify areas with the most and least fast food access.
+
+    **Significance:**
+
+    - **Health Considerations:** High fast-food density, indicated by higher ratios, is often associated with poor dietary habits, as fast food is typically high in calories, fat, sugar, and sodium, and low in essential nutrients. This can lead to health issues such as obesity, diabetes, and heart disease.
+    - **Food Environment Analysis:** This map provides an understanding of the food environment in different areas. Regions with high fast-food coverage (higher ratios) may promote unhealthy eating habits, especially if there is also low supermarket coverage.
+    - **Guiding Health Initiatives:** Public health initiatives can use this map to target areas with high fast-food density (higher ratios) for education campaigns, healthy eating programs, or zoning regulations that limit the proliferation of fast-food outlets in vulnerable communities.
+    ''')
+
+
+    # Add a select slider for the years; interpolated (2016) and forecast years are marked as such
+    years = coverage_years(fast_food_view, 'Fast Food Coverage Ratio')
+    kinds = view_year_kinds(fast_food_view)
+    year = st.select_slider(
+        "Select Year",
+        options=years,
+        value=min(years),
+        format_func=lambda x: coverage_forecast.year_label(x, kinds),
+        key="fast_food_year_slider"
+    )
+    display_year_note(kinds, year)
+
+    # Add a select box for Rank search
+    rank_options = ['All'] + sorted([rank for rank in fast_food_view.unique(f'{year}_rank') if rank.isdigit()], key=int)
+    selected_rank = st.selectbox(f"Select a Rank for the year {year} or 'All':", rank_options, key="fast_food_rank_select")
+
+    # Hot and cold spots are tested over every tract of a borough, whatever rank is selected
+    statistics = None
+    if st.toggle("Show hot and cold spots (Getis-Ord Gi*)", key="fast_food_hot_spots"):
+        statistics = spatial_statistics(fast_food_view, f'{year}_Fast Food Coverage Ratio')
+    hot_spots = {county: spots for county, (spots, _) in statistics.items()} if statistics else None
+
+    # Create and display the map; the interactive mode only sends the tracts in view.
+    # Either map is built once per data version, year, rank and hot spot setting, so clicking a tract only redraws the panel below it
+    build_key = (view_version(fast_food_view), year, selected_rank, statistics is not None)
+    if st.toggle("Interactive map (send only the tracts in view)", key="fast_food_viewport_mode"):
+        map_state = show_viewport_map("fast_food_map", build_key, lambda clip_box, zoom: create_viewport_map(
+            fast_food_view, year, f'{year}_Fast Food Coverage Ratio', f'{year}_rank', selected_rank, "Fast Food Coverage Ratio", clip_box, zoom,
+            hot_spots))
+    else:
+        tiles = tile_sources(fast_food_view)
+        m, fresh = session_map("fast_food_static_map_built", build_key + (tuple(tiles or ()),), lambda: create_map(
+            fast_food_view, year, f'{year}_Fast Food Coverage Ratio', f'{year}_rank', selected_rank, "Fast Food Coverage Ratio", tiles, hot_spots))
+        map_state = show_map(m, "fast_food_static_map", fresh)
+    if statistics:
+        display_spatial_summary(statistics, "Tested on fast food restaurants per resident. Hot spots are tracts whose neighbourhood has significantly more fast food per resident than the borough as a whole (two-sided test): clusters of dense fast food, not single tracts.")
+    display_clicked_tract(index, clicked_tract(map_state, fast_food_view, rank_filter(f'{year}_rank', selected_rank)))
+
+    # Display the tooltip information below the map if a specific rank is selected
+    if selected_rank != 'All':
+        for _, filtered_gdf in fast_food_view.select(rank_filter(f'{year}_rank', selected_rank)):
+            display_tooltip_info(filtered_gdf, year, f'{year}_Fast Food Coverage Ratio')
+        if index is not None:
+            with st.expander("Combined tract profiles"):
+                display_tract_profiles(index, fast_food_view.select(rank_filter(f'{year}_rank', selected_rank)))
+
+# Food swamp tab: the composite of both coverage tables, with the same year slider and rank search
+@map_tab("food_swamp_tab")
+def food_swamp_tab(gdf_supermarkets, gdf_fast_food, index=None):
+    # BoroughViews from the page, or plain GeoDataFrames
+    supermarket_view = borough_partitions.as_view(gdf_supermarkets, 'supermarkets')
+    fast_food_view = borough_partitions.as_view(gdf_fast_food, 'fast_food')
+    swamp_view = food_swamp_view(supermarket_view, fast_food_view)
+    st.header("Food Swamp Index")
+    st.markdown('''
+    ### Food Swamp Index Map
+
+    **What is it?**
+
+    A food swamp is an area where fast food outnumbers healthier options, even if a supermarket is nearby. The Food Swamp Index combines the two coverage maps into one measure for each census tract.
+
+    - **Food Swamp Index:** Fast food's share of the food outlets per resident: fast food restaurants per resident divided by fast food restaurants plus supermarkets per resident. **An index of 1** means the tract has fast food but no supermarket, **an index of 0** means it has supermarkets but no fast food. Tracts with neither have no index.
+
+    **Ranking System:**
+
+    - **Rank Order:** Rank 1 is the tract with the highest index, the strongest food swamp. Tracts with the same index are ordered by their fast food per resident. Tracts without an index are not ranked.
+
+    **Significance:**
+
+    - **Beyond Food Deserts:** A tract can have a supermarket and still offer mostly fast food. Research links food swamps to obesity more strongly than distance to a supermarket alone.
+    - **Targeting Interventions:** High-index tracts are candidates for healthy food retail incentives, zoning limits on new fast-food outlets, or nutrition programs.
+    ''')
+
+    # Years both tables have, including the interpolated and forecast ones (marked as such)
+    years = coverage_years(swamp_view, food_swamp.INDEX_SUFFIX)
+    kinds = view_year_kinds(coverage_series_view(supermarket_view))
+    year = st.select_slider(
+        "Select Year",
+        options=years,
+        value=min(years),
+        format_func=lambda x: coverage_forecast.year_label(x, kinds),
+        key="food_swamp_year_slider"
+    )
+    display_year_note(kinds, year)
+
+    # Add a select box for Rank search
+    rank_options = ['All'] + sorted([rank for rank in swamp_view.unique(f'{year}_rank') if rank.isdigit()], key=int)
+    selected_rank = st.selectbox(f"Select a Rank for the year {year} or 'All':", rank_options, key="food_swamp_rank_select")
+
+    # Create and display the map; the index is built from both tables, so both versions key the stored map.
+    # The index is computed here rather than read from a file, so it is always inlined (no vector tiles)
+    index_col = f'{year}_{food_swamp.INDEX_SUFFIX}'
+    build_key = (view_version(supermarket_view), view_version(fast_food_view), year, selected_rank)
+    if st.toggle("Interactive map (send only the tracts in view)", key="food_swamp_viewport_mode"):
+        map_state = show_viewport_map("food_swamp_map", build_key, lambda clip_box, zoom: create_viewport_map(
+            swamp_view, year, index_col, f'{year}_rank', selected_rank, "Food Swamp Index", clip_box, zoom))
+    else:
+        m, fresh = session_map("food_swamp_static_map_built", build_key, lambda: create_map(
+            swamp_view, year, index_col, f'{year}_rank', selected_rank, "Food Swamp Index"))
+        map_state = show_map(m, "food_swamp_static_map", fresh)
+    display_clicked_tract(index, clicked_tract(map_state, swamp_view, rank_filter(f'{year}_rank', selected_rank)))
+
+    # Display the tooltip information below the map if a specific rank is selected
+    if selected_rank != 'All':
+        for _, filtered_gdf in swamp_view.select(rank_filter(f'{year}_rank', selected_rank)):
+            display_tooltip_info(filtered_gdf, year, index_col)
+        if index is not None:
+            with st.expander("Combined tract profiles"):
+                display_tract_profiles(index, swamp_view.select(rank_filter(f'{year}_rank', selected_rank)))
+
+# Default-state map of a coverage dataset (first year, all ranks); builds its geometry tiers and spatial indexes
+def warm_coverage_map(dataset, suffix, legend_name):
+    view = coverage_series_view(get_dataset(dataset))
+    year = min(coverage_years(view, suffix))
+    create_map(view, year, f'{year}_{suffix}', f'{year}_rank', 'All', legend_name)
+    for _, gdf in view.frames():
+        gdf.sindex
+
+# Tract keys of the default datasets and the model's predictions for their tracts
+def warm_tract_index():
+    index = tract_index({name: get_dataset(name) for name in tract_data_paths})
+    for county in index.counties:
+        index.predictions(county)
+
+# Analysis tables, the default correlation matrix, the tract column statistics, and Plotly's one-off setup on its first figures
+def warm_analysis():
+    tables = {path: load_table(path) for path in [socioeconomics_data_path, conv_stores_data_path, eating_data_path, corr_plot_data_path]}
+    corr_df = tables[corr_plot_data_path]
+    corr = correlation_matrix(corr_plot_data_path, data_versioning.version(corr_plot_data_path), tuple(corr_df.columns))
+    create_correlation_heatmap(corr_df, corr).to_json()
+    px.box(tables[socioeconomics_data_path]).to_json()
+    load_column_stats(supermarket_data_path)
+
+# Warm-up tasks as (name, page, function): the landing page's modules, then the heaviest page first
+def warmup_tasks():
+    return [
+        ("modules", "Home", functools.partial(prepare_page, "Home", PAGE_DEPENDENCIES)),
+        ("modules and datasets", "Data Visualization", functools.partial(prepare_page, "Data Visualization", PAGE_DEPENDENCIES)),
+        ("default supermarket map", "Data Visualization", functools.partial(warm_coverage_map, 'supermarkets', 'supermarket coverage ratio', "Supermarket Coverage Ratio")),
+        ("default fast food map", "Data Visualization", functools.partial(warm_coverage_map, 'fast_food', 'Fast Food Coverage Ratio', "Fast Food Coverage Ratio")),
+        ("modules", "Data Analysis", functools.partial(prepare_page, "Data Analysis", PAGE_DEPENDENCIES)),
+        ("tables, correlations and figures", "Data Analysis", warm_analysis),
+        # No page joins this group: model scoring only runs in the background, and a profile computes it on demand
+        ("tract index and predictions", "Tract profiles", warm_tract_index),
+    ]
+
+# Background warm-up, one per process (FOOD_DESERT_WARMUP=0 turns it off); the first script run starts it once its page is drawn
+@st.cache_resource
+def warmup_state():
+    if os.environ.get("FOOD_DESERT_WARMUP", "1") == "0":
+        return None
+    # The warm-up thread calls the cached loaders outside any session, which Streamlit would log on every call
+    warmup.quiet_thread_warnings("streamlit.runtime.scriptrunner_utils.script_run_context", "missing ScriptRunContext")
+    return warmup.Warmup(warmup_tasks())
+
+# Body of every script run: navigation and the selected page
+def render_page():
+    warm = warmup_state()
     st.sidebar.title("Navigation")
     page_icons = {
         "Home": "🏠",
@@ -377,6 +1454,12 @@ def main():
 
     pages = ["Home", "Data Analysis", "Data Visualization", "Food Policy Reports", "Comments", "Guide"]
     selection = st.sidebar.radio("Go to", pages, format_func=lambda page: f"{page_icons[page]} {page}")
+    current_rerun().label = selection
+    # A page opened before the warm-up reaches it joins its tasks instead of repeating them
+    if warm is not None:
+        with span("warmup.join"):
+            warm.join(selection)
+    datasets = prepare_page(selection, PAGE_DEPENDENCIES)
 
     if selection == "Home":
         # Title of the homepage
@@ -440,178 +1523,34 @@ def main():
         run_data_analysis()
 
     elif selection == "Data Visualization":
-        # Map selection using tabs
-        tabs = st.tabs(["LILA Zones", "Supermarket Coverage Ratio", "Fast Food Coverage Ratio"])
-
-        with tabs[0]:
-            st.header("LILA (Food Desert Zones)")
-            st.markdown("""
-            The LILA (Low Income, Low Access) Zones map visualizes areas identified as food deserts according to the USDA's criteria. A food desert is a geographic area where residents have limited access to affordable and nutritious food, often due to the absence of supermarkets and grocery stores nearby. These zones are classified based on two key factors:
-
-            - **Low Income:** Areas where the poverty rate is 20% or higher, or where the median family income is at or below 80% of the statewide median.
-            - **Low Access:** Areas where at least 500 people, or 33% of the population, live more than 1 mile away from a supermarket in urban areas, or more than 10 miles away in rural areas.
-
-            **Significance:**
-            - **Understanding Food Insecurity:** LILA Zones highlight regions where food insecurity is most acute, indicating where residents may face significant challenges in accessing fresh, healthy food due to economic and geographical barriers.
-            - **Targeting Interventions:** By mapping these zones, policymakers and community leaders can more effectively allocate resources, such as food assistance programs, community gardens, or incentives for grocery stores to open in underserved areas.
-            - **Health Implications:** LILA Zones are often correlated with higher rates of diet-related illnesses, such as obesity, diabetes, and heart disease, due to the limited availability of healthy food options.
-            """)
-
-            # Initial filter
-            nta_options = ["All"] + gdf_lila['NTA Name'].unique().tolist()
-            nta_selected = st.selectbox("Search for NTA Name:", nta_options)
-
-            # Filter the GeoDataFrame based on the selected NTA Name
-            if nta_selected != "All":
-                filtered_gdf = gdf_lila[gdf_lila['NTA Name'] == nta_selected]
-            else:
-                filtered_gdf = gdf_lila
-
-            # Census Tract Area filter based on the filtered GeoDataFrame
-            tract_options = ["All"] + filtered_gdf['Census Tract Area'].unique().tolist()
-            tract_selected = st.selectbox("Search for Census Tract Area:", tract_options)
-
-            # Update the filtering logic to highlight the selected Census Tract Area
-            if tract_selected != "All":
-                filtered_gdf = gdf_lila[gdf_lila['Census Tract Area'] == tract_selected]
-                # Ensure NTA dropdown is updated according to selected Census Tract Area
-                nta_options = ["All"] + filtered_gdf['NTA Name'].unique().tolist()
-                nta_selected = nta_options[1] if nta_selected == "All" else nta_selected
-            elif nta_selected != "All":
-                filtered_gdf = gdf_lila[gdf_lila['NTA Name'] == nta_selected]
-            else:
-                filtered_gdf = gdf_lila
-
-            m = folium.Map(location=[40.7128, -74.0060], zoom_start=10)
-            folium.GeoJson(
-                filtered_gdf,
-                style_function=lambda feature: {
-                    'fillColor': 'red',
-                    'color': 'red',
-                    'weight': 1,
-                    'fillOpacity': 0.6,
-                },
-                tooltip=folium.GeoJsonTooltip(
-                    fields=['Census Tract Area', 'NTA Name', 'Food Index', ' Median Family Income ', 'Education below high school diploma (Poverty Rate)', 'SNAP Benefits %'],
-                    aliases=['Census Tract Area:', 'NTA Name:', 'Food Index:', 'Median Family Income:', 'Poverty Rate:', 'SNAP Benefits:'],
-                    localize=True
-                )
-            ).add_to(m)
-            folium_static(m, width=800, height=600)
-
-            def display_info(details):
-                for i, row in details.iterrows():
-                    st.markdown(f"""
-                        <div style="border: 2px solid #ddd; border-radius: 10px; padding: 20px; margin: 20px 0; background-color: #f9f9f9;">
-                            <h4 style="color: #2E8B57;">{row['NTA Name']} - Census Tract Area: {row['Census Tract Area']}</h4>
-                            <p><strong style="color: #FF6347;">Food Index:</strong> {row['Food Index']}</p>
-                            <p><strong style="color: #4682B4;">Median Family Income:</strong> {row[' Median Family Income ']}</p>
-                            <p><strong style="color: #8A2BE2;">Poverty Rate:</strong> {row['Education below high school diploma (Poverty Rate)']}</p>
-                            <p><strong style="color: #DAA520;">SNAP Benefits:</strong> {row['SNAP Benefits %']}</p>
-                        </div>
-                    """, unsafe_allow_html=True)
-
-            if nta_selected != "All":
-                if tract_selected == "All":
-                    details = filtered_gdf[['NTA Name', 'Census Tract Area', 'Food Index', ' Median Family Income ', 'Education below high school diploma (Poverty Rate)', 'SNAP Benefits %']]
-                    st.subheader(f"Details for {nta_selected}")
-                    display_info(details)
+        # Brooklyn comes preloaded; other boroughs' partitions load as the tabs read them
+        boroughs = borough_selector()
+        if boroughs != default_boroughs:
+            datasets = {name: borough_view(name, boroughs) for name in tract_data_paths}
+        lila_view = datasets['lila']
+        index = tract_index(datasets)
+
+        # Tract search: one profile joining LILA status, both coverage ranks and the model's prediction
+        query = st.sidebar.text_input("Tract profile", placeholder="Census tract, e.g. 98200 or 982", key="tract_search")
+        if query:
+            matches = index.lookup(query)
+            if not matches:
+                st.sidebar.warning(f"No census tract matches '{query}'.")
+            for geoid in matches:
+                display_tract_profile(index.profile(geoid))
+
+        # Each tab is a fragment: its widgets rerun only that tab, and only the open tab is built
+        tabs = visualization_tabs(["LILA Zones", "Supermarket Coverage Ratio", "Fast Food Coverage Ratio", "Food Swamp Index"])
+        render_food_swamp = functools.partial(food_swamp_tab, gdf_fast_food=datasets['fast_food'])
+        for tab, render_tab, view in zip(tabs, [lila_zones_tab, supermarket_coverage_tab, fast_food_coverage_tab, render_food_swamp],
+                                         [datasets['lila'], datasets['supermarkets'], datasets['fast_food'], datasets['supermarkets']]):
+            with tab:
+                if not tab_is_open(tab):
+                    continue
+                if view.paths:
+                    render_tab(view, index=index)
                 else:
-                    details = filtered_gdf[['NTA Name', 'Census Tract Area', 'Food Index', ' Median Family Income ', 'Education below high school diploma (Poverty Rate)', 'SNAP Benefits %']]
-                    display_info(details)
-
-        with tabs[1]:
-            st.header("Supermarket Coverage Ratio")
-            st.markdown('''
-            ### Supermarket Coverage Ratio Map
-
-            **What is it?**
-
-            The Supermarket Coverage Ratio map illustrates the density of supermarkets in relation to the population within different census tracts. This map provides insights into how well different areas are served by supermarkets.
-
-            - **Supermarket Coverage Ratio:** This ratio is calculated by comparing the number of supermarkets in a given area to the population size. **A lower ratio** indicates poorer access to supermarkets (more people per supermarket), while **a higher ratio** suggests that an area may be better served (fewer people per supermarket).
-
-            **Ranking System:**
-
-            - **Rank Order:** Each census tract is assigned a rank based on supermarket coverage, with Rank 1 indicating the worst supermarket reachability (lower ratio), and higher ranks indicating progressively better coverage (higher ratios). This ranking helps quickly identify areas with the most and least supermarket access.
-
-            **Significance:**
-
-            - **Assessing Food Accessibility:** The Supermarket Coverage Ratio map helps identify areas with poor access to supermarkets versus those that are better served. This can highlight regions where residents may struggle to purchase fresh and healthy food.
-            - **Economic Insights:** Areas with high supermarket coverage ratios (better access) tend to have better economic conditions, as residents have more opportunities to buy affordable and nutritious food. Areas with lower ratios (poorer access) may face economic disadvantages, potentially limiting access to healthy food and contributing to cycles of poverty and poor health.
-            - **Planning and Development:** Urban planners and policymakers can use this map to promote the development of new supermarkets in underserved areas, thereby improving food access and local economies.
-            ''')
-
-
-            
-            # Add a select slider for the years
-            years = list(range(2003, 2018))  # Adjust this range based on your data
-            year = st.select_slider(
-                "Select Year",
-                options=years,
-                value=min(years),
-                format_func=lambda x: f"{x}",
-                key="supermarket_year_slider"
-            )
-
-            # Add a select box for Rank search
-            rank_options = ['All'] + sorted([rank for rank in gdf_supermarkets[f'{year}_rank'].dropna().unique() if rank.isdigit()], key=int)
-            selected_rank = st.selectbox(f"Select a Rank for the year {year} or 'All':", rank_options, key="supermarket_rank_select")
-
-            # Create and display the map
-            m = create_map(gdf_supermarkets, year, f'{year}_supermarket coverage ratio', f'{year}_rank', selected_rank, "Supermarket Coverage Ratio")
-            folium_static(m)
-
-            # Display the tooltip information below the map if a specific rank is selected
-            if selected_rank != 'All':
-                filtered_gdf = gdf_supermarkets[gdf_supermarkets[f'{year}_rank'] == selected_rank]
-                display_tooltip_info(filtered_gdf, year, f'{year}_supermarket coverage ratio')
-
-        with tabs[2]:
-            st.header("Fast Food Coverage Ratio")
-            st.markdown('''
-            ### Fast Food Coverage Ratio Map
-
-            **What is it?**
-
-            The Fast Food Coverage Ratio map shows the density of fast-food restaurants in relation to the population within different census tracts. It highlights areas where fast food is readily available.
-
-            - **Fast Food Coverage Ratio:** This ratio is determined by comparing the number of fast-food restaurants in a given area to the population size. **A higher ratio** indicates a greater density of fast-food outlets (more people per fast food restaurant), while **a lower ratio** suggests fewer fast-food options (fewer people per fast food restaurant).
-
-            **Ranking System:**
-
-            - **Rank Order:** Each census tract is assigned a rank based on fast food coverage, with Rank 1 indicating the highest concentration of fast-food outlets (highest ratio), and higher ranks indicating progressively lower densities of fast food (lower ratios). This ranking helps identify areas with the most and least fast food access.
-
-            **Significance:**
-
-            - **Health Considerations:** High fast-food density, indicated by higher ratios, is often associated with poor dietary habits, as fast food is typically high in calories, fat, sugar, and sodium, and low in essential nutrients. This can lead to health issues such as obesity, diabetes, and heart disease.
-            - **Food Environment Analysis:** This map provides an understanding of the food environment in different areas. Regions with high fast-food coverage (higher ratios) may promote unhealthy eating habits, especially if there is also low supermarket coverage.
-            - **Guiding Health Initiatives:** Public health initiatives can use this map to target areas with high fast-food density (higher ratios) for education campaigns, healthy eating programs, or zoning regulations that limit the proliferation of fast-food outlets in vulnerable communities.
-            ''')
-
-            
-            # Add a select slider for the years
-            years = list(range(2003, 2018))  # Adjust this range based on your data
-            year = st.select_slider(
-                "Select Year",
-                options=years,
-                value=min(years),
-                format_func=lambda x: f"{x}",
-                key="fast_food_year_slider"
-            )
-
-            # Add a select box for Rank search
-            rank_options = ['All'] + sorted([rank for rank in gdf_fast_food[f'{year}_rank'].dropna().unique() if rank.isdigit()], key=int)
-            selected_rank = st.selectbox(f"Select a Rank for the year {year} or 'All':", rank_options, key="fast_food_rank_select")
-
-            # Create and display the map
-            m = create_map(gdf_fast_food, year, f'{year}_Fast Food Coverage Ratio', f'{year}_rank', selected_rank, "Fast Food Coverage Ratio")
-            folium_static(m)
-
-            # Display the tooltip information below the map if a specific rank is selected
-            if selected_rank != 'All':
-                filtered_gdf = gdf_fast_food[gdf_fast_food[f'{year}_rank'] == selected_rank]
-                display_tooltip_info(filtered_gdf, year, f'{year}_Fast Food Coverage Ratio')
+                    st.info("This dataset has no tracts in the selected boroughs.")
 
         # Share App button with Gmail link
         share_text = "Check out this Food Desert Analysis App!"
@@ -620,7 +1559,7 @@ def main():
         st.sidebar.markdown(f'<a href="{mailto_link}" target="_blank"><button style="background-color:green;color:white;border:none;padding:10px 20px;text-align:center;text-decoration:none;display:inline-block;font-size:16px;margin:4px 2px;cursor:pointer;">Share App via Email</button></a>', unsafe_allow_html=True)
 
         # Download CSV button
-        csv = gdf_lila.to_csv(index=False)
+        csv = view_csv(lila_view)
         b64 = base64.b64encode(csv.encode()).decode()
         href = f'<a href="data:file/csv;base64,{b64}" download="LILAZones_geo.csv"><button style="background-color:blue;color:white;border:none;padding:10px 20px;text-align:center;text-decoration:none;display:inline-block;font-size:16px;margin:4px 2px;cursor:pointer;">Download CSV</button></a>'
         st.sidebar.markdown(href, unsafe_allow_html=True)
@@ -708,36 +1647,21 @@ def main():
         # Submit Button
         if st.button("Submit"):
             if user_comment:
-                # Load existing comments or create a new DataFrame if it doesn't exist
-                if os.path.exists(comments_file):
-                    comments_df = pd.read_csv(comments_file)
-                else:
-                    comments_df = pd.DataFrame(columns=["Comment"])
-    
-                # Add the new comment to the DataFrame
-                new_comment = pd.DataFrame({"Comment": [user_comment]})
-                comments_df = pd.concat([comments_df, new_comment], ignore_index=True)
-    
-                # Save the updated DataFrame back to the CSV file
-                comments_df.to_csv(comments_file, index=False)
-    
+                save_comment(user_comment)
                 st.success("Comment saved successfully! 🎉")
             else:
                 st.warning("Please write a comment before submitting. 📝")
     
         # Display recent comments
         st.markdown("### 💬 Recent Comments")
-        if os.path.exists(comments_file):
-            comments_df = pd.read_csv(comments_file)
-            if not comments_df.empty:
-                for comment in comments_df["Comment"].tail(5):  # Display the last 5 comments
-                    st.markdown(f"""
-                    <div style="border: 1px solid #ddd; padding: 10px; margin: 10px 0; border-radius: 5px; background-color: #f9f9f9;">
-                        {comment}
-                    </div>
-                    """, unsafe_allow_html=True)
-            else:
-                st.info("No comments yet. Be the first to leave one!")
+        recent_comments = load_recent_comments()
+        if recent_comments:
+            for comment in recent_comments:
+                st.markdown(f"""
+                <div style="border: 1px solid #ddd; padding: 10px; margin: 10px 0; border-radius: 5px; background-color: #f9f9f9;">
+                    {comment}
+                </div>
+                """, unsafe_allow_html=True)
         else:
             st.info("No comments yet. Be the first to leave one!")
 
@@ -822,5 +1746,19 @@ def main():
         - 🔄 **Need Help?**: Come back to this guide anytime you need a refresher. We’re here to help you navigate the app with ease! 🌟
         """)
 
+    # Started after the page is drawn so the warm-up doesn't slow down the first visitor's own render
+    if warm is not None:
+        warm.start()
+    display_startup_profile()
+
+# Main function to create the app: one timed rerun per script run, recorded even when the page raises
+def main():
+    begin_rerun(measure_payloads=st.query_params.get("debug") == "1", session=session_id())
+    try:
+        render_page()
+    finally:
+        end_rerun()
+    display_performance_panel()
+
 if __name__ == "__main__":
     main()
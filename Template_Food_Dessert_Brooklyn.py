@@ -5,15 +5,16 @@ import folium
 from streamlit_folium import st_folium, folium_static
 from shapely import wkt
 import base64
+import data_versioning
 
 # Clear the cache
-@st.cache_data.clear()
 def clear_cache():
     st.cache_data.clear()
+    st.cache_resource.clear()
 
-# Cache the data loading and processing function
+# Cache the data loading and processing function, keyed on the file's content version so a replaced file is reloaded
 @st.cache_data
-def load_data():
+def load_data(version=None):
     data = pd.read_csv('LILAZones_geo.csv')
     data['geometry'] = data['geometry'].apply(wkt.loads)
     gdf = gpd.GeoDataFrame(data, geometry='geometry')
@@ -22,7 +23,7 @@ def load_data():
 
 # Cache the data loading and processing function for supermarkets
 @st.cache_resource
-def load_and_process_data(data_path):
+def load_and_process_data(data_path, version=None):
     data = pd.read_csv(data_path)
     data['geometry'] = data['geometry'].apply(wkt.loads)
     gdf = gpd.GeoDataFrame(data, geometry='geometry')
@@ -31,11 +32,11 @@ def load_and_process_data(data_path):
 
 # Load and process the data for supermarkets
 supermarket_data_path = "supermarkets.csv"
-gdf_supermarkets = load_and_process_data(supermarket_data_path)
+gdf_supermarkets = load_and_process_data(supermarket_data_path, data_versioning.version(supermarket_data_path))
 
 # Load and process the data for fast food
 fast_food_data_path = "Fast Food Restaurants.csv"
-gdf_fast_food = load_and_process_data(fast_food_data_path)
+gdf_fast_food = load_and_process_data(fast_food_data_path, data_versioning.version(fast_food_data_path))
 
 # Function to create a folium map for a given year and optionally filter by rank for supermarkets
 def create_supermarket_map(year, selected_rank=None):
@@ -171,7 +172,7 @@ def main():
 
         with tabs[0]:
             st.header("LILA & Non-LILA Zones")
-            gdf = load_data()
+            gdf = load_data(data_versioning.version('LILAZones_geo.csv'))
 
             search_query_nta = st.selectbox(
                 "Search for NTA Name:",
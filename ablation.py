@@ -0,0 +1,198 @@
+"""Drop-one (and drop-k) feature ablation for the food-desert models.
+
+Replaces the notebook loop that calls ``X.drop(X.columns[i])`` and retrains a
+100-tree RandomForest once per feature.  Every (feature set, model, seed)
+fit runs in a process pool and is stored in an on-disk result cache, so a
+rerun only trains the combinations that have not been scored yet.
+
+Example:
+    python ablation.py --models "Random Forest" LightGBM --k 1 --compare-serial
+"""
+import argparse
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from feature_pipeline import DEFAULT_TRACT_PATH
+from food_desert_models import (FEATURE_SETS, RANDOM_STATE, data_fingerprint, load_model_data, make_model,
+                                score_predictions, select_features, split_data)
+from result_cache import ResultCache
+
+DEFAULT_CACHE_DIR = os.path.join('.cache', 'ablation')
+
+# Data shared with worker processes once, instead of pickling it with every task
+_worker_data = {}
+
+
+def _init_worker(X, y):
+    _worker_data['X'] = X
+    _worker_data['y'] = y
+
+
+# Every combination of k columns to leave out, plus the untouched baseline
+def drop_feature_sets(columns, k=1):
+    drop_sets = [()]
+    for size in range(1, k + 1):
+        drop_sets.extend(itertools.combinations(columns, size))
+    return drop_sets
+
+
+# Number of pool workers so pool workers x per-model threads stays within the CPU budget
+def plan_workers(n_jobs=-1, model_n_jobs=1, n_tasks=None):
+    cpus = os.cpu_count() or 1
+    budget = cpus if n_jobs is None or n_jobs < 0 else max(1, n_jobs)
+    workers = max(1, budget // max(1, model_n_jobs))
+    if n_tasks is not None:
+        workers = min(workers, max(1, n_tasks))
+    return workers
+
+
+def _fit_and_score(X, y, dropped, model_name, seed, params):
+    X_removed = X.drop(columns=list(dropped))
+    X_train, X_test, y_train, y_test = split_data(X_removed, y, seed)
+    model = make_model(model_name, seed, **params)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+    record = {
+        'dropped': list(dropped),
+        'model': model_name,
+        'seed': seed,
+        'n_features': X_removed.shape[1],
+        'fit_seconds': fit_seconds,
+    }
+    record.update(score_predictions(y_test, model.predict(X_test)))
+    return record
+
+
+def _run_task(task):
+    return _fit_and_score(_worker_data['X'], _worker_data['y'], *task)
+
+
+# Model parameters, adding n_jobs only for estimators that accept it
+def _model_params(model_name, model_n_jobs):
+    if 'n_jobs' in make_model(model_name).get_params():
+        return {'n_jobs': model_n_jobs}
+    return {}
+
+
+# Run the ablation grid in a process pool, skipping fits already in the cache
+def run_ablation(X, y, models=('Random Forest',), k=1, seeds=(RANDOM_STATE,), feature_set='full',
+                 n_jobs=-1, model_n_jobs=1, cache_dir=DEFAULT_CACHE_DIR, use_cache=True):
+    X = select_features(X, feature_set)
+    cache = ResultCache(cache_dir) if use_cache else None
+    fingerprint = data_fingerprint(X, y)
+
+    records = []
+    pending = {}
+    for model_name in models:
+        params = _model_params(model_name, model_n_jobs)
+        for seed in seeds:
+            for dropped in drop_feature_sets(X.columns, k):
+                key = ResultCache.key(fingerprint, feature_set, sorted(dropped), model_name, seed, params)
+                cached = cache.get(key) if cache else None
+                if cached is not None:
+                    cached['cached'] = True
+                    records.append(cached)
+                else:
+                    pending[key] = (tuple(dropped), model_name, seed, params)
+
+    workers = plan_workers(n_jobs, model_n_jobs, len(pending))
+    if pending:
+        if workers == 1:
+            results = ((key, _fit_and_score(X, y, *task)) for key, task in pending.items())
+            for key, record in results:
+                records.append(_store(cache, key, record, feature_set))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(X, y)) as pool:
+                futures = {pool.submit(_run_task, task): key for key, task in pending.items()}
+                for future in as_completed(futures):
+                    records.append(_store(cache, futures[future], future.result(), feature_set))
+
+    return _summarise(records)
+
+
+def _store(cache, key, record, feature_set):
+    record['feature_set'] = feature_set
+    if cache is not None:
+        cache.put(key, record)
+    record['cached'] = False
+    return record
+
+
+# Results table with each fit's accuracy change against the matching no-drop baseline
+def _summarise(records):
+    results = pd.DataFrame(records)
+    if results.empty:
+        return results
+    results['dropped'] = results['dropped'].apply(lambda dropped: ', '.join(dropped) if dropped else '(none)')
+    baseline = results[results['dropped'] == '(none)'].set_index(['model', 'seed'])['accuracy']
+    results['accuracy_change'] = results['accuracy'] - [baseline.get((model, seed)) for model, seed in zip(results['model'], results['seed'])]
+    return results.sort_values(['model', 'seed', 'accuracy_change']).reset_index(drop=True)
+
+
+# The notebook's serial loop: one fit per dropped feature, no pool and no cache
+def run_serial(X, y, models=('Random Forest',), k=1, seeds=(RANDOM_STATE,), feature_set='full'):
+    X = select_features(X, feature_set)
+    records = []
+    for model_name in models:
+        for seed in seeds:
+            for dropped in drop_feature_sets(X.columns, k):
+                records.append(_fit_and_score(X, y, dropped, model_name, seed, {}))
+    return records
+
+
+# Wall-clock comparison of the serial loop and the process pool on the same grid
+def measure_speedup(X, y, models=('Random Forest',), k=1, seeds=(RANDOM_STATE,), feature_set='full',
+                    n_jobs=-1, model_n_jobs=1):
+    start = time.perf_counter()
+    run_serial(X, y, models, k, seeds, feature_set)
+    serial_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    run_ablation(X, y, models, k, seeds, feature_set, n_jobs, model_n_jobs, use_cache=False)
+    parallel_seconds = time.perf_counter() - start
+
+    return {
+        'serial_seconds': serial_seconds,
+        'parallel_seconds': parallel_seconds,
+        'speedup': serial_seconds / parallel_seconds if parallel_seconds else float('nan'),
+        'workers': plan_workers(n_jobs, model_n_jobs),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drop-k feature ablation for the food-desert models.")
+    parser.add_argument('--data', default=DEFAULT_TRACT_PATH, help="Tract table, or the notebook's clean_data.xlsx")
+    parser.add_argument('--models', nargs='+', default=['Random Forest'])
+    parser.add_argument('--feature-set', choices=sorted(FEATURE_SETS), default='full')
+    parser.add_argument('--k', type=int, default=1, help="Drop every combination of up to k features")
+    parser.add_argument('--seeds', nargs='+', type=int, default=[RANDOM_STATE])
+    parser.add_argument('--n-jobs', type=int, default=-1, help="Total CPU budget (-1 = all cores)")
+    parser.add_argument('--model-n-jobs', type=int, default=1, help="Threads per model for estimators that support n_jobs")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--compare-serial', action='store_true', help="Also time the serial notebook loop and report the speedup")
+    parser.add_argument('--output', help="Optional CSV file for the results table")
+    args = parser.parse_args(argv)
+
+    X, y = load_model_data(args.data)
+    results = run_ablation(X, y, args.models, args.k, args.seeds, args.feature_set,
+                           args.n_jobs, args.model_n_jobs, args.cache_dir, not args.no_cache)
+    with pd.option_context('display.max_rows', None, 'display.width', 200):
+        print(results[['model', 'seed', 'dropped', 'accuracy', 'accuracy_change', 'f1', 'fit_seconds', 'cached']])
+    if args.output:
+        results.to_csv(args.output, index=False)
+
+    if args.compare_serial:
+        timing = measure_speedup(X, y, args.models, args.k, args.seeds, args.feature_set, args.n_jobs, args.model_n_jobs)
+        print(f"\nSerial loop: {timing['serial_seconds']:.2f}s")
+        print(f"Process pool ({timing['workers']} workers): {timing['parallel_seconds']:.2f}s")
+        print(f"Speedup: {timing['speedup']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
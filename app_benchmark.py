@@ -0,0 +1,350 @@
+"""Benchmark suite for the app's map and analysis paths.
+
+Times ``load_data`` (cold parse and warm cache hit), ``create_map`` plus the
+HTML render that ``st_folium`` performs for every year and a spread of
+ranks (both coverage layers and the food swamp index), ``display_tooltip_info``, the correlation heatmap and the comments
+read/write path.  The interaction stages compare one widget change on the
+Data Visualization page under two scopes: rebuilding every tab, or only the
+fragment that owns the widget.  A third scope is a click on a tab's map,
+which reuses the map the session already built.  They report wall time,
+CPU time and bytes shipped.  The viewport stages compare the tract payload of the static map
+with the interactive map, at full extent and zoomed into one neighbourhood.  Runs use the real data (1x) and synthetic scale-ups from
+``synthetic_tracts.py``.  Results are written as JSON and compared against a
+stored baseline; any stage whose median slows down by more than the
+tolerance is reported as a regression and the exit code is non-zero.
+
+Example:
+    python app_benchmark.py --factors 1 10 --save-baseline       # record a baseline
+    python app_benchmark.py --factors 1 10                       # compare against it
+"""
+import argparse
+import contextlib
+import inspect
+import json
+import logging
+import os
+import platform
+import re
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import borough_partitions
+import instrumentation
+import synthetic_tracts
+
+DEFAULT_BASELINE = os.path.join('benchmarks', 'baseline.json')
+DEFAULT_OUTPUT = os.path.join('benchmarks', 'latest.json')
+DEFAULT_TOLERANCE = 0.2
+# Sub-millisecond stages are noisy; ignore slowdowns smaller than this
+MIN_DELTA_MS = 1.0
+# Layers drawn with create_map: dataset name -> yearly value column suffix and legend
+MAP_LAYERS = {
+    'supermarkets': ('supermarket coverage ratio', "Supermarket Coverage Ratio"),
+    'fast_food': ('Fast Food Coverage Ratio', "Fast Food Coverage Ratio"),
+    'food_swamp': ('food swamp index', "Food Swamp Index"),
+}
+# A neighbourhood-sized view (roughly zoom 14 over Park Slope), padded the way the app pads the viewport
+NEIGHBOURHOOD_VIEW = (-73.99, 40.66, -73.96, 40.68)
+# Data Visualization tab renderers (each an st.fragment in the app) and the datasets each one draws
+VISUALIZATION_TABS = {
+    'lila': ('lila_zones_tab', ['lila']),
+    'supermarkets': ('supermarket_coverage_tab', ['supermarkets']),
+    'fast_food': ('fast_food_coverage_tab', ['fast_food']),
+    'food_swamp': ('food_swamp_tab', ['supermarkets', 'fast_food']),
+}
+
+
+def _load_app():
+    # Streamlit warns about the missing runtime on every call made outside `streamlit run`
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+    import Brooklyn_Food_Desert_App as app
+    return app
+
+
+def measure(func, repeat=5, warmup=1):
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def summarise(timings):
+    return {
+        'median_ms': statistics.median(timings) * 1000,
+        'p95_ms': float(np.percentile(timings, 95)) * 1000,
+        'min_ms': min(timings) * 1000,
+        'runs': len(timings),
+    }
+
+
+# Yearly (value column, rank column) pairs of a map layer: '<year>_<suffix>' next to '<year>_rank'
+def layer_columns(gdf, suffix):
+    pattern = re.compile(rf'^(\d{{4}})_{re.escape(suffix)}$')
+    matches = [pattern.match(column) for column in gdf.columns]
+    return [(match.group(0), f'{match.group(1)}_rank') for match in matches
+            if match and f'{match.group(1)}_rank' in gdf.columns]
+
+
+def year_rank_combinations(gdf, suffix, ranks_per_year=3, all_ranks=False, years=None):
+    combinations = []
+    for ratio_column, rank_column in layer_columns(gdf, suffix):
+        year = int(ratio_column[:4])
+        if years and year not in years:
+            continue
+        ranks = sorted((rank for rank in gdf[rank_column].dropna().unique() if rank.isdigit()), key=int)
+        if not all_ranks and ranks:
+            picks = np.linspace(0, len(ranks) - 1, num=min(ranks_per_year, len(ranks))).astype(int)
+            ranks = [ranks[i] for i in sorted(set(picks))]
+        combinations.append((year, 'All'))
+        combinations.extend((year, rank) for rank in ranks)
+    return combinations
+
+
+def bench_load_data(app, paths, repeat):
+    results = {}
+    # Cold parses the file; disk reads it back from the on-disk artifact cache, as a restarted worker would
+    raw_load = inspect.unwrap(app.parse_dataset)
+    for name, path in paths.items():
+        results[f'load_data/{name}/cold'] = summarise(measure(lambda: raw_load(path, app.data_versioning.version(path)), repeat, warmup=0))
+        if app.artifact_store() is not None:
+            results[f'load_data/{name}/disk'] = summarise(measure(lambda: app.parse_dataset(path, app.data_versioning.version(path)), repeat))
+        results[f'load_data/{name}/warm'] = summarise(measure(lambda: app.load_data(path), repeat))
+    return results
+
+
+def bench_maps(app, datasets, repeat, ranks_per_year, all_ranks, years=None):
+    results = {}
+    for name, (suffix, legend) in MAP_LAYERS.items():
+        gdf = datasets[name]
+        timings = {'create_map': {'all': [], 'single_rank': []}, 'render_map': {'all': [], 'single_rank': []},
+                   'display_tooltip_info': {'single_rank': []}}
+        for year, rank in year_rank_combinations(gdf, suffix, ranks_per_year, all_ranks, years):
+            ratio_column, rank_column = f'{year}_{suffix}', f'{year}_rank'
+            kind = 'all' if rank == 'All' else 'single_rank'
+            maps = []
+
+            def build():
+                maps.append(app.create_map(gdf, year, ratio_column, rank_column, rank, legend))
+
+            timings['create_map'][kind] += measure(build, repeat)
+            m = maps[-1]
+            timings['render_map'][kind] += measure(lambda: m.get_root().render(), repeat)
+            if rank != 'All':
+                filtered = gdf[gdf[rank_column] == rank]
+                timings['display_tooltip_info'][kind] += measure(
+                    lambda: app.display_tooltip_info(filtered, year, ratio_column), repeat)
+        for stage, kinds in timings.items():
+            for kind, values in kinds.items():
+                if values:
+                    results[f'{stage}/{name}/{kind}'] = summarise(values)
+    return results
+
+
+def _shipped_bytes(rerun):
+    return sum(recorded.attrs.get('payload_bytes') or 0 for recorded in rerun.spans if recorded.name == 'st_folium')
+
+
+# Drop the maps the tabs keep between reruns (session_map), as a widget change that alters the map would
+def _forget_session_maps(app):
+    for key in [key for key in app.st.session_state if str(key).endswith('_built')]:
+        del app.st.session_state[key]
+
+
+# One widget change on the Data Visualization page: rebuilding every tab (a whole-script rerun)
+# against rebuilding only the fragment of the tab that owns the widget, and a click on that tab's map.
+# The food swamp tab joins its two tables once per file version, so with `paths` it reads them through views
+# over the files, as the page passes them; given only frames it would redo the join on every rerun
+def bench_interactions(app, datasets, repeat, paths=None):
+    renderers = {name: inspect.unwrap(getattr(app, function)) for name, (function, _) in VISUALIZATION_TABS.items()}
+    views = {name: borough_partitions.BoroughView(name, {borough_partitions.KINGS: path}, app.load_data)
+             for name, path in (paths or {}).items()}
+    inputs = {name: [datasets[dataset] for dataset in dataset_names] for name, (_, dataset_names) in VISUALIZATION_TABS.items()}
+    if views:
+        inputs['food_swamp'] = [views[dataset] for dataset in VISUALIZATION_TABS['food_swamp'][1]]
+    results = {}
+    for name in VISUALIZATION_TABS:
+        for scope, tab_names in {'full_page': list(renderers), 'fragment': [name], 'map_click': [name]}.items():
+            def interact(measure_payloads=False):
+                if scope != 'map_click':
+                    _forget_session_maps(app)
+                instrumentation.begin_rerun(f'{name}/{scope}', measure_payloads)
+                for tab_name in tab_names:
+                    renderers[tab_name](*inputs[tab_name])
+                return instrumentation.end_rerun()
+
+            reruns = []
+            timings = measure(lambda: reruns.append(interact()), repeat)
+            summary = summarise(timings)
+            summary['cpu_median_ms'] = statistics.median(rerun.cpu_seconds for rerun in reruns[-repeat:]) * 1000
+            # Payload sizes need an extra render, so they come from a separate untimed run
+            summary['payload_bytes'] = _shipped_bytes(interact(measure_payloads=True))
+            results[f'interaction/{name}/{scope}'] = summary
+    return results
+
+
+def _span_payload(rerun, names):
+    return sum(recorded.attrs.get('payload_bytes') or 0 for recorded in rerun.spans if recorded.name in names)
+
+
+# Tract payload of one map: the static create_map, and the interactive map at full extent and zoomed in
+def bench_viewport(app, datasets, repeat, years=None):
+    import map_viewport
+
+    results = {}
+    clip_box = map_viewport.pad_box(NEIGHBOURHOOD_VIEW)
+    for name, (suffix, legend) in MAP_LAYERS.items():
+        gdf = datasets[name]
+        year = min(years) if years else int(layer_columns(gdf, suffix)[0][0][:4])
+        ratio_column, rank_column = f'{year}_{suffix}', f'{year}_rank'
+        variants = {
+            'static': (lambda: app.create_map(gdf, year, ratio_column, rank_column, 'All', legend),
+                       {'create_map.topojson'}),
+            'viewport_full': (lambda: app.create_viewport_map(gdf, year, ratio_column, rank_column, 'All', legend, None, 10),
+                              {'create_viewport_map.topojson'}),
+            'viewport_zoomed': (lambda: app.create_viewport_map(gdf, year, ratio_column, rank_column, 'All', legend, clip_box, 14),
+                                {'create_viewport_map.topojson'}),
+        }
+        for variant, (build, payload_spans) in variants.items():
+            summary = summarise(measure(build, repeat))
+            instrumentation.begin_rerun(variant, measure_payloads=True)
+            build()
+            summary['payload_bytes'] = _span_payload(instrumentation.end_rerun(), payload_spans)
+            results[f'viewport/{name}/{variant}'] = summary
+    return results
+
+
+# Cold tile rendering for the tile server: every tile covering each layer at a low and a high zoom
+def bench_vector_tiles(datasets, repeat, zooms=(10, 14)):
+    import vector_tiles
+
+    results = {}
+    for name, gdf in datasets.items():
+        layer = vector_tiles.TileLayer(name, gdf)
+        for zoom in zooms:
+            tiles = vector_tiles.tiles_covering(layer.bounds, zoom)
+            summary = summarise(measure(lambda: [layer.render(*tile) for tile in tiles], repeat))
+            summary['payload_bytes'] = sum(len(layer.render(*tile)) for tile in tiles)
+            summary['tiles'] = len(tiles)
+            results[f'vector_tiles/{name}/z{zoom}'] = summary
+    return results
+
+
+def bench_heatmap(app, factor, repeat):
+    corr_df = pd.read_csv('dataset_forCorrPlot.csv')
+    corr_df = pd.concat([corr_df] * max(1, int(factor)), ignore_index=True)
+    return {'correlation_heatmap': summarise(measure(lambda: app.create_correlation_heatmap(corr_df), repeat))}
+
+
+def bench_comments(app, factor, repeat, existing=100):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'comments.csv')
+        pd.DataFrame({'Comment': [f'Existing comment {i}' for i in range(existing * max(1, int(factor)))]}).to_csv(path, index=False)
+        return {
+            'comments/write': summarise(measure(lambda: app.save_comment("Benchmark comment", path), repeat)),
+            'comments/read': summarise(measure(lambda: app.load_recent_comments(path), repeat)),
+        }
+
+
+def run_suite(factors=(1, 10), repeat=3, ranks_per_year=3, all_ranks=False, years=None,
+              data_dir=os.path.join('.cache', 'synthetic')):
+    app = _load_app()
+    datasets_by_factor = synthetic_tracts.write_scaled_datasets([f for f in factors if f > 1], data_dir)
+    results = {}
+    for factor in factors:
+        paths = datasets_by_factor.get(factor, synthetic_tracts.SOURCES)
+        print(f"Benchmarking {factor}x ...", file=sys.stderr)
+        stage_results = bench_load_data(app, paths, repeat)
+        datasets = {name: app.load_data(path) for name, path in paths.items()}
+        # The food swamp index is computed from the coverage tables rather than read from a file, so it has no tiles
+        layers = {**datasets, 'food_swamp': app.load_food_swamp(paths['supermarkets'], paths['fast_food'])}
+        stage_results.update(bench_maps(app, layers, repeat, ranks_per_year, all_ranks, years))
+        stage_results.update(bench_interactions(app, datasets, repeat, paths))
+        stage_results.update(bench_viewport(app, layers, repeat, years))
+        stage_results.update(bench_vector_tiles(datasets, repeat))
+        stage_results.update(bench_heatmap(app, factor, repeat))
+        stage_results.update(bench_comments(app, factor, repeat))
+        for stage, summary in stage_results.items():
+            results[f'{stage}@{factor}x'] = summary
+    return {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'factors': list(factors),
+        'results': results,
+    }
+
+
+# Stages whose median got slower than baseline * (1 + tolerance)
+def compare(current, baseline, tolerance=DEFAULT_TOLERANCE, min_delta_ms=MIN_DELTA_MS):
+    regressions = []
+    for name, summary in current['results'].items():
+        reference = baseline.get('results', {}).get(name)
+        if reference is None:
+            continue
+        ratio = summary['median_ms'] / reference['median_ms'] if reference['median_ms'] else float('inf')
+        if ratio > 1 + tolerance and summary['median_ms'] - reference['median_ms'] >= min_delta_ms:
+            regressions.append({'stage': name, 'baseline_ms': reference['median_ms'],
+                                'current_ms': summary['median_ms'], 'ratio': ratio})
+    return sorted(regressions, key=lambda row: row['ratio'], reverse=True)
+
+
+def _write_json(path, payload):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(payload, f, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the app's map and analysis paths.")
+    parser.add_argument('--factors', nargs='+', type=int, default=[1, 10], help="Dataset scale factors, e.g. 1 10 100")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--ranks-per-year', type=int, default=3, help="Ranks sampled per year besides 'All'")
+    parser.add_argument('--all-ranks', action='store_true', help="Benchmark every year/rank combination")
+    parser.add_argument('--years', nargs='+', type=int, help="Limit the map benchmarks to these years (default: every year)")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help="Store this run as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE, help="Allowed slowdown before a stage counts as a regression")
+    args = parser.parse_args(argv)
+
+    with contextlib.redirect_stdout(sys.stderr):
+        current = run_suite(args.factors, args.repeat, args.ranks_per_year, args.all_ranks, args.years)
+    _write_json(args.output, current)
+    for name, summary in current['results'].items():
+        extra = ''
+        if 'cpu_median_ms' in summary:
+            extra += f"   cpu {summary['cpu_median_ms']:>10.2f} ms"
+        if 'payload_bytes' in summary:
+            extra += f"   shipped {summary['payload_bytes'] / 1e6:>7.2f} MB"
+        print(f"{name:<55} median {summary['median_ms']:>10.2f} ms   p95 {summary['p95_ms']:>10.2f} ms{extra}")
+
+    if args.save_baseline:
+        _write_json(args.baseline, current)
+        print(f"\nBaseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one.")
+        return 0
+
+    with open(args.baseline) as f:
+        regressions = compare(current, json.load(f), args.tolerance)
+    if not regressions:
+        print(f"\nNo regressions beyond {args.tolerance:.0%} against {args.baseline}")
+        return 0
+    print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+    for row in regressions:
+        print(f"  {row['stage']:<55} {row['baseline_ms']:.2f} ms -> {row['current_ms']:.2f} ms ({row['ratio']:.2f}x)")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+"""Persistent on-disk cache for derived artifacts, shared across restarts and processes.
+
+``st.cache_data`` and ``st.cache_resource`` live in one process.  After a
+deploy, a restart or on a new replica, every parsed frame, model score and
+statistic is recomputed.  ``ArtifactCache`` keeps those results as pickles
+in a local directory that every worker process (and any replica mounting
+the same storage) reads:
+
+- Keys hash the function's module and name, its code (bytecode, names and
+  constants, including those of nested functions), its default arguments
+  and closure values, its call arguments, the source version of the
+  modules it depends on, and the version of any extra input files
+  (``data_versioning.version``).  The app's cached functions already take
+  a file's version as an argument, so a new data release, or a code change
+  in the function or a listed module, gets new keys.  Stale entries are
+  never read again and age out.
+- Writes go to a temporary file in the same directory and are renamed into
+  place, so a reader never sees half an artifact.  Two processes computing
+  the same artifact both write it, and the last rename wins.
+- A hit touches the entry's modification time, and the directory is kept
+  under ``max_bytes`` by deleting the least recently used entries.  The
+  size check and eviction run under an exclusive ``fcntl`` lock, so
+  concurrent writers never evict the same entries twice.  Without
+  ``fcntl`` (Windows), eviction simply runs unlocked; a reader that loses
+  a race with it finds no file and recomputes.
+- An entry that fails to load (truncated, or pickled by incompatible
+  library versions) is treated as a miss and removed.
+
+Pickles run code when loaded, so the directory must only be writable by
+the app.
+
+Example:
+    python artifact_cache.py .cache/artifacts
+    python artifact_cache.py .cache/artifacts --clear
+"""
+import argparse
+import contextlib
+import functools
+import hashlib
+import importlib.util
+import os
+import pickle
+import tempfile
+
+import data_versioning
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+DEFAULT_DIRECTORY = os.path.join('.cache', 'artifacts')
+DEFAULT_MAX_BYTES = 512 << 20
+# Bump to drop every existing entry (e.g. when the key layout changes)
+FORMAT_VERSION = 2
+_SUFFIX = '.pkl'
+_LOCK_FILE = '.lock'
+
+
+# Source version of a module, found without importing it (None for modules without a source file)
+def module_version(name):
+    spec = importlib.util.find_spec(name)
+    if spec is None or not spec.origin or not os.path.exists(spec.origin):
+        return None
+    return data_versioning.version(spec.origin)
+
+
+# Everything a code object computes with: bytecode, names and constants, nested code objects (lambdas,
+# comprehensions, inner functions) included
+def code_fingerprint(code):
+    return [code.co_code.hex(), code.co_names, [_constant_fingerprint(constant) for constant in code.co_consts]]
+
+
+def _constant_fingerprint(constant):
+    if hasattr(constant, 'co_code'):
+        return code_fingerprint(constant)
+    # `x in {'a', 'b'}` compiles to a frozenset, whose repr order changes with the per-process hash seed
+    if isinstance(constant, frozenset):
+        return sorted(map(repr, constant))
+    return constant
+
+
+# A function's code plus the values it was defined with: default arguments and closure cells. Values enter the
+# key through repr, so a persisted function should close over plain values, not mutable state
+def function_fingerprint(function):
+    closure = [cell.cell_contents for cell in function.__closure__ or ()]
+    return [code_fingerprint(function.__code__), function.__defaults__, function.__kwdefaults__,
+            [function_fingerprint(value) if hasattr(value, '__code__') else value for value in closure]]
+
+
+class ArtifactCache:
+    def __init__(self, directory=DEFAULT_DIRECTORY, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    # Stable key for a function call; `modules` and `files` add their current versions
+    @staticmethod
+    def key(function, args, modules=(), files=()):
+        parts = [FORMAT_VERSION, function.__module__, function.__qualname__, function_fingerprint(function), args,
+                 [(name, module_version(name)) for name in modules], [(path, data_versioning.version(path)) for path in files]]
+        return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}{_SUFFIX}")
+
+    # (True, value) for a stored artifact, (False, None) for a miss
+    def lookup(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            return False, None
+        except Exception:
+            # Truncated or unreadable with the installed libraries: recompute it
+            with contextlib.suppress(OSError):
+                os.remove(path)
+            return False, None
+        # Most recently used first when evicting
+        with contextlib.suppress(OSError):
+            os.utime(path)
+        return True, value
+
+    def store(self, key, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    # Value of `function(*args)`, from the cache or computed and stored
+    def call(self, function, args, modules=(), files=()):
+        key = self.key(function, args, modules, files)
+        found, value = self.lookup(key)
+        if not found:
+            value = function(*args)
+            self.store(key, value)
+        return value
+
+    # (path, bytes, last use) of every entry, least recently used first
+    def entries(self):
+        found = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith(_SUFFIX):
+                    continue
+                path = os.path.join(root, name)
+                with contextlib.suppress(FileNotFoundError):
+                    stat = os.stat(path)
+                    found.append((path, stat.st_size, stat.st_mtime_ns))
+        return sorted(found, key=lambda entry: entry[2])
+
+    @contextlib.contextmanager
+    def _locked(self):
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, _LOCK_FILE), 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    # Delete the least recently used entries until the directory fits max_bytes; returns the bytes freed
+    def evict(self):
+        with self._locked():
+            entries = self.entries()
+            excess = sum(size for _, size, _ in entries) - self.max_bytes
+            freed = 0
+            for path, size, _ in entries:
+                if freed >= excess:
+                    break
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+                    freed += size
+            return freed
+
+    def clear(self):
+        with self._locked():
+            for path, _, _ in self.entries():
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+
+    def status(self):
+        entries = self.entries()
+        return {'directory': self.directory, 'max_bytes': self.max_bytes, 'entries': len(entries),
+                'total_bytes': sum(size for _, size, _ in entries)}
+
+
+# Decorator persisting a function's results in the cache `store()` returns (no caching while it returns None).
+# `modules` name the modules whose code the result depends on; `files` are inputs not passed as arguments
+def persistent(store, modules=(), files=()):
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args):
+            cache = store()
+            if cache is None:
+                return function(*args)
+            return cache.call(function, args, modules, files)
+        return wrapper
+    return decorator
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report on (or clear) a persistent artifact cache directory.")
+    parser.add_argument('directory', nargs='?', default=DEFAULT_DIRECTORY)
+    parser.add_argument('--max-mb', type=int, help="evict least recently used entries down to this size")
+    parser.add_argument('--clear', action='store_true', help="delete every entry")
+    args = parser.parse_args(argv)
+
+    cache = ArtifactCache(args.directory, DEFAULT_MAX_BYTES if args.max_mb is None else args.max_mb << 20)
+    if args.clear:
+        cache.clear()
+    elif args.max_mb is not None:
+        print(f"Freed {cache.evict() / 1e6:.1f} MB")
+    status = cache.status()
+    print(f"{status['directory']}: {status['entries']} entries, {status['total_bytes'] / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""Chunked ingest of the USDA Food Access Research Atlas into a GeoParquet store.
+
+The app's tract tables are a Kings County slice of the atlas joined to
+census tract shapes.  ``ingest`` builds the same kind of table for any set
+of counties straight from the national atlas file (~72k tracts) and a local
+tract boundary file, in bounded memory:
+
+- Rows are filtered before pandas parses them.  The atlas is keyed by the
+  11-digit ``CensusTract`` GEOID, whose first five digits are the state
+  and county FIPS codes, so a line is kept only if it starts with a
+  requested prefix.
+- Columns are projected during the parse (``usecols``) and the rest is
+  read in ``chunksize`` rows at a time.
+- Tract shapes are read with the same state/county filter pushed into
+  the reader (an OGR ``where`` clause for shapefiles, GeoPackages and
+  GeoJSON).
+- Each joined chunk is appended to the output as a Parquet row group.  The
+  GeoParquet metadata (CRS, bbox, geometry types) is written once at the
+  end, and ``geopandas.read_parquet`` loads the store directly.
+
+Progress (bytes read, tracts kept) goes to a callback, printed by the CLI.
+
+Example:
+    python atlas_ingest.py --atlas FoodAccessResearchAtlasData2019.csv \\
+        --tracts cb_2019_36_tract_500k.zip --nyc --output .cache/atlas/nyc.parquet
+"""
+import argparse
+import io
+import json
+import os
+import re
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ATLAS_KEY = 'CensusTract'
+DEFAULT_CHUNKSIZE = 10_000
+NYC_STATE = '36'
+# The five boroughs: Bronx, Kings (Brooklyn), New York (Manhattan), Queens, Richmond (Staten Island)
+NYC_COUNTIES = {'005': 'Bronx', '047': 'Kings', '061': 'New York', '081': 'Queens', '085': 'Richmond'}
+# TIGER tract attributes the app's tables start with, in their order
+TRACT_COLUMNS = ['STATEFP', 'COUNTYFP', 'TRACTCE', 'AFFGEOID', 'GEOID', 'NAME', 'LSAD', 'ALAND', 'AWATER']
+INTEGER_TRACT_COLUMNS = ['STATEFP', 'COUNTYFP', 'TRACTCE', 'GEOID']
+# Yearly coverage columns in the app's tables; they do not come from the atlas
+_YEARLY_COLUMN = re.compile(r'^\d{4}_')
+
+
+# GEOID prefixes ('SS' or 'SSCCC') for a state and optional counties
+def geoid_prefixes(state=None, counties=None):
+    if state is None:
+        return ()
+    state = str(state).zfill(2)
+    if not counties:
+        return (state,)
+    return tuple(state + str(county).zfill(3) for county in counties)
+
+
+# Atlas columns the app's tract tables carry (everything after the TIGER columns and geometry, before the yearly ones)
+def default_atlas_columns(template="supermarkets.csv"):
+    header = pd.read_csv(template, nrows=0).columns
+    skip = set(TRACT_COLUMNS) | {'geometry'}
+    return [column for column in header
+            if column not in skip and not column.startswith('Unnamed') and not _YEARLY_COLUMN.match(column)]
+
+
+# Text stream over a CSV that yields the header and only the lines whose first field starts with a prefix.
+# The atlas stores GEOIDs as numbers, so states 01-09 lose their leading zero; each prefix also matches unpadded
+class PrefixFilteredLines(io.TextIOBase):
+    def __init__(self, handle, prefixes):
+        self._handle = handle
+        unpadded = [prefix.lstrip('0') for prefix in prefixes]
+        self._prefixes = tuple(dict.fromkeys([*prefixes, *(prefix for prefix in unpadded if prefix)]))
+        self._header = True
+        self._buffer = ''
+        # latin-1 is one byte per character, so this is also the byte offset into the file
+        self.bytes_read = 0
+        self.lines_kept = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        parts, length = [self._buffer], len(self._buffer)
+        for line in self._handle:
+            self.bytes_read += len(line)
+            if self._header:
+                self._header = False
+            elif self._prefixes and not line.lstrip('"').startswith(self._prefixes):
+                continue
+            else:
+                self.lines_kept += 1
+            parts.append(line)
+            length += len(line)
+            if 0 <= size <= length:
+                break
+        data = ''.join(parts)
+        if size < 0:
+            size = len(data)
+        out, self._buffer = data[:size], data[size:]
+        return out
+
+
+# Atlas rows for the prefixes in DataFrame chunks, keyed by an 11-digit GEOID string
+def read_atlas_chunks(path, prefixes=(), columns=None, chunksize=DEFAULT_CHUNKSIZE, progress=None):
+    total = os.path.getsize(path)
+    with open(path, newline='', encoding='latin-1') as handle:
+        header = pd.read_csv(handle, nrows=0).columns
+        if header[0] != ATLAS_KEY:
+            raise ValueError(f"Expected '{ATLAS_KEY}' as the first atlas column, found '{header[0]}'")
+        handle.seek(0)
+        wanted = None if columns is None else {ATLAS_KEY, *columns}
+        stream = PrefixFilteredLines(handle, prefixes)
+        reader = pd.read_csv(stream, chunksize=chunksize, dtype={ATLAS_KEY: str},
+                             usecols=None if wanted is None else (lambda column: column in wanted))
+        for chunk in reader:
+            chunk[ATLAS_KEY] = chunk[ATLAS_KEY].str.zfill(11)
+            if prefixes:
+                # The exact filter: unpadded prefixes can let through lines of other states (e.g. '1001' for 10010...)
+                chunk = chunk[chunk[ATLAS_KEY].str.startswith(prefixes)]
+            if progress is not None:
+                progress(stream.bytes_read, total, stream.lines_kept)
+            yield chunk
+
+
+def _ogr_where(fields, state, counties):
+    if state is None or 'STATEFP' not in fields:
+        return None
+    where = f"STATEFP = '{str(state).zfill(2)}'"
+    if counties and 'COUNTYFP' in fields:
+        where += " AND COUNTYFP IN ({})".format(', '.join(f"'{str(county).zfill(3)}'" for county in counties))
+    return where
+
+
+# Tract shapes (TIGER attributes + geometry, EPSG:4326) for the prefixes, keyed by an 11-digit GEOID string
+def read_tract_geometries(path, prefixes=(), state=None, counties=None):
+    import geopandas as gpd
+    from shapely import wkt
+
+    if path.endswith('.csv'):
+        # The app's own tract tables (WKT geometry) also work as a shape source
+        data = pd.read_csv(path, usecols=lambda column: column in TRACT_COLUMNS or column == 'geometry')
+        tracts = gpd.GeoDataFrame(data, geometry=data['geometry'].map(wkt.loads), crs=4326)
+    else:
+        import pyogrio
+
+        fields = list(pyogrio.read_info(path)['fields'])
+        tracts = gpd.read_file(path, columns=[column for column in TRACT_COLUMNS if column in fields],
+                               where=_ogr_where(fields, state, counties))
+        tracts = tracts.to_crs(4326) if tracts.crs is not None else tracts.set_crs(4326)
+    tracts['GEOID'] = tracts['GEOID'].astype(str).str.zfill(11)
+    if prefixes:
+        tracts = tracts[tracts['GEOID'].str.startswith(prefixes)]
+    return tracts
+
+
+def _geo_metadata(crs, bounds, geometry_types):
+    return {
+        'version': '1.0.0',
+        'primary_column': 'geometry',
+        'columns': {'geometry': {
+            'encoding': 'WKB',
+            'geometry_types': sorted(geometry_types),
+            'crs': crs.to_json_dict(),
+            'bbox': [float(value) for value in bounds],
+        }},
+    }
+
+
+# Tract table in the app's column layout: TIGER columns, geometry, then the atlas columns.
+# Keys become nullable integers and other numeric columns floats, so every chunk has the same schema
+def _app_layout(joined, atlas_columns):
+    for column in INTEGER_TRACT_COLUMNS + [ATLAS_KEY]:
+        if column in joined.columns:
+            joined[column] = pd.to_numeric(joined[column], errors='coerce').astype('Int64')
+    for column in atlas_columns:
+        if column != ATLAS_KEY and pd.api.types.is_numeric_dtype(joined[column]):
+            joined[column] = joined[column].astype('float64')
+    leading = [column for column in TRACT_COLUMNS if column in joined.columns]
+    return joined[leading + ['geometry'] + [column for column in atlas_columns if column in joined.columns]]
+
+
+# Stream the atlas, join each chunk to its tract shapes and append it to a GeoParquet store; returns a summary
+def ingest(atlas_path, tracts_path, output, state=None, counties=None, columns=None,
+           chunksize=DEFAULT_CHUNKSIZE, progress=None):
+    import geopandas as gpd
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    start = time.perf_counter()
+    prefixes = geoid_prefixes(state, counties)
+    tracts = read_tract_geometries(tracts_path, prefixes, state, counties).set_index('GEOID', drop=False)
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    temporary = f"{output}.tmp"
+
+    writer, schema = None, None
+    rows, unmatched = 0, 0
+    bounds = np.array([np.inf, np.inf, -np.inf, -np.inf])
+    geometry_types = set()
+    try:
+        for chunk in read_atlas_chunks(atlas_path, prefixes, columns, chunksize, progress):
+            atlas_columns = [column for column in chunk.columns if column != ATLAS_KEY]
+            matched = chunk[ATLAS_KEY].isin(tracts.index)
+            unmatched += int((~matched).sum())
+            chunk = chunk[matched]
+            if chunk.empty:
+                continue
+            shapes = tracts.loc[chunk[ATLAS_KEY]].reset_index(drop=True)
+            joined = gpd.GeoDataFrame(pd.concat([shapes, chunk.reset_index(drop=True)], axis=1),
+                                      geometry='geometry', crs=tracts.crs)
+            joined = _app_layout(joined, [ATLAS_KEY] + atlas_columns)
+            table = pa.table(joined.to_arrow(index=False, geometry_encoding='WKB'))
+            if writer is None:
+                schema = table.schema
+                writer = pq.ParquetWriter(temporary, schema)
+            writer.write_table(table.cast(schema))
+            rows += len(joined)
+            chunk_bounds = joined.total_bounds
+            bounds = np.concatenate([np.minimum(bounds[:2], chunk_bounds[:2]), np.maximum(bounds[2:], chunk_bounds[2:])])
+            geometry_types.update(joined.geom_type.dropna().unique())
+        if writer is None:
+            raise ValueError("No atlas rows matched the requested state/counties and tract shapes")
+        writer.add_key_value_metadata({'geo': json.dumps(_geo_metadata(tracts.crs, bounds, geometry_types))})
+        writer.close()
+        os.replace(temporary, output)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+    return {'output': output, 'rows': rows, 'unmatched_atlas_rows': unmatched,
+            'tracts_without_atlas_row': int(len(tracts) - rows), 'seconds': time.perf_counter() - start}
+
+
+def _print_progress(read, total, kept):
+    print(f"\r{read / 1e6:8.1f} / {total / 1e6:.1f} MB read, {kept:,} tracts kept", end='', file=sys.stderr, flush=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream the USDA Food Access Research Atlas into a GeoParquet tract store.")
+    parser.add_argument('--atlas', required=True, help="national atlas CSV (CensusTract first)")
+    parser.add_argument('--tracts', required=True, help="tract shapes: shapefile/zip, GeoPackage, GeoJSON or a WKT CSV")
+    parser.add_argument('--output', default=os.path.join('.cache', 'atlas', 'tracts.parquet'))
+    parser.add_argument('--state', help="state FIPS code, e.g. 36")
+    parser.add_argument('--counties', nargs='+', help="county FIPS codes within --state, e.g. 047")
+    parser.add_argument('--nyc', action='store_true', help="shorthand for the five NYC counties")
+    parser.add_argument('--columns', nargs='+', help="atlas columns to keep (default: those in supermarkets.csv)")
+    parser.add_argument('--all-columns', action='store_true', help="keep every atlas column")
+    parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args(argv)
+
+    state, counties = args.state, args.counties
+    if args.nyc:
+        state, counties = NYC_STATE, list(NYC_COUNTIES)
+    columns = None if args.all_columns else (args.columns or default_atlas_columns())
+    summary = ingest(args.atlas, args.tracts, args.output, state, counties, columns, args.chunksize, _print_progress)
+    print(file=sys.stderr)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
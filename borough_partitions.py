@@ -0,0 +1,219 @@
+"""Borough-partitioned tract datasets.
+
+With all five boroughs in the stores, loading a whole dataset at once no
+longer fits the app's memory budget.  ``write_partitions`` splits a tract
+table (a WKT CSV or a GeoParquet store from ``atlas_ingest.py``) into one
+GeoParquet file per county, ``<directory>/COUNTYFP=047.parquet``.
+
+The app reads partitions through its shared dataset cache, one at a time:
+
+- ``BoroughView`` is a dataset restricted to the selected boroughs.  It
+  holds paths, not frames.  Its helpers (``frames``, ``unique``,
+  ``values``, ``select``) stream the partitions, so a view across every
+  borough never concatenates the tract tables.
+- ``PartitionBudget`` keeps LRU accounts of the loaded partitions.  Once
+  they exceed the byte budget, or the machine runs low on free memory, it
+  names the least recently used partitions to drop from the cache.  A
+  session still drawing an evicted partition keeps its frame; the next
+  rerun that needs it reads it again.
+
+Example:
+    python borough_partitions.py .cache/atlas/nyc.parquet --output .cache/partitions/supermarkets
+    python borough_partitions.py LILAZones_geo.csv --county 047 --output .cache/partitions/lila
+"""
+import argparse
+import collections
+import os
+import re
+import threading
+
+import pandas as pd
+
+from atlas_ingest import NYC_COUNTIES
+
+KINGS = '047'
+PARTITION_COLUMN = 'COUNTYFP'
+_PARTITION_FILE = re.compile(r'^COUNTYFP=(\d{3})\.parquet$')
+
+
+def borough_name(county):
+    return NYC_COUNTIES.get(county, f"County {county}")
+
+
+# Three-digit county codes of a tract table: COUNTYFP, else digits 3-5 of the GEOID
+def county_codes(gdf, default=None):
+    if PARTITION_COLUMN in gdf.columns:
+        return gdf[PARTITION_COLUMN].astype('Int64').astype(str).str.zfill(3)
+    if 'GEOID' in gdf.columns:
+        return gdf['GEOID'].astype('Int64').astype(str).str.zfill(11).str[2:5]
+    if default is None:
+        raise ValueError("The table has no COUNTYFP or GEOID column; pass a default county")
+    return pd.Series(str(default).zfill(3), index=gdf.index)
+
+
+def read_tracts(path):
+    import geopandas as gpd
+    from shapely import wkt
+
+    if path.endswith('.parquet'):
+        return gpd.read_parquet(path).to_crs(epsg=4326)
+    data = pd.read_csv(path)
+    return gpd.GeoDataFrame(data, geometry=data['geometry'].map(wkt.loads), crs=4326)
+
+
+def partition_path(directory, county):
+    return os.path.join(directory, f"{PARTITION_COLUMN}={county}.parquet")
+
+
+# Split a tract table into one GeoParquet file per county; returns {county: path}
+def write_partitions(source, directory, default_county=None):
+    gdf = read_tracts(source)
+    counties = county_codes(gdf, default_county)
+    os.makedirs(directory, exist_ok=True)
+    paths = {}
+    for county, positions in gdf.groupby(counties.values, sort=True).indices.items():
+        path = partition_path(directory, county)
+        temporary = f"{path}.tmp"
+        gdf.iloc[positions].to_parquet(temporary, index=False)
+        os.replace(temporary, path)
+        paths[county] = path
+    return paths
+
+
+# {county: path} of the partitions in a directory; empty when it has none
+def partition_paths(directory):
+    if not os.path.isdir(directory):
+        return {}
+    found = (_PARTITION_FILE.match(name) for name in sorted(os.listdir(directory)))
+    return {match.group(1): os.path.join(directory, match.group(0)) for match in found if match}
+
+
+# A dataset restricted to some boroughs; partitions are loaded (through `load`) only while they are read
+class BoroughView:
+    def __init__(self, name, paths, load):
+        self.name = name
+        self.paths = dict(paths)
+        self._load = load
+
+    @property
+    def counties(self):
+        return list(self.paths)
+
+    # Column names; every partition of a dataset has the same ones
+    @property
+    def columns(self):
+        for _, gdf in self.frames():
+            return gdf.columns
+        return pd.Index([])
+
+    def frames(self):
+        for county, path in self.paths.items():
+            yield county, self._load(path)
+
+    # (county, rows) of each partition with rows left after `predicate(gdf)` (a boolean mask)
+    def select(self, predicate=None):
+        for county, gdf in self.frames():
+            if predicate is not None:
+                gdf = gdf[predicate(gdf)]
+            if not gdf.empty:
+                yield county, gdf
+
+    # One column over the selected rows of every partition (no geometry is copied)
+    def values(self, column, predicate=None):
+        parts = [gdf[column] for _, gdf in self.select(predicate)]
+        return pd.concat(parts, ignore_index=True) if parts else pd.Series(dtype=float)
+
+    # Distinct values of a column over the selected rows, in first-seen order across the partitions
+    def unique(self, column, predicate=None):
+        seen = {}
+        for _, gdf in self.select(predicate):
+            seen.update(dict.fromkeys(gdf[column].dropna().unique().tolist()))
+        return list(seen)
+
+    # Read every partition once (filling the cache); returns the view
+    def load(self):
+        for _ in self.frames():
+            pass
+        return self
+
+    def __len__(self):
+        return sum(len(gdf) for _, gdf in self.frames())
+
+
+# A plain GeoDataFrame as a single-partition view, so map builders accept either
+def as_view(data, name='dataset'):
+    if isinstance(data, BoroughView):
+        return data
+    return BoroughView(name, {KINGS: None}, lambda path: data)
+
+
+# Approximate resident size of a tract frame: its columns plus the coordinates behind each geometry
+def frame_bytes(gdf):
+    import shapely
+
+    geometry = gdf.geometry.values
+    columns = gdf.drop(columns=gdf.geometry.name).memory_usage(deep=True).sum()
+    return int(columns + shapely.get_num_coordinates(geometry).sum() * 16 + len(geometry) * 100)
+
+
+# Bytes of physical memory the OS reports free, or None where it cannot say
+def available_memory():
+    try:
+        return os.sysconf('SC_AVPHYS_PAGES') * os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+# LRU accounts of loaded partitions under a byte budget and a free-memory floor
+class PartitionBudget:
+    def __init__(self, max_bytes, min_free_bytes=0):
+        self.max_bytes = max_bytes
+        self.min_free_bytes = min_free_bytes
+        self._sizes = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def total_bytes(self):
+        return sum(self._sizes.values())
+
+    def _under_pressure(self):
+        if self.total_bytes > self.max_bytes:
+            return True
+        free = available_memory() if self.min_free_bytes else None
+        return free is not None and free < self.min_free_bytes
+
+    # Record a use of `key` (sized on first use); returns the least recently used keys to evict, never `key` itself
+    def admit(self, key, gdf):
+        with self._lock:
+            if key in self._sizes:
+                self._sizes.move_to_end(key)
+                return []
+            self._sizes[key] = frame_bytes(gdf)
+            evicted = []
+            while len(self._sizes) > 1 and self._under_pressure():
+                oldest, _ = self._sizes.popitem(last=False)
+                evicted.append(oldest)
+            return evicted
+
+    def discard(self, key):
+        with self._lock:
+            self._sizes.pop(key, None)
+
+    def status(self):
+        with self._lock:
+            return {'max_bytes': self.max_bytes, 'total_bytes': self.total_bytes, 'entries': list(self._sizes.items())}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Split a tract table into one GeoParquet file per county (COUNTYFP).")
+    parser.add_argument('source', help="WKT CSV or GeoParquet tract table")
+    parser.add_argument('--output', required=True, help="partition directory, e.g. .cache/partitions/supermarkets")
+    parser.add_argument('--county', help="county code for tables without COUNTYFP or GEOID (e.g. 047 for LILAZones_geo.csv)")
+    args = parser.parse_args(argv)
+
+    for county, path in write_partitions(args.source, args.output, args.county).items():
+        print(f"{borough_name(county):<10} {path} ({os.path.getsize(path) / 1e3:.0f} kB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Summary statistics and histogram bins for every numeric column of a tract table.
+
+The Data Analysis page lets a visitor explore any of the ~170 numeric
+columns of the tract table.  Calling ``describe()`` and drawing a histogram
+for each selection would redo the work on every rerun.  ``compute``
+instead does all columns at once, in a few vectorized NumPy passes over
+the table's float matrix:
+
+- The summary is what ``DataFrame.describe`` reports (count, mean, sample
+  std, min, quartiles, max), plus the number of missing values.
+- Each histogram has ``bins`` fixed-width bins between the column's min and
+  max (right edge inclusive), like ``numpy.histogram``.  The counts of all
+  columns come from one ``np.bincount``.
+
+The app caches one ``ColumnStats`` per file version.  A column switch is
+then a dictionary lookup, and the page draws the bins with Plotly in the
+browser.
+
+Example:
+    python column_stats.py supermarkets.csv --column "PCTGQTRS" "2017_supermarket coverage ratio"
+"""
+import argparse
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from atlas_ingest import ATLAS_KEY, INTEGER_TRACT_COLUMNS
+
+DEFAULT_BINS = 30
+SUMMARY_FIELDS = ['count', 'missing', 'mean', 'std', 'min', '25%', '50%', '75%', 'max']
+
+
+# Numeric columns of a CSV or (Geo)Parquet table; tract keys, the CSV's index column and geometry are left out
+def read_numeric(path):
+    frame = pd.read_parquet(path) if path.endswith('.parquet') else pd.read_csv(path)
+    numeric = frame.select_dtypes('number')
+    keys = set(INTEGER_TRACT_COLUMNS) | {ATLAS_KEY}
+    return numeric.drop(columns=[column for column in numeric.columns if column in keys or column.startswith('Unnamed')])
+
+
+# Precomputed statistics of a table; read-only, so one instance can be shared by every session
+class ColumnStats:
+    def __init__(self, summary, edges, counts):
+        # One row per column, SUMMARY_FIELDS as columns
+        self.summary = summary
+        # column -> (bin edges, bin counts)
+        self.histograms = {column: (edges[i], counts[i]) for i, column in enumerate(summary.index)}
+
+    @property
+    def columns(self):
+        return list(self.summary.index)
+
+    def describe(self, column):
+        return self.summary.loc[column]
+
+    def histogram(self, column):
+        return self.histograms[column]
+
+
+# Bin counts of every column (one row each) for per-column fixed edges, with numpy.histogram's edge handling
+def _bin_counts(values, valid, low, high, bins):
+    low, high = low[:, None], high[:, None]
+    width = (high - low) / bins
+    edges = low + width * np.arange(bins + 1)
+    edges[:, -1] = high[:, 0]
+    with np.errstate(invalid='ignore'):
+        # The max lands in the last bin
+        position = np.clip(np.floor((values - low) / width), 0, bins - 1)
+        # Rounding can leave a value one bin off the edges it falls between (edge k is low + width * k)
+        position -= values < low + width * position
+        position += (values >= low + width * (position + 1)) & (position < bins - 1)
+    flat = (position + np.arange(len(values))[:, None] * bins)[valid].astype(np.int64)
+    return edges, np.bincount(flat, minlength=len(values) * bins).reshape(len(values), bins)
+
+
+# Summary statistics and `bins`-bin histograms of every numeric column of a frame
+def compute(frame, bins=DEFAULT_BINS):
+    numeric = frame.select_dtypes('number')
+    # One row per column, so every pass below runs along contiguous memory
+    values = np.ascontiguousarray(numeric.to_numpy(dtype=float, na_value=np.nan).T)
+    valid = np.isfinite(values)
+    values[~valid] = np.nan
+    count = valid.sum(axis=1)
+    with warnings.catch_warnings():
+        # All-missing columns get NaN statistics and empty histograms
+        warnings.simplefilter('ignore', RuntimeWarning)
+        mean = np.nanmean(values, axis=1)
+        std = np.nanstd(values, axis=1, ddof=1)
+        quantiles = np.nanpercentile(values, [0, 25, 50, 75, 100], axis=1)
+    summary = pd.DataFrame(np.column_stack([count, len(numeric) - count, mean, std, *quantiles]),
+                           index=numeric.columns, columns=SUMMARY_FIELDS)
+
+    low, high = np.nan_to_num(quantiles[0]), np.nan_to_num(quantiles[-1])
+    # A constant column gets a unit-wide range around its value, as numpy.histogram does
+    constant = low == high
+    low, high = np.where(constant, low - 0.5, low), np.where(constant, high + 0.5, high)
+    edges, counts = _bin_counts(values, valid, low, high, bins)
+    return ColumnStats(summary, edges, counts)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summary statistics and histogram bins of a tract table's numeric columns.")
+    parser.add_argument('path', nargs='?', default='supermarkets.csv', help="CSV or GeoParquet tract table")
+    parser.add_argument('--column', nargs='+', help="print the histogram of these columns")
+    parser.add_argument('--bins', type=int, default=DEFAULT_BINS)
+    args = parser.parse_args(argv)
+
+    stats = compute(read_numeric(args.path), args.bins)
+    with pd.option_context('display.max_rows', None, 'display.max_columns', None, 'display.width', 160):
+        print(stats.summary.round(3))
+    for column in args.column or []:
+        edges, counts = stats.histogram(column)
+        print(f"\n{column}")
+        for left, right, count in zip(edges[:-1], edges[1:], counts):
+            print(f"  [{left:12.4g}, {right:12.4g})  {count}")
+
+
+if __name__ == "__main__":
+    main()
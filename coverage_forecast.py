@@ -0,0 +1,223 @@
+"""Gap filling and forecasts for the yearly coverage series of every tract.
+
+The coverage tables run 2003-2015 plus 2017: there is no 2016 column and
+nothing after 2017.  ``extend`` adds the missing years to a table in one
+batch over its (tracts x years) matrix:
+
+- Ratios are residents per outlet, 0 where a tract has none, so they jump
+  to 0 and back as stores open and close.  The models work on the
+  reciprocal, outlets per resident, which moves smoothly through "no
+  outlet" (0).  Results are turned back into ratios at the end.  A
+  forecast below the lowest rate any tract has ever had counts as no
+  outlet (ratio 0).
+- Years missing inside the series (2016) are interpolated linearly between
+  the neighbouring years.
+- Later years get simple exponential smoothing per tract.  The smoothing
+  factor of each tract is picked from a grid by its one-step-ahead squared
+  error; every tract and every grid value runs in the same array pass,
+  one step per year.  Store counts change in steps, so the forecast is the
+  tract's smoothed level and does not extrapolate a trend eight years out.
+  Each forecast year gets an ``INTERVAL`` prediction interval,
+  ``level +/- z * sigma * sqrt(1 + (h - 1) * alpha^2)`` for horizon ``h``.
+  The interval is kept as ratio columns ``{year}_{suffix} low`` and
+  ``{year}_{suffix} high``; a missing high bound means the interval
+  reaches "no outlet".
+- New years are ranked the way the table ranks its real years: the
+  direction is read off the data, ties share the lowest rank, and tracts
+  without an outlet are 'no rank'.
+
+The extended frame records each year's kind (observed, imputed or
+forecast) in ``frame.attrs['coverage_years']``.  The app computes it once
+per data version and marks the new years on its year sliders; frames
+that did not come from a file are extended once per object
+(``extended_for``), cached weakly like the geometry tiers.
+
+Example:
+    python coverage_forecast.py supermarkets.csv --through 2025 --tract 57800
+"""
+import argparse
+import re
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+COVERAGE_PATTERN = re.compile(r'^(\d{4})_(.*coverage ratio)$', re.IGNORECASE)
+FORECAST_THROUGH = 2025
+# Two-sided coverage of the forecast intervals and its normal quantile
+INTERVAL = 0.8
+_INTERVAL_Z = 1.2815515655446004
+# Smoothing factors tried for every tract
+ALPHAS = np.linspace(0.05, 1.0, 20)
+OBSERVED, IMPUTED, FORECAST = 'observed', 'imputed', 'forecast'
+NO_RANK = 'no rank'
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+# Years of a table's `{year}_{suffix}` columns
+def coverage_years(frame, suffix):
+    return sorted(int(column[:4]) for column in frame.columns if column.endswith(f'_{suffix}'))
+
+
+# The coverage suffix of a table ('supermarket coverage ratio') and its years; (None, []) for other tables
+def coverage_series(frame):
+    years = {}
+    for column in frame.columns:
+        match = COVERAGE_PATTERN.match(column)
+        if match and f'{match.group(1)}_rank' in frame.columns:
+            years.setdefault(match.group(2), []).append(int(match.group(1)))
+    if not years:
+        return None, []
+    suffix = max(years, key=lambda name: len(years[name]))
+    return suffix, sorted(years[suffix])
+
+
+# Kind of each year of an extended frame's coverage series (every year is observed in a plain table)
+def year_kinds(frame):
+    kinds = frame.attrs.get('coverage_years')
+    if kinds is not None:
+        return kinds
+    return {year: OBSERVED for year in coverage_series(frame)[1]}
+
+
+def year_label(year, kinds):
+    kind = kinds.get(year, OBSERVED)
+    return f"{year}" if kind == OBSERVED else f"{year} ({kind})"
+
+
+# Outlets per resident from a ratio matrix (residents per outlet, 0 for none); shared by the food swamp index
+# and the hot spot statistics
+def per_resident(ratios):
+    with np.errstate(divide='ignore'):
+        return np.where(ratios > 0, 1 / ratios, 0.0)
+
+
+# Ratios from outlets per resident; rates below `floor` (or NaN) are no outlet (0)
+def to_ratios(rates, floor):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(rates >= floor, 1 / rates, 0.0)
+
+
+# Columns for every year from the first to the last, with gaps interpolated linearly (the series' rows are tracts)
+def fill_gaps(series, years):
+    full = np.arange(years[0], years[-1] + 1)
+    right = np.searchsorted(years, full).clip(1, len(years) - 1)
+    weight = ((full - np.asarray(years)[right - 1]) / np.diff(years)[right - 1]).clip(0, 1)
+    return series[:, right - 1] * (1 - weight) + series[:, right] * weight, full
+
+
+# Simple exponential smoothing of every row at once; returns each row's final level, smoothing factor and
+# one-step-ahead error standard deviation, the factor picked from `alphas` by squared error
+def smooth(series, alphas=ALPHAS):
+    alphas = np.asarray(alphas)[:, None]
+    level = np.broadcast_to(series[:, 0], (len(alphas), len(series))).copy()
+    errors = np.zeros_like(level)
+    for step in range(1, series.shape[1]):
+        error = series[:, step] - level
+        errors += error ** 2
+        level += alphas * error
+    best = errors.argmin(axis=0)
+    rows = np.arange(len(series))
+    sigma = np.sqrt(errors[best, rows] / max(series.shape[1] - 1, 1))
+    return level[best, rows], alphas[best, 0], sigma
+
+
+# Point forecasts and interval bounds (rows x horizon) for the next `horizon` steps of every row
+def forecast(series, horizon, alphas=ALPHAS):
+    level, alpha, sigma = smooth(series, alphas)
+    steps = np.arange(1, horizon + 1)
+    spread = _INTERVAL_Z * sigma[:, None] * np.sqrt(1 + (steps - 1) * alpha[:, None] ** 2)
+    mean = np.repeat(level[:, None], horizon, axis=1)
+    return mean, np.maximum(mean - spread, 0), mean + spread
+
+
+# Whether rank 1 goes to the highest ratio (fast food) or the lowest (supermarkets), read off the real ranks
+def ranks_descending(frame, ratio_column, rank_column):
+    ranks = pd.to_numeric(frame[rank_column], errors='coerce')
+    ranked = ranks.notna()
+    if ranked.sum() < 2:
+        return False
+    return ranks[ranked].corr(frame.loc[ranked, ratio_column].astype(float)) < 0
+
+
+# Rank labels of every column of a ratio matrix at once; tracts without an outlet are 'no rank'
+def rank_labels(ratios, descending):
+    ranks = pd.DataFrame(np.where(ratios > 0, ratios, np.nan)).rank(method='min', ascending=not descending).to_numpy()
+    return np.where(np.isnan(ranks), NO_RANK, np.nan_to_num(ranks).astype(np.int64).astype(str))
+
+
+# The table with its missing years interpolated and `through` forecast, plus their ranks and intervals.
+# Tables without a coverage series come back unchanged
+def extend(frame, through=FORECAST_THROUGH):
+    suffix, years = coverage_series(frame)
+    if suffix is None:
+        return frame
+    rates = per_resident(frame[[f'{year}_{suffix}' for year in years]].to_numpy(dtype=float))
+    floor = rates[rates > 0].min() if (rates > 0).any() else np.inf
+    filled, full = fill_gaps(rates, years)
+    imputed = [int(year) for year in full if year not in years]
+    future = list(range(int(full[-1]) + 1, through + 1))
+    mean, low, high = forecast(filled, len(future))
+
+    new_years = imputed + future
+    ratios = np.column_stack([to_ratios(filled[:, np.searchsorted(full, imputed)], floor), to_ratios(mean, floor)])
+    latest = f'{years[-1]}'
+    ranks = rank_labels(ratios, ranks_descending(frame, f'{latest}_{suffix}', f'{latest}_rank'))
+    columns = {}
+    for position, year in enumerate(new_years):
+        columns[f'{year}_{suffix}'] = ratios[:, position]
+        columns[f'{year}_rank'] = ranks[:, position]
+    # Faster outlet rates mean fewer residents per outlet, so the high rate bound gives the low ratio
+    for position, year in enumerate(future):
+        columns[f'{year}_{suffix} low'] = to_ratios(high[:, position], floor)
+        columns[f'{year}_{suffix} high'] = np.where(low[:, position] >= floor, to_ratios(low[:, position], floor), np.nan)
+    extended = pd.concat([frame, pd.DataFrame(columns, index=frame.index)], axis=1)
+    kinds = {year: OBSERVED for year in years}
+    kinds.update({year: IMPUTED for year in imputed})
+    kinds.update({year: FORECAST for year in future})
+    extended.attrs['coverage_years'] = dict(sorted(kinds.items()))
+    return extended
+
+
+# Extended copy of a loaded frame, built on first use and dropped with the frame
+def extended_for(frame, through=FORECAST_THROUGH):
+    key = (id(frame), through)
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0]() is frame:
+            return entry[1]
+    extended = extend(frame, through)
+    with _cache_lock:
+        _cache[key] = (weakref.ref(frame, lambda _: _cache.pop(key, None)), extended)
+    return extended
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Interpolate missing coverage years and forecast later ones for every tract.")
+    parser.add_argument('path', nargs='?', default='supermarkets.csv', help="coverage table (CSV or GeoParquet)")
+    parser.add_argument('--through', type=int, default=FORECAST_THROUGH)
+    parser.add_argument('--tract', type=int, nargs='*', default=[], help="print these tracts' series (TRACTCE)")
+    parser.add_argument('--output', help="write the extended table to this CSV")
+    args = parser.parse_args(argv)
+
+    frame = pd.read_parquet(args.path) if args.path.endswith('.parquet') else pd.read_csv(args.path)
+    extended = extend(frame, args.through)
+    suffix, _ = coverage_series(frame)
+    kinds = year_kinds(extended)
+    print(', '.join(year_label(year, kinds) for year in kinds))
+    for tract in args.tract:
+        row = extended[extended['TRACTCE'] == tract].iloc[0]
+        for year in kinds:
+            bounds = ''
+            if f'{year}_{suffix} low' in row:
+                bounds = f"  [{row[f'{year}_{suffix} low']:.0f}, {row[f'{year}_{suffix} high']:.0f}]"
+            print(f"{tract} {year_label(year, kinds):<16} {row[f'{year}_{suffix}']:10.1f}  rank {row[f'{year}_rank']}{bounds}")
+    if args.output:
+        extended.to_csv(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
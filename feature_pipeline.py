@@ -0,0 +1,153 @@
+"""Model features derived straight from the tract table.
+
+The notebook trains on ``clean_data.xlsx``, which was built by hand from the
+same USDA Food Access Research Atlas columns that ``supermarkets.csv``
+carries.  ``build_features`` derives those features in vectorised form, and
+``feature_matrix`` caches the result under a key made of the input file's
+content hash and ``FEATURE_VERSION``.  The notebook, the app and batch jobs
+therefore share one computation, and it is redone only when the data or the
+feature definitions change.  The ``FoodDesert`` target marks the tracts
+listed in ``LILAZones_geo.csv``.
+
+Example:
+    python feature_pipeline.py --input supermarkets.csv --output features.csv
+"""
+import argparse
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+# Bump whenever build_features changes so cached matrices are rebuilt
+FEATURE_VERSION = 1
+
+DEFAULT_TRACT_PATH = "supermarkets.csv"
+# Tracts the app maps as LILA (food desert) zones; these are the positive labels
+DEFAULT_LABEL_PATH = "LILAZones_geo.csv"
+DEFAULT_CACHE_DIR = os.path.join('.cache', 'features')
+TARGET_COLUMN = 'FoodDesert'
+# USDA flag used as the target when no LILA zone list is supplied
+TARGET_SOURCE_COLUMN = 'LILATracts_1And10'
+
+# Tract-level attributes that the notebook models on a log10 scale
+LOG10_COLUMNS = ['MedianFamilyIncome', 'PovertyRate', 'PCTGQTRS']
+
+# State FIPS codes east of the Mississippi River, used for the notebook's EastofUS flag
+EAST_OF_MISSISSIPPI_FIPS = {
+    '01', '09', '10', '11', '12', '13', '17', '18', '21', '23', '24', '25', '26', '28', '33',
+    '34', '36', '37', '39', '42', '44', '45', '47', '50', '51', '54', '55',
+}
+
+_memory_cache = {}
+
+
+def tract_count_columns(columns):
+    return [column for column in columns if column.startswith('Tract')]
+
+
+def share_columns(columns):
+    return [column for column in columns if column.endswith('share')]
+
+
+# Derive the model feature matrix from a tract table in one vectorised pass
+def build_features(tracts, lila_tracts=None):
+    counts = tract_count_columns(tracts.columns)
+    shares = share_columns(tracts.columns)
+    log_sources = counts + [column for column in LOG10_COLUMNS if column in tracts.columns]
+
+    # log10(1 + x) keeps tracts with a zero count finite
+    values = tracts[log_sources].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    log_values = np.log10(1 + np.clip(values, 0, None))
+    # A few tracts have no reported income; fill with the column median
+    log_values = np.where(np.isnan(log_values), np.nanmedian(log_values, axis=0), log_values)
+    features = pd.DataFrame(log_values, columns=[f'log10_{column}' for column in log_sources], index=tracts.index)
+
+    # Blank shares mean the tract is not low-access at that distance
+    features[shares] = tracts[shares].apply(pd.to_numeric, errors='coerce').fillna(0).to_numpy()
+    features['Urban'] = tracts['Urban'].astype(int).to_numpy()
+    if 'STATEFP' in tracts.columns:
+        state = tracts['STATEFP'].astype(str).str.zfill(2)
+        features['EastofUS'] = state.isin(EAST_OF_MISSISSIPPI_FIPS).astype(int).to_numpy()
+    if lila_tracts is not None:
+        features[TARGET_COLUMN] = tracts['TRACTCE'].isin(lila_tracts).astype(int).to_numpy()
+    elif TARGET_SOURCE_COLUMN in tracts.columns:
+        features[TARGET_COLUMN] = tracts[TARGET_SOURCE_COLUMN].fillna(0).astype(int).to_numpy()
+
+    if 'GEOID' in tracts.columns:
+        features.index = tracts['GEOID'].astype(str).rename('GEOID')
+    return features
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def feature_cache_key(path, label_path=DEFAULT_LABEL_PATH):
+    digest = hashlib.sha256(file_sha256(path).encode())
+    if label_path and os.path.exists(label_path):
+        digest.update(file_sha256(label_path).encode())
+    return f"v{FEATURE_VERSION}-{digest.hexdigest()[:16]}"
+
+
+# The tract table without its WKT geometry, which the features never use
+def read_tract_table(path=DEFAULT_TRACT_PATH):
+    tracts = pd.read_csv(path, usecols=lambda column: column != 'geometry', dtype={'STATEFP': str, 'GEOID': str})
+    return tracts.loc[:, [column for column in tracts.columns if not column.startswith('Unnamed')]]
+
+
+# Census tract codes of the LILA zones, or None when the zone list is not available
+def read_lila_tracts(label_path=DEFAULT_LABEL_PATH):
+    if not label_path or not os.path.exists(label_path):
+        return None
+    return pd.read_csv(label_path, usecols=['Census Tract Area'])['Census Tract Area'].unique()
+
+
+# Cached feature matrix for a tract file, keyed by content hash and FEATURE_VERSION
+def feature_matrix(path=DEFAULT_TRACT_PATH, label_path=DEFAULT_LABEL_PATH, cache_dir=DEFAULT_CACHE_DIR):
+    key = feature_cache_key(path, label_path)
+    if key in _memory_cache:
+        return _memory_cache[key]
+
+    cache_path = os.path.join(cache_dir, f"{key}.pkl")
+    if os.path.exists(cache_path):
+        features = pd.read_pickle(cache_path)
+    else:
+        features = build_features(read_tract_table(path), read_lila_tracts(label_path))
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        os.close(fd)
+        features.to_pickle(tmp_path)
+        os.replace(tmp_path, cache_path)
+
+    _memory_cache[key] = features
+    return features
+
+
+# Features and target ready for the notebook models
+def load_feature_data(path=DEFAULT_TRACT_PATH, label_path=DEFAULT_LABEL_PATH, cache_dir=DEFAULT_CACHE_DIR):
+    features = feature_matrix(path, label_path, cache_dir)
+    return features.drop(columns=[TARGET_COLUMN]), features[TARGET_COLUMN]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build (or reuse) the cached model feature matrix for a tract table.")
+    parser.add_argument('--input', default=DEFAULT_TRACT_PATH)
+    parser.add_argument('--labels', default=DEFAULT_LABEL_PATH, help="LILA zone list used for the FoodDesert target")
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--output', help="Optional CSV copy of the feature matrix")
+    args = parser.parse_args(argv)
+
+    features = feature_matrix(args.input, args.labels, args.cache_dir)
+    print(f"Feature matrix {feature_cache_key(args.input, args.labels)}: {features.shape[0]} tracts x {features.shape[1]} columns")
+    if args.output:
+        features.to_csv(args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""Shared model definitions for the food-desert classifiers.
+
+Mirrors the model list, feature sets and train/test split used in
+``ML Model/Food Desert_Overall Model (Full vs Reduced).ipynb`` so the
+experiment scripts train exactly what the notebook trains.
+"""
+import hashlib
+import json
+
+import pandas as pd
+from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
+from sklearn.model_selection import train_test_split
+
+from feature_pipeline import DEFAULT_TRACT_PATH, TARGET_COLUMN, load_feature_data
+
+RANDOM_STATE = 123
+TEST_SIZE = 0.2
+
+# Reduced feature sets picked in the notebook
+RF_SELECTED_FEATURES = ['log10_TractKids', 'log10_TractHUNV', 'log10_TractWhite', 'log10_TractSeniors', 'log10_TractAsian',
+                        'log10_TractHispanic', 'Urban', 'log10_TractBlack', 'log10_TractSNAP']
+
+LGBM_SELECTED_FEATURES = ['log10_TractHUNV', 'log10_TractWhite', 'log10_TractSeniors',
+                          'log10_TractSNAP', 'log10_TractHispanic', 'log10_TractOMultir', 'log10_TractAIAN', 'log10_TractNHOPI',
+                          'log10_TractAsian', 'log10_TractBlack', 'log10_TractKids', 'log10_MedianFamilyIncome', 'log10_PovertyRate',
+                          'log10_PCTGQTRS', 'Urban', 'EastofUS']
+
+FEATURE_SETS = {
+    'full': None,
+    'rf_reduced': RF_SELECTED_FEATURES,
+    'lgbm_reduced': LGBM_SELECTED_FEATURES,
+}
+
+
+# Model factories; heavy or optional libraries are imported only when a model is built
+def _logistic_regression(seed):
+    from sklearn.linear_model import LogisticRegression
+    return LogisticRegression(max_iter=1000, random_state=seed)
+
+
+def _decision_tree(seed):
+    from sklearn.tree import DecisionTreeClassifier
+    return DecisionTreeClassifier(random_state=seed)
+
+
+def _random_forest(seed):
+    from sklearn.ensemble import RandomForestClassifier
+    return RandomForestClassifier(n_estimators=100, random_state=seed)
+
+
+def _xgboost(seed):
+    from xgboost import XGBClassifier
+    return XGBClassifier(random_state=seed)
+
+
+def _lightgbm(seed):
+    from lightgbm import LGBMClassifier
+    return LGBMClassifier(random_state=seed, verbose=-1)
+
+
+def _svm(seed):
+    from sklearn.svm import SVC
+    return SVC(random_state=seed)
+
+
+def _knn(seed):
+    from sklearn.neighbors import KNeighborsClassifier
+    return KNeighborsClassifier()
+
+
+MODEL_FACTORIES = {
+    'Logistic Regression': _logistic_regression,
+    'Decision Tree': _decision_tree,
+    'Random Forest': _random_forest,
+    'XGBoost': _xgboost,
+    'LightGBM': _lightgbm,
+    'SVM': _svm,
+    'KNN': _knn,
+}
+
+
+# Build a fresh estimator by name, applying any parameter overrides
+def make_model(name, seed=RANDOM_STATE, **params):
+    if name not in MODEL_FACTORIES:
+        raise ValueError(f"Unknown model '{name}'. Choose from: {', '.join(MODEL_FACTORIES)}")
+    model = MODEL_FACTORIES[name](seed)
+    if params:
+        model.set_params(**params)
+    return model
+
+
+# Names of the models whose libraries are installed in this environment
+def available_models(names=None):
+    available = []
+    for name in names or MODEL_FACTORIES:
+        try:
+            make_model(name)
+        except ImportError:
+            continue
+        available.append(name)
+    return available
+
+
+# Load features and target: the notebook's cleaned workbook, or any tract table via the feature pipeline
+def load_model_data(path=DEFAULT_TRACT_PATH):
+    if not path.endswith(('.xlsx', '.xls')):
+        return load_feature_data(path)
+    fd = pd.read_excel(path)
+    us = fd.drop(fd.columns[3:17], axis=1)
+    X = us.drop([TARGET_COLUMN], axis=1)
+    y = us[TARGET_COLUMN]
+    return X, y
+
+
+# Restrict the feature matrix to one of the notebook's feature sets
+def select_features(X, feature_set='full'):
+    columns = FEATURE_SETS[feature_set]
+    if columns is None:
+        return X
+    return X[[column for column in columns if column in X.columns]]
+
+
+def split_data(X, y, seed=RANDOM_STATE):
+    return train_test_split(X, y, test_size=TEST_SIZE, random_state=seed)
+
+
+def score_predictions(y_true, y_pred):
+    return {
+        'accuracy': accuracy_score(y_true, y_pred),
+        'precision': precision_score(y_true, y_pred, zero_division=0),
+        'recall': recall_score(y_true, y_pred, zero_division=0),
+        'f1': f1_score(y_true, y_pred, zero_division=0),
+    }
+
+
+# Content hash of a feature matrix and target, used to key cached results
+def data_fingerprint(X, y):
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(column) for column in X.columns]).encode())
+    digest.update(pd.util.hash_pandas_object(X, index=True).values.tobytes())
+    digest.update(pd.util.hash_pandas_object(y, index=True).values.tobytes())
+    return digest.hexdigest()
@@ -0,0 +1,105 @@
+"""Composite food swamp index from the supermarket and fast food coverage tables.
+
+A tract with a supermarket can still be a food swamp when fast food
+outnumbers it.  The coverage tables give, per tract and year, residents per
+supermarket and residents per fast food restaurant (0 where a tract has
+none).  ``compute`` joins the two tables on TRACTCE and turns them into one
+index per year:
+
+- Outlets per resident are the reciprocals of the ratios
+  (``coverage_forecast.per_resident``), so the fast-food-to-supermarket
+  ratio is ``supermarket ratio / fast food ratio`` (the population cancels).
+- That ratio is infinite for a tract with fast food and no supermarket,
+  the clearest swamps.  The index is therefore ``ratio / (1 + ratio)``:
+  fast food's share of the outlets per resident.  It runs from 0 (only
+  supermarkets) to 1 (only fast food) and ranks tracts in the same order
+  as the ratio.  A tract with neither has no index.
+- Ranks follow the fast food table: rank 1 is the highest index.  Ties
+  (most often tracts with fast food and no supermarket) are broken by
+  fast food per resident; tracts still tied share the lowest rank, and
+  tracts without an index are 'no rank'.
+
+Every year is one column of a (tracts x years) matrix, so the index and
+ranks of all years come from a handful of array operations.  The app
+caches the result per version of both files and draws it as a third
+coverage layer.
+
+Example:
+    python food_swamp.py supermarkets.csv "Fast Food Restaurants.csv" --year 2017 --top 10
+"""
+import argparse
+
+import numpy as np
+import pandas as pd
+
+from coverage_forecast import NO_RANK, coverage_years, per_resident
+
+SUPERMARKET_SUFFIX = 'supermarket coverage ratio'
+FAST_FOOD_SUFFIX = 'Fast Food Coverage Ratio'
+INDEX_SUFFIX = 'food swamp index'
+# Tract columns carried over from the supermarket table, so the index keeps its keys and shapes
+KEY_COLUMNS = ['STATEFP', 'COUNTYFP', 'TRACTCE', 'GEOID', 'geometry']
+
+
+# (tracts x years) matrix of a coverage table's ratios
+def coverage_matrix(frame, suffix, years):
+    return frame[[f'{year}_{suffix}' for year in years]].to_numpy(dtype=float)
+
+
+# Fast food share of outlets per resident; NaN where a tract has neither
+def swamp_index(supermarkets_per_resident, fast_food_per_resident):
+    with np.errstate(invalid='ignore'):
+        return fast_food_per_resident / (fast_food_per_resident + supermarkets_per_resident)
+
+
+# Rank labels of every column at once: '1' for the highest value, then the highest `tiebreak`; tracts tied on both
+# share the lowest rank, and NaN values are 'no rank'
+def rank_labels(values, tiebreak):
+    # lexsort puts NaN last
+    order = np.lexsort((-tiebreak, -values), axis=0)
+    ordered, ordered_tiebreak = np.take_along_axis(values, order, 0), np.take_along_axis(tiebreak, order, 0)
+    starts = np.ones(values.shape, dtype=bool)
+    starts[1:] = (ordered[1:] != ordered[:-1]) | (ordered_tiebreak[1:] != ordered_tiebreak[:-1])
+    ranks = np.maximum.accumulate(np.where(starts, np.arange(1, len(values) + 1)[:, None], 0), axis=0)
+    labels = np.empty(values.shape, dtype=object)
+    np.put_along_axis(labels, order, ranks.astype(str).astype(object), 0)
+    labels[np.isnan(values)] = NO_RANK
+    return labels
+
+
+# Index and rank columns for every year both tables cover, joined on TRACTCE; keyed and shaped like `supermarkets`
+def compute(supermarkets, fast_food):
+    years = sorted(set(coverage_years(supermarkets, SUPERMARKET_SUFFIX)) & set(coverage_years(fast_food, FAST_FOOD_SUFFIX)))
+    positions = pd.Index(fast_food['TRACTCE']).get_indexer(supermarkets['TRACTCE'])
+    fast_food_per_resident = per_resident(coverage_matrix(fast_food, FAST_FOOD_SUFFIX, years)[positions])
+    # Tracts missing from the fast food table get no index
+    fast_food_per_resident[positions < 0] = np.nan
+    index = swamp_index(per_resident(coverage_matrix(supermarkets, SUPERMARKET_SUFFIX, years)), fast_food_per_resident)
+    # Among tracts with only fast food (index 1), more fast food per resident ranks worse
+    ranks = rank_labels(index, np.nan_to_num(fast_food_per_resident))
+
+    columns = {f'{year}_{INDEX_SUFFIX}': index[:, position] for position, year in enumerate(years)}
+    columns.update({f'{year}_rank': ranks[:, position] for position, year in enumerate(years)})
+    values = pd.DataFrame(columns, index=supermarkets.index)
+    return pd.concat([supermarkets[[column for column in KEY_COLUMNS if column in supermarkets.columns]], values], axis=1)
+
+
+def main(argv=None):
+    from borough_partitions import read_tracts
+
+    parser = argparse.ArgumentParser(description="Food swamp index (fast food share of outlets) for every tract and year.")
+    parser.add_argument('supermarkets', nargs='?', default='supermarkets.csv')
+    parser.add_argument('fast_food', nargs='?', default='Fast Food Restaurants.csv')
+    parser.add_argument('--year', type=int, help="print the top tracts of this year (default: the latest)")
+    parser.add_argument('--top', type=int, default=10)
+    args = parser.parse_args(argv)
+
+    swamps = compute(read_tracts(args.supermarkets), read_tracts(args.fast_food))
+    year = args.year or coverage_years(swamps, INDEX_SUFFIX)[-1]
+    column = f'{year}_{INDEX_SUFFIX}'
+    worst = pd.to_numeric(swamps[f'{year}_rank'], errors='coerce').nsmallest(args.top).index
+    print(swamps.loc[worst, ['TRACTCE', column, f'{year}_rank']].to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+"""Level-of-detail geometry tiers encoded as TopoJSON.
+
+The tract CSVs store WKT with 15-digit coordinates.  Every tract also
+repeats the boundaries it shares with its neighbours, and the maps sent all
+of it at full detail.  ``GeometryTiers`` preprocesses a dataset's geometry
+once:
+
+1. Coordinates are quantized to ``QUANTIZE_DIGITS`` decimals (1e-6 degrees
+   is about 10 cm) and stored as integers on that grid.
+2. Rings are cut into arcs wherever boundaries meet.  Each shared boundary
+   is stored once and referenced by both tracts, reversed (``~index``) where
+   needed.
+3. Each zoom band gets its own simplified copy of the arcs.  Arc endpoints
+   never move, so neighbouring tracts keep identical shared edges with no
+   gaps or overlaps.  The tolerance is half a screen pixel at the band's
+   highest zoom.
+
+``topojson`` emits a TopoJSON topology for the tier that matches a zoom
+level.  It can be limited to selected rows and includes only the arcs those
+rows use, delta-encoded the way the TopoJSON spec describes.
+
+Example:
+    python geometry_tiers.py --input supermarkets.csv
+"""
+import argparse
+import json
+import threading
+import weakref
+
+import numpy as np
+import shapely
+
+QUANTIZE_DIGITS = 6
+# Highest zoom of each band; zooms above the last band get full (quantized) detail
+ZOOM_BANDS = (10, 12, 14)
+DEFAULT_OBJECT_NAME = 'tracts'
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+# Degrees of longitude covered by one 256px web-map tile pixel at a zoom level
+def pixel_degrees(zoom):
+    return 360 / (256 * 2 ** zoom)
+
+
+def _polygon_rings(geometry):
+    polygons = list(geometry.geoms) if geometry.geom_type == 'MultiPolygon' else [geometry]
+    return [[polygon.exterior.coords] + [interior.coords for interior in polygon.interiors]
+            for polygon in polygons if not polygon.is_empty]
+
+
+# Ring as quantized integer points, without the closing point and without repeated points
+def _quantize_ring(coords, translate, scale):
+    points = np.rint((np.asarray(coords)[:, :2] - translate) / scale).astype(np.int64)
+    keep = np.ones(len(points), dtype=bool)
+    keep[1:] = np.any(points[1:] != points[:-1], axis=1)
+    points = points[keep]
+    if len(points) > 1 and (points[0] == points[-1]).all():
+        points = points[:-1]
+    return [tuple(point) for point in points]
+
+
+# Points where boundaries meet: visited by several rings with different neighbours
+def _junctions(rings):
+    neighbours = {}
+    for ring in rings:
+        count = len(ring)
+        for i, point in enumerate(ring):
+            before, after = ring[i - 1], ring[(i + 1) % count]
+            pair = (before, after) if before <= after else (after, before)
+            seen = neighbours.get(point)
+            if seen is None:
+                neighbours[point] = pair
+            elif seen is not True and seen != pair:
+                neighbours[point] = True
+    return {point for point, seen in neighbours.items() if seen is True}
+
+
+# Closed ring with no junctions: rotated to its smallest point so identical rings match
+def _canonical_ring(ring):
+    start = ring.index(min(ring))
+    rotated = ring[start:] + ring[:start]
+    return rotated + [rotated[0]]
+
+
+class GeometryTiers:
+    def __init__(self, geometries, digits=QUANTIZE_DIGITS, bands=ZOOM_BANDS):
+        geometries = list(geometries)
+        bounds = shapely.total_bounds(geometries)
+        self.scale = 10.0 ** -digits
+        self.translate = np.array(bounds[:2])
+        self.bands = tuple(bands)
+
+        polygons = [[[_quantize_ring(coords, self.translate, self.scale) for coords in rings]
+                     for rings in _polygon_rings(geometry)] for geometry in geometries]
+        junctions = _junctions([ring for shape in polygons for rings in shape for ring in rings if len(ring) >= 3])
+
+        self.arcs = []
+        arc_index = {}
+        self.shapes = []
+        for shape in polygons:
+            shape_arcs = []
+            for rings in shape:
+                ring_arcs = [self._ring_arcs(ring, junctions, arc_index) for ring in rings if len(ring) >= 3]
+                # A polygon whose exterior collapsed under quantization is dropped
+                if ring_arcs and len(rings[0]) >= 3:
+                    shape_arcs.append(ring_arcs)
+            self.shapes.append(shape_arcs)
+        self._tiers = {}
+        self._tier_encoded = {}
+        self._tier_geometries = {}
+        self._tier_lock = threading.Lock()
+
+    def _add_arc(self, points, arc_index):
+        key = tuple(points)
+        if key in arc_index:
+            return arc_index[key]
+        reverse = key[::-1]
+        if reverse in arc_index:
+            return ~arc_index[reverse]
+        arc_index[key] = len(self.arcs)
+        self.arcs.append(np.array(points, dtype=np.int64))
+        return arc_index[key]
+
+    def _ring_arcs(self, ring, junctions, arc_index):
+        cuts = [i for i, point in enumerate(ring) if point in junctions]
+        if not cuts:
+            canonical = _canonical_ring(ring)
+            reverse = _canonical_ring(ring[::-1])
+            if tuple(reverse) in arc_index:
+                return [~arc_index[tuple(reverse)]]
+            return [self._add_arc(canonical, arc_index)]
+        rotated = ring[cuts[0]:] + ring[:cuts[0]]
+        offsets = [cut - cuts[0] for cut in cuts] + [len(ring)]
+        closed = rotated + [rotated[0]]
+        return [self._add_arc(closed[start:end + 1], arc_index) for start, end in zip(offsets, offsets[1:])]
+
+    # Band (index into self.bands) used for a zoom level; None means full detail
+    def tier_for_zoom(self, zoom):
+        for band, highest_zoom in enumerate(self.bands):
+            if zoom <= highest_zoom:
+                return band
+        return None
+
+    def tolerance(self, band):
+        return 0.0 if band is None else pixel_degrees(self.bands[band]) / 2
+
+    # Arcs simplified for one band, built on first use
+    def tier_arcs(self, band):
+        if band is None:
+            return self.arcs
+        with self._tier_lock:
+            if band not in self._tiers:
+                self._tiers[band] = _simplify_arcs(self.arcs, self.tolerance(band) / self.scale)
+            return self._tiers[band]
+
+    # Arcs of a band delta-encoded as JSON-ready lists, built on first use
+    def tier_encoded(self, band):
+        arcs = self.tier_arcs(band)
+        with self._tier_lock:
+            if band not in self._tier_encoded:
+                self._tier_encoded[band] = [np.vstack([points[:1], np.diff(points, axis=0)]).tolist() for points in arcs]
+            return self._tier_encoded[band]
+
+    # Shapely geometries (in degrees) rebuilt from the tier for `zoom`, one per input geometry, built on first use
+    def tier_geometries(self, zoom):
+        band = self.tier_for_zoom(zoom)
+        arcs = self.tier_arcs(band)
+        with self._tier_lock:
+            if band not in self._tier_geometries:
+                self._tier_geometries[band] = np.array(
+                    [_shape_geometry(shape, arcs, self.translate, self.scale) for shape in self.shapes], dtype=object)
+            return self._tier_geometries[band]
+
+    # TopoJSON topology for a zoom level, limited to `rows` (positions) and carrying `properties` (one dict per row)
+    # and feature `ids` (one per row)
+    def topojson(self, zoom, rows=None, properties=None, object_name=DEFAULT_OBJECT_NAME, ids=None):
+        arcs = self.tier_encoded(self.tier_for_zoom(zoom))
+        rows = range(len(self.shapes)) if rows is None else rows
+        used = {}
+        geometries = []
+        for position, row in enumerate(rows):
+            shape = self.shapes[row]
+            remapped = [[[_remap(ref, used) for ref in ring] for ring in polygon] for polygon in shape]
+            geometry = {'type': 'MultiPolygon', 'arcs': remapped} if len(remapped) != 1 else {'type': 'Polygon', 'arcs': remapped[0]}
+            if properties is not None:
+                geometry['properties'] = properties[position]
+            if ids is not None:
+                geometry['id'] = ids[position]
+            geometries.append(geometry)
+
+        encoded = [None] * len(used)
+        for arc, new_index in used.items():
+            encoded[new_index] = arcs[arc]
+        return {
+            'type': 'Topology',
+            'transform': {'scale': [self.scale, self.scale], 'translate': self.translate.tolist()},
+            'objects': {object_name: {'type': 'GeometryCollection', 'geometries': geometries}},
+            'arcs': encoded,
+        }
+
+
+def _remap(ref, used):
+    arc = ref if ref >= 0 else ~ref
+    if arc not in used:
+        used[arc] = len(used)
+    return used[arc] if ref >= 0 else ~used[arc]
+
+
+def _ring_coordinates(refs, arcs, translate, scale):
+    parts = [arcs[ref] if ref >= 0 else arcs[~ref][::-1] for ref in refs]
+    points = np.vstack([parts[0]] + [part[1:] for part in parts[1:]])
+    return points * scale + translate
+
+
+def _shape_geometry(shape, arcs, translate, scale):
+    polygons = [shapely.Polygon(_ring_coordinates(rings[0], arcs, translate, scale),
+                                [_ring_coordinates(refs, arcs, translate, scale) for refs in rings[1:]])
+                for rings in shape]
+    if not polygons:
+        return shapely.Polygon()
+    return polygons[0] if len(polygons) == 1 else shapely.MultiPolygon(polygons)
+
+
+def _farthest_from_chord(points):
+    start, end = points[0].astype(float), points[-1].astype(float)
+    offsets = points.astype(float) - start
+    chord = end - start
+    length = np.hypot(*chord)
+    if length == 0:
+        distances = np.hypot(offsets[:, 0], offsets[:, 1])
+    else:
+        distances = np.abs(offsets[:, 0] * chord[1] - offsets[:, 1] * chord[0]) / length
+    return int(np.argmax(distances[1:-1])) + 1
+
+
+# Douglas-Peucker on every arc with endpoints fixed; arcs keep an interior point so rings never collapse
+def _simplify_arcs(arcs, tolerance):
+    pieces, owners = [], []
+    for arc_number, points in enumerate(arcs):
+        if len(points) > 3 and (points[0] == points[-1]).all():
+            # Closed arcs are split at their farthest point so both halves have a real chord
+            split = _farthest_from_chord(points)
+            pieces += [points[:split + 1], points[split:]]
+            owners += [arc_number, arc_number]
+        else:
+            pieces.append(points)
+            owners.append(arc_number)
+
+    lines = shapely.linestrings(np.vstack(pieces).astype(float),
+                                indices=np.repeat(np.arange(len(pieces)), [len(piece) for piece in pieces]))
+    simplified = shapely.get_coordinates(shapely.simplify(lines, tolerance, preserve_topology=False), return_index=True)
+    coordinates, line_numbers = simplified
+    split_at = np.flatnonzero(np.diff(line_numbers)) + 1
+    results = [None] * len(arcs)
+    for piece, original, points in zip(range(len(pieces)), pieces, np.split(np.rint(coordinates).astype(np.int64), split_at)):
+        if len(points) < 3 <= len(original):
+            points = original[[0, _farthest_from_chord(original), -1]]
+        owner = owners[piece]
+        results[owner] = points if results[owner] is None else np.vstack([results[owner], points[1:]])
+    return results
+
+
+# Tiers for a dataset, built once per dataset object and shared by every caller
+def tiers_for(gdf):
+    key = id(gdf)
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0]() is gdf:
+            return entry[1]
+        tiers = GeometryTiers(gdf.geometry.values)
+        _cache[key] = (weakref.ref(gdf, lambda _: _cache.pop(key, None)), tiers)
+        return tiers
+
+
+# Rows of a (possibly filtered) frame as positions in the dataset the tiers were built from
+def row_positions(dataset, frame):
+    return dataset.index.get_indexer(frame.index)
+
+
+# JSON-ready property dicts for the TopoJSON geometries
+def feature_properties(frame, columns):
+    return frame[columns].to_dict('records')
+
+
+def main(argv=None):
+    import geopandas as gpd
+    import pandas as pd
+    from shapely import wkt
+
+    parser = argparse.ArgumentParser(description="Report GeoJSON vs TopoJSON tier sizes for a tract CSV.")
+    parser.add_argument('--input', default="supermarkets.csv")
+    parser.add_argument('--zooms', nargs='+', type=int, default=[10, 12, 14, 16])
+    args = parser.parse_args(argv)
+
+    # The LILA zones file keys tracts by 'Census Tract Area' instead of TRACTCE
+    data = pd.read_csv(args.input, usecols=lambda column: column in ('TRACTCE', 'Census Tract Area', 'geometry'))
+    key = 'TRACTCE' if 'TRACTCE' in data.columns else 'Census Tract Area'
+    gdf = gpd.GeoDataFrame(data, geometry=data['geometry'].map(wkt.loads), crs=4326)
+    tiers = tiers_for(gdf)
+    properties = feature_properties(gdf, [key])
+    geojson_bytes = len(gdf.to_json())
+    print(f"{len(gdf)} geometries, {len(tiers.arcs)} arcs; GeoJSON {geojson_bytes / 1e3:.0f} kB")
+    for zoom in args.zooms:
+        band = tiers.tier_for_zoom(zoom)
+        size = len(json.dumps(tiers.topojson(zoom, properties=properties), separators=(',', ':')))
+        print(f"zoom {zoom:>2} (tolerance {tiers.tolerance(band):.2e} deg): {size / 1e3:8.0f} kB "
+              f"({geojson_bytes / size:.1f}x smaller)")
+
+
+if __name__ == "__main__":
+    main()
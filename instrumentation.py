@@ -0,0 +1,219 @@
+"""Lightweight timing spans for app reruns.
+
+Wrap a stage with ``span`` (a context manager) or ``timed`` (a decorator).
+Each finished span records its duration and any attributes set on it, such
+as row counts or payload sizes.  ``begin_rerun``/``end_rerun`` group the
+spans of one script run.  Finished reruns are kept in a bounded in-process
+history and can be exported as JSON lines or as Prometheus text.  The
+history is shared by every session of the process, so each rerun carries
+the id of the session it belongs to and ``recent_reruns(session=...)``
+returns one session's reruns.
+
+Set ``FOOD_DESERT_SPANS_PATH`` to append every rerun to a JSON-lines file
+for offline analysis.
+
+Each rerun also records the CPU time of its thread, so interactions can be
+compared by server CPU as well as wall time.  ``fragment_scope`` records a
+fragment that reruns on its own as a separate rerun.
+"""
+import contextlib
+import functools
+import itertools
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+
+HISTORY_SIZE = 500
+SPANS_PATH_ENV = 'FOOD_DESERT_SPANS_PATH'
+
+_state = threading.local()
+_history = deque(maxlen=HISTORY_SIZE)
+_history_lock = threading.Lock()
+_span_ids = itertools.count(1)
+
+
+class Span:
+    def __init__(self, name, parent=None, **attrs):
+        self.id = next(_span_ids)
+        self.name = name
+        self.parent = parent
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.seconds = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self):
+        return {'id': self.id, 'name': self.name, 'parent': self.parent.id if self.parent else None,
+                'seconds': self.seconds, **self.attrs}
+
+
+class Rerun:
+    def __init__(self, label=None, session=None, fragment=False):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.session = session
+        # A fragment that reran on its own rather than a whole script run
+        self.fragment = fragment
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.cpu_start = time.thread_time()
+        self.seconds = None
+        self.cpu_seconds = None
+        self.spans = []
+
+    def to_dict(self):
+        return {'rerun': self.id, 'label': self.label, 'session': self.session, 'fragment': self.fragment,
+                'started_at': self.started_at, 'seconds': self.seconds,
+                'cpu_seconds': self.cpu_seconds, 'spans': [span.to_dict() for span in self.spans]}
+
+
+def current_rerun():
+    return getattr(_state, 'rerun', None)
+
+
+# Payload sizes cost an extra serialisation, so they are only measured when someone is looking
+def payloads_enabled():
+    return getattr(_state, 'payloads', False) or bool(os.environ.get(SPANS_PATH_ENV))
+
+
+def begin_rerun(label=None, measure_payloads=False, session=None, fragment=False):
+    _state.rerun = Rerun(label, session, fragment)
+    _state.stack = []
+    _state.payloads = measure_payloads
+    return _state.rerun
+
+
+def end_rerun():
+    rerun = current_rerun()
+    if rerun is None:
+        return None
+    rerun.seconds = time.perf_counter() - rerun.start
+    rerun.cpu_seconds = time.thread_time() - rerun.cpu_start
+    with _history_lock:
+        _history.append(rerun)
+    path = os.environ.get(SPANS_PATH_ENV)
+    if path:
+        with open(path, 'a') as f:
+            f.write(to_jsonl([rerun]))
+    _state.rerun = None
+    return rerun
+
+
+class span:
+    def __init__(self, name, **attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        stack = getattr(_state, 'stack', None)
+        if stack is None:
+            stack = _state.stack = []
+        self.span = Span(self.name, stack[-1] if stack else None, **self.attrs)
+        stack.append(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        self.span.seconds = time.perf_counter() - self.span.start
+        if exc_type is not None:
+            self.span.set(error=exc_type.__name__)
+        _state.stack.pop()
+        rerun = current_rerun()
+        if rerun is not None:
+            rerun.spans.append(self.span)
+        return False
+
+
+# Spans of a fragment: nested under the current rerun, or a rerun of their own when the fragment reruns alone
+@contextlib.contextmanager
+def fragment_scope(name, measure_payloads=False, session=None):
+    if current_rerun() is not None:
+        with span(name) as recorded:
+            yield recorded
+        return
+    begin_rerun(name, measure_payloads, session, fragment=True)
+    try:
+        with span(name) as recorded:
+            yield recorded
+    finally:
+        end_rerun()
+
+
+def timed(name=None):
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+# Finished reruns, oldest first; only those of `session` when it is given
+def recent_reruns(limit=None, session=None):
+    with _history_lock:
+        reruns = list(_history)
+    if session is not None:
+        reruns = [rerun for rerun in reruns if rerun.session == session]
+    return reruns[-limit:] if limit else reruns
+
+
+def clear_history():
+    with _history_lock:
+        _history.clear()
+
+
+# One JSON object per span, tagged with its rerun
+def to_jsonl(reruns):
+    lines = []
+    for rerun in reruns:
+        for record in rerun.to_dict()['spans']:
+            lines.append(json.dumps({'rerun': rerun.id, 'label': rerun.label, 'session': rerun.session,
+                                     'fragment': rerun.fragment, 'started_at': rerun.started_at, **record},
+                                    default=str))
+    return ''.join(line + '\n' for line in lines)
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Prometheus text exposition: per-stage duration and payload summaries
+def to_prometheus(reruns, prefix='food_desert'):
+    stats = {}
+    for rerun in reruns:
+        for recorded in rerun.spans:
+            entry = stats.setdefault(recorded.name, {'count': 0, 'seconds': 0.0, 'bytes': 0, 'max_seconds': 0.0})
+            entry['count'] += 1
+            entry['seconds'] += recorded.seconds
+            entry['max_seconds'] = max(entry['max_seconds'], recorded.seconds)
+            entry['bytes'] += recorded.attrs.get('payload_bytes', 0) or 0
+
+    lines = [
+        f"# HELP {prefix}_stage_seconds Time spent in each instrumented stage.",
+        f"# TYPE {prefix}_stage_seconds summary",
+    ]
+    for name, entry in sorted(stats.items()):
+        label = f'stage="{_escape_label(name)}"'
+        lines.append(f"{prefix}_stage_seconds_sum{{{label}}} {entry['seconds']:.6f}")
+        lines.append(f"{prefix}_stage_seconds_count{{{label}}} {entry['count']}")
+    lines += [f"# HELP {prefix}_stage_seconds_max Slowest single run of each stage.",
+              f"# TYPE {prefix}_stage_seconds_max gauge"]
+    for name, entry in sorted(stats.items()):
+        lines.append(f'{prefix}_stage_seconds_max{{stage="{_escape_label(name)}"}} {entry["max_seconds"]:.6f}')
+    lines += [f"# HELP {prefix}_stage_payload_bytes_total Bytes produced by each stage.",
+              f"# TYPE {prefix}_stage_payload_bytes_total counter"]
+    for name, entry in sorted(stats.items()):
+        lines.append(f'{prefix}_stage_payload_bytes_total{{stage="{_escape_label(name)}"}} {entry["bytes"]}')
+    lines += [f"# HELP {prefix}_reruns_total Reruns recorded.", f"# TYPE {prefix}_reruns_total counter",
+              f"{prefix}_reruns_total {len(reruns)}"]
+    lines += [f"# HELP {prefix}_rerun_cpu_seconds Thread CPU time per rerun.", f"# TYPE {prefix}_rerun_cpu_seconds summary",
+              f"{prefix}_rerun_cpu_seconds_sum {sum(rerun.cpu_seconds or 0 for rerun in reruns):.6f}",
+              f"{prefix}_rerun_cpu_seconds_count {len(reruns)}"]
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,265 @@
+"""Concurrent-session load test for the Streamlit app.
+
+Drives N simulated sessions through ``streamlit.testing.v1.AppTest``, the
+headless runner, so no server or browser is needed.  Each session follows a
+scripted path: switching pages, dragging the year sliders on the map tabs,
+picking ranks, or submitting a comment.  ``AppTest`` swaps Streamlit's global
+runtime on every run, so concurrent sessions run in ``--concurrency`` worker
+processes.  Each worker serves its sessions one after another, sharing
+caches the way one server process would.  The tool reports p50/p95/p99 rerun
+latency (overall and per step), the error rate and memory growth per
+session.  Comments go to a temporary file so the real comments.csv is never
+touched.
+
+Example:
+    python load_test.py --sessions 20 --concurrency 5
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Brooklyn_Food_Desert_App.py")
+RUN_TIMEOUT = 300
+
+
+def _rss_bytes():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    except ImportError:
+        return None
+
+
+def _find(widgets, label):
+    for widget in widgets:
+        if widget.label == label:
+            return widget
+    raise LookupError(f"No widget labelled {label!r}")
+
+
+def _open_page(at, page):
+    at.sidebar.radio[0].set_value(page)
+
+
+# Only the open map tab is built, so switch to it before using its widgets
+def _open_tab(at, label):
+    at.session_state["visualization_tab"] = label
+
+
+# Move a year slider to a year picked from the options the app currently offers
+def _slide_year(at, key, rng):
+    slider = at.select_slider(key=key)
+    # AppTest exposes the formatted option labels ("2016 (imputed)"); the app's options are integer years
+    slider.set_value(int(rng.choice([option for option in slider.options if option.split()[0] != str(slider.value)]).split()[0]))
+
+
+# Scripted paths: each yields (step name, action) pairs; the action sets up widgets before a rerun
+def browse_path(rng):
+    for page in ["Home", "Guide", "Data Analysis", "Food Policy Reports"]:
+        yield f"open:{page}", lambda at, page=page: _open_page(at, page)
+
+
+def supermarket_map_path(rng):
+    yield "open:Data Visualization", lambda at: _open_page(at, "Data Visualization")
+    yield "tab:supermarket", lambda at: _open_tab(at, "Supermarket Coverage Ratio")
+    for _ in range(3):
+        yield "slide:supermarket_year", lambda at: _slide_year(at, "supermarket_year_slider", rng)
+    yield "pick:supermarket_rank", lambda at: _pick_rank(at, "supermarket_rank_select", rng)
+    yield "pick:supermarket_rank_all", lambda at: at.selectbox(key="supermarket_rank_select").set_value('All')
+
+
+def fast_food_map_path(rng):
+    yield "open:Data Visualization", lambda at: _open_page(at, "Data Visualization")
+    yield "tab:fast_food", lambda at: _open_tab(at, "Fast Food Coverage Ratio")
+    for _ in range(3):
+        yield "slide:fast_food_year", lambda at: _slide_year(at, "fast_food_year_slider", rng)
+    yield "pick:fast_food_rank", lambda at: _pick_rank(at, "fast_food_rank_select", rng)
+
+
+def food_swamp_map_path(rng):
+    yield "open:Data Visualization", lambda at: _open_page(at, "Data Visualization")
+    yield "tab:food_swamp", lambda at: _open_tab(at, "Food Swamp Index")
+    for _ in range(3):
+        yield "slide:food_swamp_year", lambda at: _slide_year(at, "food_swamp_year_slider", rng)
+    yield "pick:food_swamp_rank", lambda at: _pick_rank(at, "food_swamp_rank_select", rng)
+
+
+def comments_path(rng):
+    yield "open:Comments", lambda at: _open_page(at, "Comments")
+    yield "type:comment", lambda at: _find(at.text_area, "What's on your mind?").input(f"Load test comment {rng.random():.6f}")
+    yield "submit:comment", lambda at: _find(at.button, "Submit").click()
+
+
+def _pick_rank(at, key, rng):
+    selectbox = at.selectbox(key=key)
+    ranked = [option for option in selectbox.options if option != 'All']
+    selectbox.set_value(rng.choice(ranked) if ranked else 'All')
+
+
+PATHS = {
+    'browse': browse_path,
+    'supermarket_map': supermarket_map_path,
+    'fast_food_map': fast_food_map_path,
+    'food_swamp_map': food_swamp_map_path,
+    'comments': comments_path,
+}
+
+
+def run_session(session_id, path_names, seed):
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed + session_id)
+    path_name = path_names[session_id % len(path_names)]
+    steps = []
+    errors = []
+    at = AppTest.from_file(APP_PATH, default_timeout=RUN_TIMEOUT)
+
+    def rerun(step, action=None):
+        start = time.perf_counter()
+        error = None
+        try:
+            if action is not None:
+                action(at)
+            at.run()
+            if at.exception:
+                error = at.exception[0].message
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+        steps.append({'step': step, 'seconds': time.perf_counter() - start, 'error': error is not None})
+        if error is not None:
+            errors.append({'step': step, 'error': error})
+        return error is None
+
+    if rerun("initial load"):
+        for step, action in PATHS[path_name](rng):
+            if not rerun(step, action):
+                break
+    return {'session': session_id, 'path': path_name, 'steps': steps, 'errors': errors,
+            'pid': os.getpid(), 'rss_bytes': _rss_bytes()}
+
+
+# AppTest swaps Streamlit's global runtime on every run, so concurrent sessions need separate
+# processes; each worker then serves its sessions one after another, like one server process
+_worker_baseline = {}
+
+
+def _init_worker(seed, warmup):
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+    if warmup:
+        # One session first so one-off costs (imports, cache fills) are not counted as per-session growth
+        run_session(0, ['supermarket_map'], seed)
+    _worker_baseline['rss_bytes'] = _rss_bytes()
+
+
+def _worker_session(session_id, path_names, seed):
+    result = run_session(session_id, path_names, seed)
+    result['baseline_rss_bytes'] = _worker_baseline.get('rss_bytes')
+    return result
+
+
+def _percentiles(values):
+    if not values:
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None}
+    return {f'p{q}_ms': float(np.percentile(values, q)) * 1000 for q in (50, 95, 99)}
+
+
+# Mean RSS growth per session across worker processes, from each worker's post-warm-up baseline
+def _rss_growth_per_session(results):
+    by_worker = {}
+    for result in results:
+        by_worker.setdefault(result['pid'], []).append(result)
+    growth = []
+    for worker_results in by_worker.values():
+        last = max(worker_results, key=lambda result: result['rss_bytes'] or 0)
+        if last['rss_bytes'] and last['baseline_rss_bytes']:
+            growth.append((last['rss_bytes'] - last['baseline_rss_bytes']) / len(worker_results))
+    return statistics.mean(growth) if growth else None
+
+
+def run_load_test(sessions=10, concurrency=4, paths=None, seed=0, warmup=True):
+    # AppTest replaces __main__ in the workers, so tasks must name this module explicitly
+    import load_test
+
+    path_names = paths or list(PATHS)
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=concurrency, initializer=load_test._init_worker, initargs=(seed, warmup)) as pool:
+        futures = [pool.submit(load_test._worker_session, session_id, path_names, seed) for session_id in range(sessions)]
+        results = [future.result() for future in futures]
+    wall_seconds = time.perf_counter() - start
+
+    steps = [step for result in results for step in result['steps']]
+    by_step = {}
+    for step in steps:
+        by_step.setdefault(step['step'], []).append(step['seconds'])
+    errors = [error for result in results for error in result['errors']]
+    growth = _rss_growth_per_session(results)
+    return {
+        'sessions': sessions,
+        'concurrency': concurrency,
+        'reruns': len(steps),
+        'wall_seconds': wall_seconds,
+        'reruns_per_second': len(steps) / wall_seconds if wall_seconds else None,
+        'latency': _percentiles([step['seconds'] for step in steps]),
+        'latency_by_step': {name: dict(_percentiles(values), count=len(values), mean_ms=statistics.mean(values) * 1000)
+                            for name, values in sorted(by_step.items())},
+        'error_rate': len(errors) / len(steps) if steps else 0.0,
+        'failed_sessions': sum(1 for result in results if result['errors']),
+        'errors': errors,
+        'peak_rss_mb': max((result['rss_bytes'] or 0) for result in results) / 1e6,
+        'rss_growth_per_session_mb': growth / 1e6 if growth is not None else None,
+    }
+
+
+def _fmt(value):
+    return f"{value:9.1f}" if value is not None else "      n/a"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-session load test using Streamlit's headless AppTest runner.")
+    parser.add_argument('--sessions', type=int, default=10)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--paths', nargs='+', choices=list(PATHS), help="Scripted paths to cycle through (default: all)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-warmup', action='store_true')
+    parser.add_argument('--output', help="Optional JSON copy of the report")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["FOOD_DESERT_COMMENTS_FILE"] = os.path.join(tmp, "comments.csv")
+        report = run_load_test(args.sessions, args.concurrency, args.paths, args.seed, not args.no_warmup)
+
+    print(f"{report['sessions']} sessions, concurrency {report['concurrency']}: {report['reruns']} reruns "
+          f"in {report['wall_seconds']:.1f}s ({report['reruns_per_second']:.2f} reruns/s)")
+    latency = report['latency']
+    print(f"Rerun latency ms: p50 {_fmt(latency['p50_ms'])}  p95 {_fmt(latency['p95_ms'])}  p99 {_fmt(latency['p99_ms'])}")
+    print(f"Error rate: {report['error_rate']:.1%} ({report['failed_sessions']} failed sessions)")
+    for error in report['errors'][:5]:
+        print(f"  {error['step']}: {error['error']}")
+    print(f"Peak worker RSS: {_fmt(report['peak_rss_mb'])} MB, growth {_fmt(report['rss_growth_per_session_mb'])} MB per session")
+    print(f"\n{'step':<28} {'count':>5} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, stats in report['latency_by_step'].items():
+        print(f"{name:<28} {stats['count']:>5} {_fmt(stats['p50_ms'])} {_fmt(stats['p95_ms'])} {_fmt(stats['p99_ms'])}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 1 if report['error_rate'] > 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""Viewport clipping for the interactive coverage maps.
+
+In the interactive map mode the app renders with ``st_folium``, which
+reports the map bounds back after every pan or zoom.  Only the tracts that
+intersect a padded box around the last reported viewport are sent.  They
+are found through the dataset's STRtree (``gdf.sindex``), which geopandas
+builds once and caches on the geometry array shared by every session.
+
+The clip box only moves when the view leaves it or zooms well inside it.
+Small pans therefore reuse the same layer and send nothing new.
+
+The coloring uses ``step_colormap``, which matches ``folium.Choropleth``'s
+default six equal-width bins.  Its bins are computed over all tracts, not
+just the visible ones, so colors and legend stay the same while panning.
+"""
+import numpy as np
+from shapely.geometry import box as shapely_box
+
+# Fraction of the viewport's width/height added on each side of the clip box
+DEFAULT_PADDING = 0.5
+# Re-clip when the padded viewport covers less than this share of the current clip box (zoomed in)
+MIN_COVERAGE = 0.25
+
+
+# (minx, miny, maxx, maxy) of the bounds st_folium reports, or None before the map has reported any
+def bounds_box(map_state):
+    bounds = (map_state or {}).get('bounds') or {}
+    south_west, north_east = bounds.get('_southWest') or {}, bounds.get('_northEast') or {}
+    corners = [south_west.get('lng'), south_west.get('lat'), north_east.get('lng'), north_east.get('lat')]
+    if any(value is None for value in corners):
+        return None
+    return tuple(float(value) for value in corners)
+
+
+def pad_box(box, padding=DEFAULT_PADDING):
+    minx, miny, maxx, maxy = box
+    dx, dy = (maxx - minx) * padding, (maxy - miny) * padding
+    return (minx - dx, miny - dy, maxx + dx, maxy + dy)
+
+
+def box_contains(outer, inner):
+    return outer[0] <= inner[0] and outer[1] <= inner[1] and outer[2] >= inner[2] and outer[3] >= inner[3]
+
+
+def box_area(box):
+    return max(box[2] - box[0], 0) * max(box[3] - box[1], 0)
+
+
+# Clip box for the next render: kept while the viewport stays inside it, otherwise rebuilt around the viewport
+def next_clip_box(clip_box, map_state, padding=DEFAULT_PADDING, min_coverage=MIN_COVERAGE):
+    view = bounds_box(map_state)
+    if view is None:
+        return clip_box
+    padded = pad_box(view, padding)
+    if clip_box is not None and box_contains(clip_box, view) and box_area(padded) >= min_coverage * box_area(clip_box):
+        return clip_box
+    return padded
+
+
+# Tracts intersecting the box, in their original order; every tract when there is no box
+def tracts_in_box(gdf, box):
+    if box is None or gdf.empty:
+        return gdf
+    positions = gdf.sindex.query(shapely_box(*box), predicate='intersects')
+    return gdf.iloc[np.sort(positions)]
+
+
+# Step colormap with folium.Choropleth's default equal-width bins over all values
+def step_colormap(values, fill_color='YlOrRd', caption='', bins=6):
+    from branca.colormap import StepColormap
+    from branca.utilities import color_brewer
+
+    values = np.asarray(values, dtype=float)
+    values = values[~np.isnan(values)]
+    edges = np.histogram_bin_edges(values if values.size else [0.0], bins=bins)
+    return StepColormap(color_brewer(fill_color, n=bins), index=list(edges), vmin=edges[0], vmax=edges[-1],
+                        caption=caption)
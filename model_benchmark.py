@@ -0,0 +1,168 @@
+"""Fit/predict benchmark for every food-desert classifier in the notebook.
+
+For each model this records fit time, single-row and batch predict latency,
+peak memory and pickled model size next to the usual quality metrics.
+``--scale`` upsamples the feature matrix (bootstrap rows with a little
+jitter) so serving costs can be compared at 10x-100x today's tract count:
+the training rows and the batch timed for predict latency grow, while the
+quality metrics stay on the real held-out tracts.  ``tracemalloc`` slows
+fitting down by tens of percent, so the fit is timed in a run of its own
+and peak Python memory comes from a second, traced fit.
+
+Example:
+    python model_benchmark.py --scale 1 10 100 --output benchmark.csv
+"""
+import argparse
+import pickle
+import statistics
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from feature_pipeline import DEFAULT_TRACT_PATH
+from food_desert_models import (FEATURE_SETS, MODEL_FACTORIES, RANDOM_STATE, available_models, load_model_data,
+                                make_model, score_predictions, select_features, split_data)
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SINGLE_ROW_REPEATS = 200
+
+
+# Grow the data set by bootstrapping rows; continuous columns get jitter so rows are not exact copies
+def upscale(X, y, factor, seed=RANDOM_STATE):
+    if factor <= 1:
+        return X, y
+    rng = np.random.default_rng(seed)
+    rows = rng.integers(0, len(X), size=int(len(X) * factor))
+    X_big = X.iloc[rows].reset_index(drop=True)
+    y_big = y.iloc[rows].reset_index(drop=True)
+
+    numeric = X_big.select_dtypes('number')
+    continuous = [column for column in numeric.columns if numeric[column].nunique() > 2]
+    if continuous:
+        noise_scale = X[continuous].std(ddof=0).to_numpy() * 0.01
+        X_big[continuous] = X_big[continuous].to_numpy() + rng.normal(size=(len(X_big), len(continuous))) * noise_scale
+    return X_big, y_big
+
+
+def _peak_rss_bytes():
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _percentile(values, q):
+    return float(np.percentile(values, q))
+
+
+# Peak Python allocation of fitting a fresh copy of the model, in bytes
+def _fit_peak_python(model_name, X_train, y_train, seed):
+    model = make_model(model_name, seed)
+    tracemalloc.start()
+    try:
+        model.fit(X_train, y_train)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+# Benchmark one model; runs inside its own process so peak RSS belongs to this model alone.
+# Batch predict latency is timed on `X_batch` (default: the test rows)
+def benchmark_model(model_name, X_train, X_test, y_train, y_test, seed=RANDOM_STATE, repeats=SINGLE_ROW_REPEATS, X_batch=None):
+    X_batch = X_test if X_batch is None else X_batch
+    model = make_model(model_name, seed)
+    rss_before = _peak_rss_bytes()
+
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_seconds = time.perf_counter() - start
+    fit_peak_python = _fit_peak_python(model_name, X_train, y_train, seed)
+
+    y_pred = model.predict(X_test)
+    start = time.perf_counter()
+    model.predict(X_batch)
+    batch_seconds = time.perf_counter() - start
+
+    single_row = X_test.iloc[[0]]
+    model.predict(single_row)  # warm-up
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        model.predict(single_row)
+        latencies.append(time.perf_counter() - start)
+
+    rss_after = _peak_rss_bytes()
+    record = {
+        'model': model_name,
+        'train_rows': len(X_train),
+        'fit_seconds': fit_seconds,
+        'batch_rows': len(X_batch),
+        'batch_predict_seconds': batch_seconds,
+        'batch_rows_per_second': len(X_batch) / batch_seconds if batch_seconds else float('inf'),
+        'single_row_p50_ms': statistics.median(latencies) * 1000,
+        'single_row_p95_ms': _percentile(latencies, 95) * 1000,
+        'fit_peak_python_mb': fit_peak_python / 1e6,
+        'peak_rss_mb': rss_after / 1e6 if rss_after else None,
+        'rss_growth_mb': (rss_after - rss_before) / 1e6 if rss_after else None,
+        'model_size_kb': len(pickle.dumps(model)) / 1e3,
+    }
+    record.update(score_predictions(y_test, y_pred))
+    return record
+
+
+# Benchmark every model at every scale factor
+def run_benchmark(X, y, models=None, scales=(1,), seed=RANDOM_STATE, isolate=True, repeats=SINGLE_ROW_REPEATS):
+    models = available_models(models)
+    records = []
+    for scale in scales:
+        X_train, X_test, y_train, y_test = split_data(X, y, seed)
+        # The held-out tracts stay real for the quality metrics; the training rows and the timed batch grow
+        X_train, y_train = upscale(X_train, y_train, scale, seed)
+        X_batch, _ = upscale(X_test, y_test, scale, seed)
+        for model_name in models:
+            args = (model_name, X_train, X_test, y_train, y_test, seed, repeats, X_batch)
+            if isolate:
+                with ProcessPoolExecutor(max_workers=1) as pool:
+                    record = pool.submit(benchmark_model, *args).result()
+            else:
+                record = benchmark_model(*args)
+            record['scale'] = scale
+            records.append(record)
+            print(f"{model_name} @ {scale}x: fit {record['fit_seconds']:.2f}s, "
+                  f"single-row p50 {record['single_row_p50_ms']:.2f}ms, accuracy {record['accuracy']:.3f}")
+    return pd.DataFrame(records)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit/predict throughput and latency for each food-desert classifier.")
+    parser.add_argument('--data', default=DEFAULT_TRACT_PATH, help="Tract table, or the notebook's clean_data.xlsx")
+    parser.add_argument('--models', nargs='+', choices=list(MODEL_FACTORIES), default=None)
+    parser.add_argument('--feature-set', choices=sorted(FEATURE_SETS), default='full')
+    parser.add_argument('--scale', nargs='+', type=float, default=[1], help="Upscaling factors for the training rows and the predict batch, e.g. 1 10 100")
+    parser.add_argument('--repeats', type=int, default=SINGLE_ROW_REPEATS, help="Single-row predictions timed per model")
+    parser.add_argument('--no-isolate', action='store_true', help="Run every model in this process (peak memory becomes cumulative)")
+    parser.add_argument('--output', help="Write results to a .csv or .json file")
+    args = parser.parse_args(argv)
+
+    X, y = load_model_data(args.data)
+    X = select_features(X, args.feature_set)
+    results = run_benchmark(X, y, args.models, args.scale, isolate=not args.no_isolate, repeats=args.repeats)
+
+    with pd.option_context('display.max_columns', None, 'display.width', 250, 'display.float_format', '{:.3f}'.format):
+        print(results)
+    if args.output:
+        if args.output.endswith('.json'):
+            results.to_json(args.output, orient='records', indent=2)
+        else:
+            results.to_csv(args.output, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Page-scoped lazy imports and dataset loading for the Streamlit app.
+
+Each page of ``Brooklyn_Food_Desert_App.py`` declares the modules and
+datasets it needs in ``PAGE_DEPENDENCIES``.  Heavy modules are bound to
+``LazyModule`` placeholders and only imported on first use.  Datasets are
+registered as loaders and only read when a page asks for them.  As a result,
+opening Home, Guide or Comments never pays for geopandas, folium or the
+tract GeoDataFrames.  Every first import and first dataset load is timed for
+the startup profile.
+
+Run ``python page_loader.py`` to profile a cold start of each page in a
+fresh interpreter.
+"""
+import argparse
+import importlib
+import json
+import subprocess
+import sys
+import threading
+import time
+import types
+
+_lock = threading.RLock()
+_modules = {}
+_module_locks = {}
+_dataset_loaders = {}
+_loaded_datasets = set()
+_profile = []
+
+
+def _record(kind, name, seconds, page=None):
+    _profile.append({'kind': kind, 'name': name, 'seconds': seconds, 'page': page})
+
+
+# Import a module once per process, timing the first import; a lock per module so unrelated imports don't wait on each other
+def load_module(name, page=None):
+    module = _modules.get(name)
+    if module is not None:
+        return module
+    with _lock:
+        module_lock = _module_locks.setdefault(name, threading.RLock())
+    with module_lock:
+        if name not in _modules:
+            start = time.perf_counter()
+            module = importlib.import_module(name)
+            with _lock:
+                _modules[name] = module
+                _record('module', name, time.perf_counter() - start, page)
+        return _modules[name]
+
+
+# Module placeholder that imports the real module on first attribute access
+class LazyModule(types.ModuleType):
+    def __init__(self, name):
+        super().__init__(name)
+        self._lazy_name = name
+
+    def __getattr__(self, attr):
+        return getattr(load_module(self._lazy_name), attr)
+
+    def __repr__(self):
+        loaded = 'loaded' if self._lazy_name in _modules else 'not loaded'
+        return f"<lazy module '{self._lazy_name}' ({loaded})>"
+
+
+def lazy_module(name):
+    return LazyModule(name)
+
+
+def register_dataset(name, loader):
+    _dataset_loaders[name] = loader
+
+
+# Return a registered dataset, timing the first load in this process
+def get_dataset(name, page=None):
+    if name not in _dataset_loaders:
+        raise KeyError(f"Dataset '{name}' is not registered")
+    start = time.perf_counter()
+    data = _dataset_loaders[name]()
+    with _lock:
+        if name not in _loaded_datasets:
+            _loaded_datasets.add(name)
+            _record('dataset', name, time.perf_counter() - start, page)
+    return data
+
+
+# Import a page's modules and load its datasets, returning the datasets by name
+def prepare_page(page, dependencies):
+    declared = dependencies.get(page, {})
+    for module_name in declared.get('modules', []):
+        load_module(module_name, page)
+    return {name: get_dataset(name, page) for name in declared.get('datasets', [])}
+
+
+def startup_profile():
+    return list(_profile)
+
+
+def format_profile(profile):
+    lines = [f"{'kind':<8} {'name':<28} {'page':<20} {'ms':>9}"]
+    for row in profile:
+        lines.append(f"{row['kind']:<8} {row['name']:<28} {str(row['page']):<20} {row['seconds'] * 1000:>9.1f}")
+    lines.append(f"{'total':<58} {sum(row['seconds'] for row in profile) * 1000:>9.1f}")
+    return '\n'.join(lines)
+
+
+_COLD_START_SCRIPT = """
+import json, time
+start = time.perf_counter()
+import {app} as app
+import_seconds = time.perf_counter() - start
+import page_loader
+page_loader.prepare_page({page!r}, app.PAGE_DEPENDENCIES)
+print(json.dumps({{'app_import_seconds': import_seconds, 'profile': page_loader.startup_profile()}}))
+"""
+
+
+# Cold-start cost of each page, each measured in a fresh interpreter
+def profile_cold_starts(app='Brooklyn_Food_Desert_App', pages=None):
+    if pages is None:
+        pages = list(importlib.import_module(app).PAGE_DEPENDENCIES)
+    results = {}
+    for page in pages:
+        output = subprocess.run([sys.executable, '-c', _COLD_START_SCRIPT.format(app=app, page=page)],
+                                capture_output=True, text=True, check=True).stdout
+        results[page] = json.loads(output.strip().splitlines()[-1])
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile the cold-start cost of each app page.")
+    parser.add_argument('--app', default='Brooklyn_Food_Desert_App')
+    parser.add_argument('--pages', nargs='+')
+    args = parser.parse_args(argv)
+
+    for page, result in profile_cold_starts(args.app, args.pages).items():
+        profile = result['profile']
+        total = result['app_import_seconds'] + sum(row['seconds'] for row in profile)
+        print(f"\n== {page}: {total * 1000:.0f} ms cold start (app import {result['app_import_seconds'] * 1000:.0f} ms)")
+        if profile:
+            print(format_profile(profile))
+
+
+if __name__ == "__main__":
+    main()
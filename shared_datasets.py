@@ -0,0 +1,149 @@
+"""Read-only datasets shared by every session in the process.
+
+``st.cache_data`` pickles a cached value and gives every caller a fresh
+deserialised copy.  For the tract GeoDataFrames that means re-creating
+thousands of shapely geometries on every rerun of every session.  The app
+instead keeps one ``FrozenGeoDataFrame`` per dataset in ``st.cache_resource``.
+The same object is then handed to every session, so sharing it is only safe
+if nobody can modify it in place.
+
+``freeze`` wraps a GeoDataFrame without copying it.  Column assignment,
+deletion, ``.loc``/``.iloc``/``.at``/``.iat`` writes and ``inplace=True``
+methods (including ``insert`` and ``set_crs``/``set_geometry`` with
+``inplace=True``) raise ``ReadOnlyDataError``.  The arrays behind the
+columns are marked read-only too, so writing through ``.values`` (e.g.
+``frozen.geometry.values[0] = ...``) raises ``ValueError``.  Anything
+derived from a frozen frame (filters, column selections, ``copy()``) is an
+ordinary GeoDataFrame.  Pandas' Copy-on-Write lets such derived frames
+share memory with the shared frame until one of them is written to.
+Copy-on-Write is the default from pandas 3; on older versions the app turns
+it on at startup (``pd.set_option('mode.copy_on_write', True)``), which
+freezing relies on.
+"""
+import numpy as np
+import geopandas as gpd
+
+# Attributes that change a frame's contents when assigned
+_GUARDED_ATTRIBUTES = {'crs', 'geometry', 'attrs', 'columns', 'index'}
+
+
+class ReadOnlyDataError(TypeError):
+    pass
+
+
+def _refuse(action):
+    raise ReadOnlyDataError(f"Shared datasets are read-only ({action}); work on a .copy() instead")
+
+
+# Indexer (.loc, .iloc, .at, .iat) that allows reads and refuses writes
+class _ReadOnlyIndexer:
+    def __init__(self, indexer, name):
+        self._indexer = indexer
+        self._name = name
+
+    def __getitem__(self, key):
+        return self._indexer[key]
+
+    def __setitem__(self, key, value):
+        _refuse(f".{self._name}[...] assignment")
+
+    def __call__(self, *args, **kwargs):
+        return _ReadOnlyIndexer(self._indexer(*args, **kwargs), self._name)
+
+    def __getattr__(self, attr):
+        return getattr(self._indexer, attr)
+
+
+class FrozenGeoDataFrame(gpd.GeoDataFrame):
+    # Frames built with type(frozen)(...) (e.g. by dissolve) are new data, so they are plain GeoDataFrames
+    def __init__(self, *args, **kwargs):
+        object.__setattr__(self, '__class__', gpd.GeoDataFrame)
+        gpd.GeoDataFrame.__init__(self, *args, **kwargs)
+
+    # Derived frames are plain, writable GeoDataFrames
+    @classmethod
+    def _from_mgr(cls, mgr, axes):
+        return gpd.GeoDataFrame._from_mgr(mgr, axes)
+
+    @classmethod
+    def _geodataframe_constructor_with_fallback(cls, *args, **kwargs):
+        return gpd.GeoDataFrame._geodataframe_constructor_with_fallback(*args, **kwargs)
+
+    # GeoDataFrame.__getitem__ re-applies type(self) to selections that keep a geometry column
+    def __getitem__(self, key):
+        result = super().__getitem__(key)
+        if type(result) is FrozenGeoDataFrame:
+            object.__setattr__(result, '__class__', gpd.GeoDataFrame)
+        return result
+
+    def __setitem__(self, key, value):
+        _refuse(f"setting column {key!r}")
+
+    def __delitem__(self, key):
+        _refuse(f"deleting column {key!r}")
+
+    def __setattr__(self, name, value):
+        if name in _GUARDED_ATTRIBUTES or (not name.startswith('_') and name in self.columns):
+            _refuse(f"setting .{name}")
+        super().__setattr__(name, value)
+
+    def _update_inplace(self, result, **kwargs):
+        _refuse("inplace=True")
+
+    def insert(self, loc, column, value, allow_duplicates=False):
+        _refuse(f"inserting column {column!r}")
+
+    # GeoDataFrame sets these in place before any pandas hook runs, so refuse up front
+    def set_crs(self, *args, inplace=False, **kwargs):
+        if inplace:
+            _refuse("set_crs(inplace=True)")
+        return super().set_crs(*args, **kwargs)
+
+    def set_geometry(self, *args, inplace=False, **kwargs):
+        if inplace:
+            _refuse("set_geometry(inplace=True)")
+        return super().set_geometry(*args, **kwargs)
+
+    def rename_geometry(self, *args, inplace=False, **kwargs):
+        if inplace:
+            _refuse("rename_geometry(inplace=True)")
+        return super().rename_geometry(*args, **kwargs)
+
+    @property
+    def loc(self):
+        return _ReadOnlyIndexer(super().loc, 'loc')
+
+    @property
+    def iloc(self):
+        return _ReadOnlyIndexer(super().iloc, 'iloc')
+
+    @property
+    def at(self):
+        return _ReadOnlyIndexer(super().at, 'at')
+
+    @property
+    def iat(self):
+        return _ReadOnlyIndexer(super().iat, 'iat')
+
+
+# Mark the numpy arrays behind every column (including extension arrays' data and masks) read-only
+def _lock_arrays(frame):
+    for block in frame._mgr.blocks:
+        values = block.values
+        for array in (values, getattr(values, '_ndarray', None), getattr(values, '_data', None), getattr(values, '_mask', None)):
+            if isinstance(array, np.ndarray):
+                array.flags.writeable = False
+
+
+# Read-only view of a GeoDataFrame; shares its data instead of copying it (which locks the source's arrays too)
+def freeze(gdf):
+    if isinstance(gdf, FrozenGeoDataFrame):
+        return gdf
+    frozen = gdf.copy(deep=False)
+    _lock_arrays(frozen)
+    object.__setattr__(frozen, '__class__', FrozenGeoDataFrame)
+    return frozen
+
+
+def is_frozen(frame):
+    return isinstance(frame, FrozenGeoDataFrame)
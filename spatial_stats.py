@@ -0,0 +1,249 @@
+"""Spatial autocorrelation and hot spots for tract metrics.
+
+Ranking tracts shows the worst single tracts.  Interventions are planned
+for areas, though, so the coverage tabs also show where low supermarket
+coverage or dense fast food *cluster*:
+
+- ``weights_for`` builds the tract neighbour graph once per loaded frame,
+  as a scipy CSR matrix, and caches it weakly like the geometry tiers.
+  Queen contiguity (a shared edge or corner) comes from the frame's
+  STRtree.  A tract with no touching neighbour (an island) is linked to
+  its nearest tract.  ``kind='knn'`` gives each tract its ``k`` nearest
+  tracts instead.
+- ``morans_i`` is global Moran's I with row-standardized weights.  Its
+  permutation test shuffles the values into a matrix, one column per
+  permutation, and scores every permutation with one sparse
+  matrix-matrix product.
+- ``getis_ord_gi_star`` is local Getis-Ord Gi* (each tract's neighbourhood
+  including itself, binary weights).  The z-scores are one sparse
+  matrix-vector product.  Pseudo p-values come from conditional
+  permutations: each tract keeps its value and draws its neighbours'
+  values at random from the other tracts.  Tracts with the same number of
+  neighbours share one draw matrix, so a whole group is scored with array
+  indexing instead of a Python loop per tract.  A tract can be a hot or a
+  cold spot, so the p-values are two-sided: twice the share of
+  permutations on the far side of the observed sum.
+- ``hot_spots`` labels each tract as a hot or cold spot at 90/95/99%
+  confidence, or not significant.  The app draws the significant tracts
+  as a map layer.
+- Coverage ratio columns (residents per outlet, 0 for none) do not rise or
+  fall steadily with access, so ``metric_values`` scores them as outlets
+  per resident (``coverage_forecast.per_resident``).  A hot spot is then a
+  cluster of many outlets per resident and a cold spot a cluster of few:
+  dense fast food, or low supermarket access.
+
+Example:
+    python spatial_stats.py supermarkets.csv "2017_supermarket coverage ratio"
+"""
+import argparse
+import json
+import threading
+import weakref
+
+import numpy as np
+import pandas as pd
+
+import coverage_forecast
+
+DEFAULT_PERMUTATIONS = 999
+DEFAULT_K = 6
+# Pseudo p-value cut-offs of the hot and cold spot classes, strictest first
+CONFIDENCE_LEVELS = [(0.01, '99%'), (0.05, '95%'), (0.10, '90%')]
+NOT_SIGNIFICANT = 'Not significant'
+# Tracts scored per block in the Gi* permutation test, bounding its (tracts, permutations, neighbours) array
+_BLOCK_TRACTS = 256
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _points(geometries):
+    import shapely
+
+    # Longitude degrees shrink with latitude; scale them so distances are roughly isotropic
+    points = shapely.get_coordinates(shapely.point_on_surface(geometries))
+    points[:, 0] *= np.cos(np.radians(points[:, 1].mean()))
+    return points
+
+
+# Each geometry's k nearest others, as a 0/1 CSR matrix (not necessarily symmetric)
+def knn_weights(geometries, k=DEFAULT_K):
+    from scipy import sparse
+    from scipy.spatial import cKDTree
+
+    n = len(geometries)
+    k = min(k, n - 1)
+    _, neighbours = cKDTree(_points(geometries)).query(_points(geometries), k + 1)
+    rows = np.repeat(np.arange(n), k)
+    # The nearest point is the geometry itself
+    return sparse.csr_matrix((np.ones(n * k), (rows, neighbours[:, 1:].ravel())), shape=(n, n))
+
+
+# Queen contiguity as a symmetric 0/1 CSR matrix; islands are linked to their nearest geometry
+def contiguity_weights(geometries):
+    import shapely
+    from scipy import sparse
+
+    n = len(geometries)
+    left, right = shapely.STRtree(geometries).query(geometries, predicate='intersects')
+    touching = left != right
+    weights = sparse.csr_matrix((np.ones(touching.sum()), (left[touching], right[touching])), shape=(n, n))
+    islands = np.flatnonzero(np.diff(weights.indptr) == 0)
+    if len(islands) and n > 1:
+        nearest = knn_weights(geometries, 1)[islands]
+        links = sparse.csr_matrix((np.ones(len(islands)), (islands, nearest.indices)), shape=(n, n))
+        weights = ((weights + links + links.T) > 0).astype(float)
+    return weights
+
+
+# Neighbour weights of a loaded frame, built on first use and dropped with the frame
+def weights_for(gdf, kind='queen', k=DEFAULT_K):
+    key = (id(gdf), kind, k)
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0]() is gdf:
+            return entry[1]
+    geometries = gdf.geometry.values
+    weights = contiguity_weights(geometries) if kind == 'queen' else knn_weights(geometries, k)
+    with _cache_lock:
+        _cache[key] = (weakref.ref(gdf, lambda _: _cache.pop(key, None)), weights)
+    return weights
+
+
+def row_standardize(weights):
+    from scipy import sparse
+
+    sums = np.asarray(weights.sum(axis=1)).ravel()
+    return sparse.diags(np.divide(1.0, sums, out=np.zeros_like(sums), where=sums > 0)) @ weights
+
+
+# Folded pseudo p-value: the share of simulations at least as extreme as `observed`, on its side of them
+def _pseudo_p_value(observed, simulated, axis=-1):
+    permutations = simulated.shape[axis]
+    larger = (simulated >= np.expand_dims(observed, axis)).sum(axis=axis)
+    larger = np.minimum(larger, permutations - larger)
+    return (larger + 1) / (permutations + 1)
+
+
+# Global Moran's I of `values` under `weights`, with a permutation test; returns a summary dict
+def morans_i(values, weights, permutations=DEFAULT_PERMUTATIONS, seed=0):
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    standardized = row_standardize(weights)
+    s0 = standardized.sum()
+    z = values - values.mean()
+    scale = n / s0 / (z @ z)
+    statistic = scale * (z @ (standardized @ z))
+
+    # One permutation per column; every column is scored by the same sparse product
+    shuffled = np.random.default_rng(seed).permuted(np.repeat(z[:, None], permutations, axis=1), axis=0)
+    simulated = scale * np.einsum('ij,ij->j', shuffled, standardized @ shuffled)
+    return {
+        'I': float(statistic),
+        'expected': -1.0 / (n - 1),
+        'z_score': float((statistic - simulated.mean()) / simulated.std()),
+        'p_value': float(_pseudo_p_value(np.array(statistic), simulated)),
+        'permutations': permutations,
+        'n': n,
+    }
+
+
+# Local Getis-Ord Gi* z-scores and two-sided conditional-permutation pseudo p-values of `values` under `weights`
+def getis_ord_gi_star(values, weights, permutations=DEFAULT_PERMUTATIONS, seed=0):
+    from scipy import sparse
+
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    # Binary weights with each tract in its own neighbourhood
+    star = ((weights + sparse.identity(n, format='csr')) > 0).astype(float).tocsr()
+    counts = np.diff(star.indptr).astype(float)
+    local = star @ values
+    mean, std = values.mean(), values.std()
+    z_scores = (local - mean * counts) / (std * np.sqrt((n * counts - counts ** 2) / (n - 1)))
+
+    # Draws of neighbour positions among the other n - 1 tracts, without replacement within a permutation
+    rng = np.random.default_rng(seed)
+    most = int(counts.max()) - 1
+    draws = np.argpartition(rng.random((permutations, n - 1)), most - 1, axis=1)[:, :most] if most > 0 else None
+    simulated = np.empty((n, permutations))
+    for cardinality in np.unique(counts.astype(int) - 1):
+        tracts = np.flatnonzero(counts - 1 == cardinality)
+        if cardinality == 0:
+            simulated[tracts] = values[tracts, None]
+            continue
+        picks = draws[:, :cardinality]
+        for start in range(0, len(tracts), _BLOCK_TRACTS):
+            block = tracts[start:start + _BLOCK_TRACTS]
+            # Skip the tract itself: draws at or past its position move up by one
+            positions = picks[None] + (picks[None] >= block[:, None, None])
+            simulated[block] = values[block, None] + values[positions].sum(axis=2)
+    return z_scores, np.minimum(2 * _pseudo_p_value(local, simulated), 1.0)
+
+
+# Hot/cold spot class of each tract from its Gi* z-score and two-sided pseudo p-value
+def classify(z_scores, p_values):
+    labels = np.full(len(z_scores), NOT_SIGNIFICANT, dtype=object)
+    for cutoff, level in reversed(CONFIDENCE_LEVELS):
+        significant = p_values <= cutoff
+        labels[significant & (z_scores > 0)] = f'Hot spot ({level})'
+        labels[significant & (z_scores < 0)] = f'Cold spot ({level})'
+    return labels
+
+
+# Values a column is tested on: outlets per resident for a coverage ratio column (missing stays missing),
+# the column itself otherwise
+def metric_values(gdf, column):
+    values = pd.to_numeric(gdf[column], errors='coerce').to_numpy(dtype=float)
+    if coverage_forecast.COVERAGE_PATTERN.match(column):
+        return np.where(np.isnan(values), np.nan, coverage_forecast.per_resident(values))
+    return values
+
+
+def _scored(gdf, column, kind, k):
+    values = metric_values(gdf, column)
+    valid = np.isfinite(values)
+    weights = weights_for(gdf, kind, k)
+    if not valid.all():
+        # Tracts without a value drop out of the graph
+        weights = weights[valid][:, valid]
+    return values[valid], weights, valid
+
+
+# Gi* hot spots of a frame's column: gi_z, p_value and hot_spot per tract, indexed like the frame
+def hot_spots(gdf, column, kind='queen', k=DEFAULT_K, permutations=DEFAULT_PERMUTATIONS, seed=0):
+    values, weights, valid = _scored(gdf, column, kind, k)
+    spots = pd.DataFrame({'gi_z': np.nan, 'p_value': np.nan, 'hot_spot': NOT_SIGNIFICANT}, index=gdf.index)
+    if len(values) > 2:
+        z_scores, p_values = getis_ord_gi_star(values, weights, permutations, seed)
+        spots.loc[valid, 'gi_z'] = z_scores
+        spots.loc[valid, 'p_value'] = p_values
+        spots.loc[valid, 'hot_spot'] = classify(z_scores, p_values)
+    return spots
+
+
+# Global Moran's I of a frame's column; None with too few tracts or no variation
+def moran(gdf, column, kind='queen', k=DEFAULT_K, permutations=DEFAULT_PERMUTATIONS, seed=0):
+    values, weights, _ = _scored(gdf, column, kind, k)
+    if len(values) < 3 or np.ptp(values) == 0:
+        return None
+    return morans_i(values, weights, permutations, seed)
+
+
+def main(argv=None):
+    from borough_partitions import read_tracts
+
+    parser = argparse.ArgumentParser(description="Global Moran's I and Getis-Ord Gi* hot spots of a tract column.")
+    parser.add_argument('path', help="WKT CSV or GeoParquet tract table")
+    parser.add_argument('column', help="e.g. '2017_supermarket coverage ratio'")
+    parser.add_argument('--weights', choices=['queen', 'knn'], default='queen')
+    parser.add_argument('--k', type=int, default=DEFAULT_K, help="neighbours per tract for --weights knn")
+    parser.add_argument('--permutations', type=int, default=DEFAULT_PERMUTATIONS)
+    args = parser.parse_args(argv)
+
+    gdf = read_tracts(args.path)
+    print(json.dumps(moran(gdf, args.column, args.weights, args.k, args.permutations), indent=2))
+    print(hot_spots(gdf, args.column, args.weights, args.k, args.permutations)['hot_spot'].value_counts().to_string())
+
+
+if __name__ == "__main__":
+    main()
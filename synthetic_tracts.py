@@ -0,0 +1,122 @@
+"""Synthetic scale-up copies of the tract datasets.
+
+``scale_tracts`` tiles the real tracts ``factor`` times.  Each copy reuses the
+original polygon shapes, shifted so copies do not overlap, and gets new
+TRACTCE codes.  Coverage ratios get multiplicative jitter, and the yearly
+ranks are recomputed over the enlarged table the same way the real ones
+were.  The output keeps the exact CSV schema (WKT geometry included), so
+benchmarks exercise the app's real loading path.
+
+Example:
+    python synthetic_tracts.py --factors 1 10 100 --output-dir .cache/synthetic
+"""
+import argparse
+import math
+import os
+import re
+
+import numpy as np
+import pandas as pd
+from shapely import affinity, wkt
+
+SOURCES = {
+    'supermarkets': "supermarkets.csv",
+    'fast_food': "Fast Food Restaurants.csv",
+    'lila': "LILAZones_geo.csv",
+}
+NO_RANK = 'no rank'
+COVERAGE_PATTERN = re.compile(r'^(\d{4})_(.*coverage ratio)$', re.IGNORECASE)
+# TRACTCE codes are six digits, so copy n gets codes starting at n * 1,000,000
+TRACT_CODE_STRIDE = 1_000_000
+
+
+def _tract_key(frame):
+    return 'TRACTCE' if 'TRACTCE' in frame.columns else 'Census Tract Area'
+
+
+# Yearly (ratio column, rank column) pairs present in a coverage table
+def coverage_columns(frame):
+    pairs = []
+    for column in frame.columns:
+        match = COVERAGE_PATTERN.match(column)
+        if match and f'{match.group(1)}_rank' in frame.columns:
+            pairs.append((column, f'{match.group(1)}_rank'))
+    return pairs
+
+
+# Whether rank 1 goes to the highest ratio in the real data (fast food) or the lowest (supermarkets)
+def _ranks_descending(frame, ratio_column, rank_column):
+    ranked = frame[frame[rank_column] != NO_RANK]
+    if len(ranked) < 2:
+        return False
+    ranks = pd.to_numeric(ranked[rank_column], errors='coerce')
+    return ranks.corr(ranked[ratio_column].astype(float)) < 0
+
+
+def _rank_labels(ratios, descending):
+    ranks = ratios.where(ratios > 0).rank(method='min', ascending=not descending)
+    return ranks.map(lambda rank: NO_RANK if pd.isna(rank) else str(int(rank)))
+
+
+# Tile a tract table `factor` times with shifted geometry, new tract codes and re-ranked coverage
+def scale_tracts(frame, factor, seed=0):
+    if factor <= 1:
+        return frame.copy()
+    rng = np.random.default_rng(seed)
+    geometries = frame['geometry'].map(wkt.loads)
+    minx, miny, maxx, maxy = np.array([geometry.bounds for geometry in geometries]).T
+    width, height = maxx.max() - minx.min(), maxy.max() - miny.min()
+    columns_per_row = math.ceil(math.sqrt(factor))
+    key = _tract_key(frame)
+    pairs = coverage_columns(frame)
+    directions = {rank: _ranks_descending(frame, ratio, rank) for ratio, rank in pairs}
+
+    copies = []
+    for copy_index in range(int(factor)):
+        copy = frame.copy()
+        dx = (copy_index % columns_per_row) * width * 1.05
+        dy = (copy_index // columns_per_row) * height * 1.05
+        if copy_index:
+            copy['geometry'] = [affinity.translate(geometry, dx, dy).wkt for geometry in geometries]
+            copy[key] = copy[key].astype(int) + copy_index * TRACT_CODE_STRIDE
+            for ratio, _ in pairs:
+                jitter = rng.lognormal(0, 0.1, size=len(copy))
+                copy[ratio] = copy[ratio].astype(float) * jitter
+        copies.append(copy)
+
+    scaled = pd.concat(copies, ignore_index=True)
+    for ratio, rank in pairs:
+        scaled[rank] = _rank_labels(scaled[ratio].astype(float), directions[rank])
+    return scaled
+
+
+# Write scaled copies of every source dataset; returns {factor: {dataset: path}}
+def write_scaled_datasets(factors, output_dir, sources=None, seed=0):
+    sources = sources or SOURCES
+    written = {}
+    for factor in factors:
+        factor_dir = os.path.join(output_dir, f"{factor}x")
+        os.makedirs(factor_dir, exist_ok=True)
+        written[factor] = {}
+        for name, path in sources.items():
+            target = os.path.join(factor_dir, os.path.basename(path))
+            if not os.path.exists(target):
+                scale_tracts(pd.read_csv(path), factor, seed).to_csv(target, index=False)
+            written[factor][name] = target
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate scaled-up synthetic copies of the tract datasets.")
+    parser.add_argument('--factors', nargs='+', type=int, default=[1, 10, 100])
+    parser.add_argument('--output-dir', default=os.path.join('.cache', 'synthetic'))
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    for factor, paths in write_scaled_datasets(args.factors, args.output_dir, seed=args.seed).items():
+        for name, path in paths.items():
+            print(f"{factor}x {name}: {path}")
+
+
+if __name__ == "__main__":
+    main()
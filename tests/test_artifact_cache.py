@@ -0,0 +1,87 @@
+import textwrap
+
+import pytest
+
+import artifact_cache
+
+
+# `source` defined as a function named `compute` in a module named `sample`, like a cached loader
+def define(source):
+    namespace = {'__name__': 'sample'}
+    exec(textwrap.dedent(source), namespace)
+    return namespace['compute']
+
+
+def key(source, args=('supermarkets.csv', 'v1')):
+    return artifact_cache.ArtifactCache.key(define(source), args)
+
+
+BASE = """
+    def compute(path, version):
+        return read(path)['2017_rank'] * 2
+"""
+
+
+def test_same_function_gets_the_same_key():
+    assert key(BASE) == key(BASE)
+
+
+@pytest.mark.parametrize('changed', [
+    # A column name
+    """
+    def compute(path, version):
+        return read(path)['2015_rank'] * 2
+    """,
+    # A multiplier
+    """
+    def compute(path, version):
+        return read(path)['2017_rank'] * 3
+    """,
+    # A constant inside a nested function
+    """
+    def compute(path, version):
+        return read(path)['2017_rank'].map(lambda rank: rank * 3)
+    """,
+    # A default argument
+    """
+    def compute(path, version, scale=3):
+        return read(path)['2017_rank'] * scale
+    """,
+])
+def test_changed_body_gets_a_new_key(changed):
+    assert key(changed) != key(BASE)
+
+
+def test_nested_constants_defaults_and_closures_are_part_of_the_key():
+    assert key(BASE.replace('* 2', '.map(lambda rank: rank * 2)')) != key(BASE.replace('* 2', '.map(lambda rank: rank * 4)'))
+    assert key(BASE.replace('version)', 'version, scale=2)')) != key(BASE.replace('version)', 'version, scale=4)'))
+
+    def closing_over(scale):
+        def compute(path, version):
+            return scale
+        return compute
+
+    compute_2, compute_4 = closing_over(2), closing_over(4)
+    assert artifact_cache.ArtifactCache.key(compute_2, ()) != artifact_cache.ArtifactCache.key(compute_4, ())
+
+
+def test_arguments_and_file_versions_are_part_of_the_key(tmp_path):
+    data = tmp_path / 'tracts.csv'
+    data.write_text('a\n1\n')
+    function = define(BASE)
+    before = artifact_cache.ArtifactCache.key(function, ('a', 'v1'), files=[str(data)])
+    assert artifact_cache.ArtifactCache.key(function, ('a', 'v2'), files=[str(data)]) != before
+    data.write_text('a\n2\n')
+    assert artifact_cache.ArtifactCache.key(function, ('a', 'v1'), files=[str(data)]) != before
+
+
+def test_call_stores_and_reuses_results(tmp_path):
+    compute = define("""
+        def compute(value):
+            return value * 2
+    """)
+    cache = artifact_cache.ArtifactCache(str(tmp_path), max_bytes=1 << 20)
+    assert cache.lookup(cache.key(compute, (21,))) == (False, None)
+    assert cache.call(compute, (21,)) == 42
+    assert cache.lookup(cache.key(compute, (21,))) == (True, 42)
+    assert cache.status()['entries'] == 1
@@ -0,0 +1,28 @@
+import pandas as pd
+
+import atlas_ingest
+
+
+def write_atlas(path, keys):
+    pd.DataFrame({atlas_ingest.ATLAS_KEY: keys, 'Urban': range(len(keys))}).to_csv(path, index=False)
+
+
+def read_keys(path, prefixes):
+    chunks = list(atlas_ingest.read_atlas_chunks(str(path), prefixes))
+    return pd.concat(chunks)[atlas_ingest.ATLAS_KEY].tolist() if chunks else []
+
+
+def test_unpadded_keys_of_single_digit_states_are_kept(tmp_path):
+    atlas = tmp_path / 'atlas.csv'
+    # Alabama (01) is stored as a 10-digit number; Delaware (10) starts with the same digits once the zero is gone
+    write_atlas(atlas, ['1001020100', '1001020200', '1003010100', '10001040100', '36047000100'])
+    assert read_keys(atlas, atlas_ingest.geoid_prefixes('01', ['001'])) == ['01001020100', '01001020200']
+    assert read_keys(atlas, atlas_ingest.geoid_prefixes('1')) == ['01001020100', '01001020200', '01003010100']
+    assert read_keys(atlas, atlas_ingest.geoid_prefixes('10')) == ['10001040100']
+
+
+def test_padded_keys_still_match(tmp_path):
+    atlas = tmp_path / 'atlas.csv'
+    atlas.write_text(f'{atlas_ingest.ATLAS_KEY},Urban\n36047000100,1\n36061000100,0\n"36047000200",1\n')
+    assert read_keys(atlas, atlas_ingest.geoid_prefixes('36', ['047'])) == ['36047000100', '36047000200']
+    assert len(read_keys(atlas, ())) == 3
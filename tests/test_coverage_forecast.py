@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+import coverage_forecast
+
+SUFFIX = 'supermarket coverage ratio'
+YEARS = [2013, 2014, 2015, 2017]
+
+
+# One row per tract: residents per supermarket in YEARS (0 = none), ranked like the supermarket table (1 = lowest ratio)
+def coverage_frame(ratios):
+    frame = pd.DataFrame({'TRACTCE': np.arange(len(ratios))})
+    for position, year in enumerate(YEARS):
+        column = pd.Series([row[position] for row in ratios], dtype=float)
+        frame[f'{year}_{SUFFIX}'] = column
+        frame[f'{year}_rank'] = column.where(column > 0).rank(method='min').map(lambda rank: 'no rank' if np.isnan(rank) else str(int(rank)))
+    return frame
+
+
+def test_fill_gaps_interpolates_missing_years_linearly():
+    filled, full = coverage_forecast.fill_gaps(np.array([[1.0, 3.0, 7.0], [2.0, 2.0, 0.0]]), [2014, 2015, 2017])
+    np.testing.assert_array_equal(full, [2014, 2015, 2016, 2017])
+    np.testing.assert_allclose(filled, [[1, 3, 5, 7], [2, 2, 1, 0]])
+
+
+def test_forecast_intervals_widen_with_the_horizon():
+    series = np.array([[1.0, 1.4, 0.8, 1.2, 0.9, 1.1]])
+    mean, low, high = coverage_forecast.forecast(series, 3)
+    assert np.allclose(mean, mean[:, :1])
+    assert (np.diff(high[0]) > 0).all() and (np.diff(low[0]) < 0).all()
+    assert (low <= mean).all() and (mean <= high).all()
+
+
+def test_extend_adds_imputed_and_forecast_years():
+    frame = coverage_frame([
+        [1000, 1000, 1000, 1000],  # steady: one supermarket per 1000 residents
+        [0, 0, 0, 0],  # never a supermarket
+        [500, 500, 500, 500],
+        [1000, 1000, 1000, 500],  # doubles its supermarkets per resident by 2017
+    ])
+    extended = coverage_forecast.extend(frame, through=2020)
+
+    kinds = coverage_forecast.year_kinds(extended)
+    assert kinds[2016] == coverage_forecast.IMPUTED
+    assert [year for year, kind in kinds.items() if kind == coverage_forecast.FORECAST] == [2018, 2019, 2020]
+    # 2016 sits halfway between 2015 and 2017 in supermarkets per resident: 1.5 per 1000 residents
+    np.testing.assert_allclose(extended[f'2016_{SUFFIX}'], [1000, 0, 500, 1000 / 1.5])
+    assert extended['2016_rank'].tolist() == ['3', 'no rank', '1', '2']
+    # A steady tract forecasts its level with a zero-width interval; a tract without supermarkets stays without
+    for year in [2018, 2020]:
+        row = extended.iloc[0]
+        assert row[f'{year}_{SUFFIX}'] == row[f'{year}_{SUFFIX} low'] == row[f'{year}_{SUFFIX} high'] == 1000
+        no_outlet = extended.iloc[1]
+        assert no_outlet[f'{year}_{SUFFIX}'] == 0 and no_outlet[f'{year}_rank'] == 'no rank'
+        assert np.isnan(no_outlet[f'{year}_{SUFFIX} high'])
+    # The original columns are untouched
+    pd.testing.assert_frame_equal(extended[frame.columns], frame)
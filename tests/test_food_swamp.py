@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import food_swamp
+
+YEAR = 2017
+
+
+def coverage_table(suffix, ratios, tracts=None):
+    tracts = range(len(ratios)) if tracts is None else tracts
+    return pd.DataFrame({'TRACTCE': list(tracts), f'{YEAR}_{suffix}': ratios, f'{YEAR}_rank': '1'})
+
+
+def test_index_bounds_and_ranks():
+    # Residents per outlet, 0 = none
+    supermarkets = coverage_table(food_swamp.SUPERMARKET_SUFFIX, [1000, 0, 0, 1000, 0, 1000, 1000])
+    # Tract 5 is missing from the fast food table
+    fast_food = coverage_table(food_swamp.FAST_FOOD_SUFFIX, [0, 500, 250, 1000, 0, 1000], tracts=[0, 1, 2, 3, 4, 6])
+    swamps = food_swamp.compute(supermarkets, fast_food)
+
+    index = swamps[f'{YEAR}_{food_swamp.INDEX_SUFFIX}']
+    np.testing.assert_allclose(index, [0, 1, 1, 0.5, np.nan, np.nan, 0.5])
+    assert index.dropna().between(0, 1).all()
+    # Only-fast-food tracts rank first, the densest of them on top; equal tracts share a rank
+    assert swamps[f'{YEAR}_rank'].tolist() == ['5', '2', '1', '3', 'no rank', 'no rank', '3']
+    assert swamps['TRACTCE'].tolist() == list(range(7))
+
+
+def test_index_is_fast_food_share_of_outlets_per_resident():
+    # One supermarket per 1000 residents and one fast food restaurant per 250: 4 of every 5 outlets are fast food
+    swamps = food_swamp.compute(coverage_table(food_swamp.SUPERMARKET_SUFFIX, [1000]), coverage_table(food_swamp.FAST_FOOD_SUFFIX, [250]))
+    assert swamps[f'{YEAR}_{food_swamp.INDEX_SUFFIX}'].iloc[0] == pytest.approx(0.8)
@@ -0,0 +1,63 @@
+import numpy as np
+import geopandas as gpd
+import pytest
+from scipy import sparse
+from shapely.geometry import box
+
+import spatial_stats
+
+COLUMN = '2017_Fast Food Coverage Ratio'
+
+
+# A path graph 0 - 1 - 2 - ... as binary weights
+def chain_weights(n):
+    rows = np.arange(n - 1)
+    upper = sparse.csr_matrix((np.ones(n - 1), (rows, rows + 1)), shape=(n, n))
+    return (upper + upper.T).tocsr()
+
+
+# side x side unit squares, values given row by row
+def grid_frame(values, side, column=COLUMN):
+    cells = [box(col, row, col + 1, row + 1) for row in range(side) for col in range(side)]
+    return gpd.GeoDataFrame({column: values}, geometry=cells, crs=4326)
+
+
+def test_gi_star_z_scores_match_worked_example():
+    # Neighbourhoods including the tract itself: {0,1}, {0,1,2}, {1,2,3}, {2,3,4}, {3,4}; mean 3, std sqrt(2).
+    # Tract 0: (3 - 3*2) / (sqrt(2) * sqrt((5*2 - 2**2) / 4)) = -sqrt(3); tract 1: (6 - 9) / (sqrt(2) * sqrt(1.5)) = -sqrt(3)
+    z_scores, p_values = spatial_stats.getis_ord_gi_star([1, 2, 3, 4, 5], chain_weights(5), permutations=99)
+    root3 = np.sqrt(3)
+    np.testing.assert_allclose(z_scores, [-root3, -root3, 0, root3, root3])
+    assert ((p_values > 0) & (p_values <= 1)).all()
+
+
+def test_coverage_ratios_are_scored_per_resident():
+    gdf = grid_frame([0, 1000, 250, np.nan], 2)
+    np.testing.assert_allclose(spatial_stats.metric_values(gdf, COLUMN), [0, 0.001, 0.004, np.nan])
+
+
+def test_hot_spots_mean_dense_outlets_and_cold_spots_sparse_ones():
+    side = 12
+    rng = np.random.default_rng(1)
+    ratios = rng.uniform(1500, 2500, (side, side))
+    # Top-left corner: one outlet per 200 residents; bottom-right corner: no outlet at all (ratio 0)
+    ratios[:4, :4] = 200
+    ratios[-4:, -4:] = 0
+    spots = spatial_stats.hot_spots(grid_frame(ratios.ravel(), side), COLUMN)
+    labels = spots['hot_spot'].to_numpy().reshape(side, side)
+    assert labels[1, 1].startswith('Hot spot')
+    assert labels[-2, -2].startswith('Cold spot')
+
+
+def test_p_values_are_two_sided():
+    side = 20
+    values = np.random.default_rng(2).normal(size=side * side)
+    gdf = grid_frame(values, side, 'value')
+    weights = spatial_stats.weights_for(gdf)
+    _, two_sided = spatial_stats.getis_ord_gi_star(values, weights, permutations=199)
+    # A tract exactly at the middle of its permutations has p = 1
+    assert two_sided.max() <= 1
+    assert two_sided.min() >= 2 / 200
+    # Without spatial structure, about 10% of tracts fall under the 90% cut-off
+    flagged = (spatial_stats.hot_spots(gdf, 'value', permutations=199)['hot_spot'] != spatial_stats.NOT_SIGNIFICANT).mean()
+    assert flagged == pytest.approx(0.10, abs=0.04)
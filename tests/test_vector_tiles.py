@@ -0,0 +1,44 @@
+import urllib.request
+
+import geopandas as gpd
+import pytest
+from shapely.geometry import box
+
+import vector_tiles
+
+
+@pytest.fixture
+def layer():
+    gdf = gpd.GeoDataFrame({'TRACTCE': ['000100']}, geometry=[box(-74.0, 40.6, -73.9, 40.7)], crs=4326)
+    return vector_tiles.TileLayer('lila', gdf, version='abc')
+
+
+def test_tile_url_defaults_to_the_bound_address(layer):
+    server = vector_tiles.start_server(cache_dir=None)
+    try:
+        server.add_layer(layer)
+        url = server.tile_url('lila')
+        assert url == f"http://127.0.0.1:{server.server_address[1]}/lila/{{z}}/{{x}}/{{y}}.pbf?v=abc"
+        x, y = (int(position) for position in vector_tiles.mercator_tile(-73.95, 40.65, 12))
+        with urllib.request.urlopen(url.format(z=12, x=x, y=y)) as response:
+            assert response.headers['Content-Type'] == 'application/vnd.mapbox-vector-tile'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def test_tile_url_uses_the_public_url(layer):
+    server = vector_tiles.TileServer(('127.0.0.1', 0), public_url='https://example.org/tiles/')
+    try:
+        server.add_layer(layer)
+        assert server.tile_url('lila') == "https://example.org/tiles/lila/{z}/{x}/{y}.pbf?v=abc"
+    finally:
+        server.server_close()
+
+
+def test_wildcard_bind_is_reached_as_localhost():
+    server = vector_tiles.TileServer(('0.0.0.0', 0))
+    try:
+        assert server.base_url() == f"http://localhost:{server.server_address[1]}"
+    finally:
+        server.server_close()
@@ -0,0 +1,213 @@
+"""Cross-dataset tract index for combined tract profiles.
+
+Each tract dataset keys its tracts differently.  The LILA zones use
+``Census Tract Area`` (98200), the coverage layers ``TRACTCE`` (57800) with
+STATEFP/COUNTYFP/GEOID alongside, and the model features the 11-digit GEOID
+string.  ``tract_geoids`` normalizes every one of them to the GEOID.  A
+dataset without a county column takes the county of the partition it was
+read from.
+
+``TractKeys`` maps a frame's GEOIDs to row positions.  It is built once per
+loaded frame and cached weakly, like the geometry tiers.  ``TractIndex``
+puts the datasets of a page together.  ``profile(geoid)`` is then a dict
+lookup and a few array reads per dataset, never a merge.
+``food_desert_probabilities`` adds the notebook's Random Forest estimate
+of the probability that each tract is a food desert.
+
+Example:
+    python tract_profiles.py 98200 36047057800
+"""
+import argparse
+import json
+import threading
+import weakref
+
+import pandas as pd
+
+STATE = '36'
+DEFAULT_COUNTY = '047'
+# Key columns the datasets use for their tracts, in order of preference
+_TRACT_COLUMNS = ['TRACTCE', 'Census Tract Area']
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+# 11-digit GEOID strings for a frame's tracts: GEOID, else state + county + a six-digit tract code
+def tract_geoids(gdf, county=DEFAULT_COUNTY, state=STATE):
+    if 'GEOID' in gdf.columns:
+        return gdf['GEOID'].astype('Int64').astype(str).str.zfill(11)
+    tract_column = next((column for column in _TRACT_COLUMNS if column in gdf.columns), None)
+    if tract_column is None:
+        raise ValueError(f"No tract key column; expected GEOID or one of {_TRACT_COLUMNS}")
+    tracts = gdf[tract_column].astype('Int64').astype(str).str.zfill(6)
+    if 'COUNTYFP' in gdf.columns:
+        counties = gdf['COUNTYFP'].astype('Int64').astype(str).str.zfill(3)
+    else:
+        counties = str(county).zfill(3)
+    return str(state).zfill(2) + counties + tracts
+
+
+# GEOIDs a search string can mean: a full GEOID, a tract code (98200) or a tract name (982 or 982.01)
+def candidate_keys(text, county=DEFAULT_COUNTY, state=STATE):
+    text = str(text).strip()
+    prefix = str(state).zfill(2) + str(county).zfill(3)
+    whole, _, fraction = text.partition('.')
+    if fraction:
+        if not (whole.isdigit() and fraction.isdigit() and len(whole) <= 4):
+            return set()
+        return {prefix + f"{int(whole) * 100 + int(fraction.ljust(2, '0')[:2]):06d}"}
+    if not text.isdigit():
+        return set()
+    if len(text) == 11:
+        return {text}
+    candidates = {prefix + text.zfill(6)} if len(text) <= 6 else set()
+    if len(text) <= 4:
+        candidates.add(prefix + f"{int(text) * 100:06d}")
+    return candidates
+
+
+# GEOID of the first tract of a frame containing a point (restricted to `mask` rows), or None
+def tract_at(gdf, lon, lat, county=DEFAULT_COUNTY, mask=None):
+    from shapely.geometry import Point
+
+    hits = gdf.sindex.query(Point(lon, lat), predicate='intersects')
+    if mask is not None:
+        hits = hits[mask.to_numpy()[hits]]
+    if len(hits) == 0:
+        return None
+    return tract_geoids(gdf.iloc[[hits.min()]], county).iloc[0]
+
+
+# GEOID -> row position of one frame
+class TractKeys:
+    def __init__(self, gdf, county=DEFAULT_COUNTY):
+        geoids = tract_geoids(gdf, county)
+        # Keep the first row of a duplicated key, as a search on the map would
+        self.positions = {geoid: position for position, geoid in reversed(list(enumerate(geoids)))}
+        self._columns = {}
+
+    # A column as an array, so a profile reads one element instead of building a Series
+    def column(self, gdf, name):
+        values = self._columns.get(name)
+        if values is None:
+            values = self._columns[name] = gdf[name].to_numpy()
+        return values
+
+    def __len__(self):
+        return len(self.positions)
+
+    def __contains__(self, geoid):
+        return geoid in self.positions
+
+
+# Keys of a loaded frame, built on first use and dropped with the frame
+def tract_keys_for(gdf, county=DEFAULT_COUNTY):
+    key = (id(gdf), county)
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is not None and entry[0]() is gdf:
+            return entry[1]
+        keys = TractKeys(gdf, county)
+        _cache[key] = (weakref.ref(gdf, lambda _: _cache.pop(key, None)), keys)
+        return keys
+
+
+# Combined lookups across the datasets of a page.
+# `datasets` maps a name to a BoroughView; `fields` maps it to the columns its profile shows
+class TractIndex:
+    def __init__(self, datasets, fields, predictions=None):
+        self.datasets = datasets
+        self.fields = fields
+        # county -> {GEOID: probability}, or None
+        self.predictions = predictions
+        self._predicted = {}
+        self._frames = {}
+        for name, view in datasets.items():
+            for county, gdf in view.frames():
+                self._frames[name, county] = (gdf, tract_keys_for(gdf, county))
+
+    @property
+    def counties(self):
+        return sorted({county for _, county in self._frames})
+
+    # GEOIDs a search string may mean, one per indexed borough that has the tract
+    def lookup(self, text):
+        candidates = set().union(*(candidate_keys(text, county) for county in self.counties))
+        return [geoid for geoid in sorted(candidates) if self.has(geoid)]
+
+    def has(self, geoid):
+        return any(geoid in keys for _, keys in self._frames.values())
+
+    # Every dataset's fields for a tract (None where a dataset lacks it) plus its predicted probability
+    def profile(self, geoid):
+        county = geoid[2:5]
+        profile = {'geoid': geoid, 'county': county, 'tract': geoid[5:], 'datasets': {}}
+        for name in self.datasets:
+            gdf, keys = self._frames.get((name, county), (None, None))
+            position = None if keys is None else keys.positions.get(geoid)
+            if position is None:
+                profile['datasets'][name] = None
+                continue
+            profile['datasets'][name] = {field: keys.column(gdf, field)[position] for field in self.fields.get(name, [])
+                                         if field in gdf.columns}
+        if self.predictions is not None:
+            if county not in self._predicted:
+                self._predicted[county] = self.predictions(county) or {}
+            profile['predicted'] = self._predicted[county].get(geoid)
+        return profile
+
+
+# Probability that each tract is a food desert, from the notebook's model trained on the tract table.
+# Tracts of the training table get out-of-fold estimates, so a tract's own label never scores it
+def food_desert_probabilities(tracts, model_name='Random Forest', training_path=None, folds=5):
+    from sklearn.model_selection import cross_val_predict
+
+    from feature_pipeline import DEFAULT_TRACT_PATH, TARGET_COLUMN, build_features, load_feature_data
+    from food_desert_models import make_model
+
+    X, y = load_feature_data(training_path or DEFAULT_TRACT_PATH)
+    columns = [column for column in tracts.columns if column != 'geometry']
+    features = build_features(pd.DataFrame(tracts[columns])).drop(columns=[TARGET_COLUMN], errors='ignore')
+    features.index = features.index.astype(str).str.zfill(11)
+    features = features.reindex(columns=X.columns, fill_value=0)
+
+    probabilities = pd.Series(make_model(model_name).fit(X, y).predict_proba(features)[:, 1], index=features.index)
+    out_of_fold = pd.Series(cross_val_predict(make_model(model_name), X, y, cv=folds, method='predict_proba')[:, 1],
+                            index=X.index.astype(str).str.zfill(11))
+    trained = probabilities.index.intersection(out_of_fold.index)
+    probabilities[trained] = out_of_fold[trained]
+    return probabilities.round(4).to_dict()
+
+
+def main(argv=None):
+    import functools
+
+    import geopandas as gpd
+    from shapely import wkt
+
+    from borough_partitions import BoroughView
+
+    parser = argparse.ArgumentParser(description="Print combined tract profiles from the bundled Brooklyn datasets.")
+    parser.add_argument('keys', nargs='+', help="tract codes (98200), tract names (982.01) or GEOIDs")
+    args = parser.parse_args(argv)
+
+    @functools.lru_cache(maxsize=None)
+    def read(path):
+        data = pd.read_csv(path)
+        return gpd.GeoDataFrame(data, geometry=data['geometry'].map(wkt.loads), crs=4326)
+
+    paths = {'lila': 'LILAZones_geo.csv', 'supermarkets': 'supermarkets.csv', 'fast_food': 'Fast Food Restaurants.csv'}
+    datasets = {name: BoroughView(name, {DEFAULT_COUNTY: path}, read) for name, path in paths.items()}
+    fields = {'lila': ['Status', 'NTA Name', 'Food Index'],
+              'supermarkets': ['TRACTCE', '2017_supermarket coverage ratio', '2017_rank'],
+              'fast_food': ['2017_Fast Food Coverage Ratio', '2017_rank']}
+    predictions = food_desert_probabilities(read(paths['supermarkets']))
+    index = TractIndex(datasets, fields, lambda county: predictions)
+    for key in args.keys:
+        for geoid in index.lookup(key) or [None]:
+            print(json.dumps(index.profile(geoid) if geoid else {'key': key, 'found': False}, default=str, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""Budgeted hyperparameter search for the food-desert models.
+
+The notebook's ``GridSearchCV`` fits every configuration with the full number
+of trees on all five folds.  Here each model is tuned with successive
+halving instead: every configuration starts with a small tree budget, and
+only the best 1/eta move on to the next budget.  The folds of each round
+run in a process pool.  Every (configuration, budget, fold) score is stored
+in the on-disk result cache, so an interrupted or extended search picks up
+where it stopped without refitting.
+
+Example:
+    python tuning.py --models "Random Forest" LightGBM XGBoost --compare-grid
+"""
+import argparse
+import itertools
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import StratifiedKFold
+
+from ablation import plan_workers
+from feature_pipeline import DEFAULT_TRACT_PATH
+from food_desert_models import (FEATURE_SETS, RANDOM_STATE, available_models, data_fingerprint, load_model_data,
+                                make_model, score_predictions, select_features, split_data)
+from result_cache import ResultCache
+
+DEFAULT_CACHE_DIR = os.path.join('.cache', 'tuning')
+CV_FOLDS = 5
+
+# Search spaces; the tree count is the budget that successive halving grows
+SEARCH_SPACES = {
+    'Random Forest': {
+        'resource': 'n_estimators',
+        'max_resource': 500,
+        'grid': {'max_depth': [None, 5, 10, 15], 'min_samples_split': [2, 5, 10]},
+    },
+    'LightGBM': {
+        'resource': 'n_estimators',
+        'max_resource': 500,
+        'grid': {'num_leaves': [15, 31, 63], 'learning_rate': [0.03, 0.1], 'min_child_samples': [10, 20, 40]},
+    },
+    'XGBoost': {
+        'resource': 'n_estimators',
+        'max_resource': 500,
+        'grid': {'max_depth': [3, 6, 9], 'learning_rate': [0.03, 0.1], 'subsample': [0.8, 1.0]},
+    },
+}
+
+# The notebook's exhaustive Random Forest grid, used as the comparison baseline
+NOTEBOOK_GRID = {
+    'n_estimators': [100, 200, 300, 400, 500],
+    'max_depth': [None, 5, 10, 15],
+    'min_samples_split': [2, 5, 10],
+}
+
+_worker_data = {}
+
+
+def _init_worker(X, y):
+    _worker_data['X'] = X
+    _worker_data['y'] = y
+
+
+def expand_grid(grid):
+    names = sorted(grid)
+    return [dict(zip(names, values)) for values in itertools.product(*(grid[name] for name in names))]
+
+
+# Budgets for each round: the last round always uses max_resource
+def halving_schedule(n_configs, max_resource, eta=3, min_resource=None):
+    n_rounds = max(1, math.ceil(math.log(n_configs, eta)) + 1) if n_configs > 1 else 1
+    if min_resource is None:
+        min_resource = max(1, max_resource // eta ** (n_rounds - 1))
+    schedule = []
+    for round_index in range(n_rounds):
+        budget = min(max_resource, min_resource * eta ** round_index)
+        schedule.append(budget)
+    schedule[-1] = max_resource
+    return schedule
+
+
+def _score_fold(X, y, model_name, config, resource, budget, fold, train_index, test_index, seed, model_n_jobs):
+    params = dict(config, **{resource: budget})
+    model = make_model(model_name, seed, **params)
+    if 'n_jobs' in model.get_params():
+        model.set_params(n_jobs=model_n_jobs)
+    start = time.perf_counter()
+    model.fit(X.iloc[train_index], y.iloc[train_index])
+    fit_seconds = time.perf_counter() - start
+    record = score_predictions(y.iloc[test_index], model.predict(X.iloc[test_index]))
+    record.update({'model': model_name, 'config': config, 'budget': budget, 'fold': fold, 'fit_seconds': fit_seconds})
+    return record
+
+
+def _run_task(task):
+    return _score_fold(_worker_data['X'], _worker_data['y'], *task)
+
+
+class SuccessiveHalvingSearch:
+    def __init__(self, model_name, space=None, eta=3, min_resource=None, scoring='accuracy', cv=CV_FOLDS,
+                 seed=RANDOM_STATE, n_jobs=-1, model_n_jobs=1, cache_dir=DEFAULT_CACHE_DIR):
+        self.model_name = model_name
+        self.space = space or SEARCH_SPACES[model_name]
+        self.eta = eta
+        self.min_resource = min_resource
+        self.scoring = scoring
+        self.cv = cv
+        self.seed = seed
+        self.n_jobs = n_jobs
+        self.model_n_jobs = model_n_jobs
+        self.cache = ResultCache(cache_dir)
+
+    def fit(self, X, y):
+        configs = expand_grid(self.space['grid'])
+        resource = self.space['resource']
+        schedule = halving_schedule(len(configs), self.space['max_resource'], self.eta, self.min_resource)
+        folds = list(StratifiedKFold(self.cv, shuffle=True, random_state=self.seed).split(X, y))
+        fingerprint = data_fingerprint(X, y)
+
+        self.history_ = []
+        self.best_score_ = -np.inf
+        self.best_config_ = None
+        self.time_to_best_ = None
+        self.fits_ = 0
+        self.cached_fits_ = 0
+        start = time.perf_counter()
+
+        candidates = configs
+        for round_index, budget in enumerate(schedule):
+            scores = self._score_round(X, y, candidates, resource, budget, folds, fingerprint)
+            elapsed = time.perf_counter() - start
+            for config, score in zip(candidates, scores):
+                self.history_.append({'round': round_index, 'budget': budget, 'config': config,
+                                      'score': score, 'elapsed_seconds': elapsed})
+                # Only full-budget scores count as a finished result
+                if budget == schedule[-1] and score > self.best_score_:
+                    self.best_score_ = score
+                    self.best_config_ = config
+                    self.time_to_best_ = elapsed
+            if round_index < len(schedule) - 1:
+                keep = max(1, math.ceil(len(candidates) / self.eta))
+                order = np.argsort(scores)[::-1][:keep]
+                candidates = [candidates[i] for i in order]
+
+        self.total_seconds_ = time.perf_counter() - start
+        self.best_params_ = dict(self.best_config_, **{resource: schedule[-1]})
+        return self
+
+    # Mean CV score for each candidate, running only the folds not already cached
+    def _score_round(self, X, y, candidates, resource, budget, folds, fingerprint):
+        fold_scores = {}
+        pending = {}
+        for config_index, config in enumerate(candidates):
+            for fold, (train_index, test_index) in enumerate(folds):
+                key = ResultCache.key(fingerprint, self.model_name, config, resource, budget, fold, self.cv, self.seed)
+                cached = self.cache.get(key)
+                if cached is not None:
+                    fold_scores[(config_index, fold)] = cached[self.scoring]
+                    self.cached_fits_ += 1
+                else:
+                    pending[key] = ((config_index, fold),
+                                    (self.model_name, config, resource, budget, fold, train_index, test_index,
+                                     self.seed, self.model_n_jobs))
+
+        workers = plan_workers(self.n_jobs, self.model_n_jobs, len(pending))
+        if workers == 1:
+            for key, (slot, task) in pending.items():
+                record = _score_fold(X, y, *task)
+                self.cache.put(key, record)
+                fold_scores[slot] = record[self.scoring]
+        elif pending:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(X, y)) as pool:
+                futures = {pool.submit(_run_task, task): (key, slot) for key, (slot, task) in pending.items()}
+                for future in as_completed(futures):
+                    key, slot = futures[future]
+                    record = future.result()
+                    self.cache.put(key, record)
+                    fold_scores[slot] = record[self.scoring]
+        self.fits_ += len(pending)
+
+        return [np.mean([fold_scores[(config_index, fold)] for fold in range(len(folds))])
+                for config_index in range(len(candidates))]
+
+
+# The notebook's exhaustive GridSearchCV, timed for comparison
+def run_exhaustive_grid(X, y, grid=None, cv=CV_FOLDS, n_jobs=-1, seed=RANDOM_STATE):
+    from sklearn.model_selection import GridSearchCV
+
+    grid_search = GridSearchCV(estimator=make_model('Random Forest', seed), param_grid=grid or NOTEBOOK_GRID,
+                               cv=cv, scoring='accuracy', n_jobs=n_jobs)
+    start = time.perf_counter()
+    grid_search.fit(X, y)
+    return {
+        'best_params': grid_search.best_params_,
+        'best_score': grid_search.best_score_,
+        'seconds': time.perf_counter() - start,
+        'fits': len(grid_search.cv_results_['params']) * cv,
+    }
+
+
+# Tune every requested model and evaluate its best configuration on the held-out split
+def tune_models(X, y, models=None, eta=3, n_jobs=-1, model_n_jobs=1, cache_dir=DEFAULT_CACHE_DIR, seed=RANDOM_STATE):
+    X_train, X_test, y_train, y_test = split_data(X, y, seed)
+    rows = []
+    for model_name in available_models(models or list(SEARCH_SPACES)):
+        search = SuccessiveHalvingSearch(model_name, eta=eta, seed=seed, n_jobs=n_jobs,
+                                         model_n_jobs=model_n_jobs, cache_dir=cache_dir).fit(X_train, y_train)
+        best_model = make_model(model_name, seed, **search.best_params_).fit(X_train, y_train)
+        row = {
+            'model': model_name,
+            'best_params': search.best_params_,
+            'cv_score': search.best_score_,
+            'time_to_best_seconds': search.time_to_best_,
+            'total_seconds': search.total_seconds_,
+            'fits': search.fits_,
+            'cached_fits': search.cached_fits_,
+        }
+        row.update({f'test_{name}': value for name, value in score_predictions(y_test, best_model.predict(X_test)).items()})
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Successive-halving hyperparameter search for the food-desert models.")
+    parser.add_argument('--data', default=DEFAULT_TRACT_PATH, help="Tract table, or the notebook's clean_data.xlsx")
+    parser.add_argument('--models', nargs='+', default=list(SEARCH_SPACES))
+    parser.add_argument('--feature-set', choices=sorted(FEATURE_SETS), default='full')
+    parser.add_argument('--eta', type=int, default=3, help="Keep the best 1/eta configurations each round")
+    parser.add_argument('--n-jobs', type=int, default=-1)
+    parser.add_argument('--model-n-jobs', type=int, default=1)
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--compare-grid', action='store_true', help="Also time the notebook's exhaustive GridSearchCV")
+    args = parser.parse_args(argv)
+
+    X, y = load_model_data(args.data)
+    X = select_features(X, args.feature_set)
+    results = tune_models(X, y, args.models, args.eta, args.n_jobs, args.model_n_jobs, args.cache_dir)
+    with pd.option_context('display.max_colwidth', None, 'display.width', 200):
+        print(results)
+
+    if args.compare_grid:
+        X_train, _, y_train, _ = split_data(X, y)
+        grid = run_exhaustive_grid(X_train, y_train, n_jobs=args.n_jobs)
+        print(f"\nExhaustive GridSearchCV: {grid['fits']} fits in {grid['seconds']:.1f}s, "
+              f"best CV accuracy {grid['best_score']:.3f} with {grid['best_params']}")
+        halving = results[results['model'] == 'Random Forest']
+        if not halving.empty:
+            row = halving.iloc[0]
+            print(f"Successive halving (Random Forest): best CV accuracy {row['cv_score']:.3f} "
+                  f"reached after {row['time_to_best_seconds']:.1f}s ({row['fits']} new fits)")
+
+
+if __name__ == "__main__":
+    main()
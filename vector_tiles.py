@@ -0,0 +1,401 @@
+"""Local Mapbox Vector Tile service for the tract layers.
+
+Inlining every tract into the folium HTML stops scaling once the geography
+grows.  This module serves the LILA, supermarket and fast-food layers as
+Mapbox Vector Tiles (MVT) keyed by ``z/x/y``, so a map only loads the tiles
+in view, at the detail its zoom needs.  Everything runs in-process: there
+is no external tile provider and no extra dependency.
+
+- Geometry comes from ``geometry_tiers``, so tiles use the same watertight,
+  per-zoom simplified shapes as the TopoJSON maps.
+- Each tile is projected to web mercator, clipped to the tile plus a small
+  buffer, snapped to the ``EXTENT`` grid and encoded as MVT (protobuf)
+  with the small encoder below.
+- Encoded tiles are written to an on-disk cache
+  (``<cache>/<layer>/<version>/z/x/y.pbf``).  The version is the source
+  file's content hash (``data_versioning``), so edited data never serves
+  stale tiles.
+- ``start_server`` runs a threaded HTTP server on a daemon thread.  Tiles
+  are served at ``/<layer>/<z>/<x>/<y>.pbf``.
+- The browser, not the app, fetches the tiles.  By default the URL
+  templates point at the server's own address, which only resolves in a
+  browser on the same machine, over plain http.  Behind a deployment, pass
+  ``public_url``: the base URL (e.g. an https reverse-proxy path) at which
+  browsers reach the server.
+
+Example:
+    python vector_tiles.py --pregenerate --zooms 10 11 12 13 14
+    python vector_tiles.py --port 8765
+"""
+import argparse
+import json
+import math
+import os
+import re
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import shapely
+
+import data_versioning
+import geometry_tiers
+
+# Tile coordinate grid (the MVT default) and the margin kept around each tile so strokes don't show seams
+EXTENT = 4096
+BUFFER = 64
+MAX_ZOOM = 16
+DEFAULT_CACHE_DIR = os.path.join('.cache', 'tiles')
+DEFAULT_LAYERS = {
+    'lila': "LILAZones_geo.csv",
+    'supermarkets': "supermarkets.csv",
+    'fast_food': "Fast Food Restaurants.csv",
+}
+# Properties the LILA tiles carry besides the tract key
+LILA_COLUMNS = ['NTA Name', 'Food Index', ' Median Family Income ',
+                'Education below high school diploma (Poverty Rate)', 'SNAP Benefits %']
+TILE_PATH = re.compile(r'^/(?P<layer>[\w-]+)/(?P<z>\d+)/(?P<x>\d+)/(?P<y>\d+)\.pbf$')
+
+_MOVE_TO, _LINE_TO, _CLOSE_PATH = 1, 2, 7
+_POLYGON = 3
+
+
+# Tract key plus the columns the maps color, filter and show tooltips by
+def tile_columns(frame):
+    key = 'TRACTCE' if 'TRACTCE' in frame.columns else 'Census Tract Area'
+    coverage = [column for column in frame.columns
+                if column.lower().endswith('coverage ratio') or column.endswith('_rank')]
+    return [key] + (coverage or [column for column in LILA_COLUMNS if column in frame.columns])
+
+
+# Web mercator position of lon/lat in tile units at zoom z (x right, y down)
+def mercator_tile(lon, lat, zoom):
+    n = 2 ** zoom
+    lat = np.radians(np.clip(lat, -85.0511, 85.0511))
+    return (np.asarray(lon) + 180) / 360 * n, (1 - np.log(np.tan(lat) + 1 / np.cos(lat)) / math.pi) / 2 * n
+
+
+# (west, south, east, north) of a tile in degrees
+def tile_bounds(zoom, x, y):
+    n = 2 ** zoom
+
+    def latitude(tile_y):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * tile_y / n))))
+    return (x / n * 360 - 180, latitude(y + 1), (x + 1) / n * 360 - 180, latitude(y))
+
+
+# Tiles at zoom z covering a (west, south, east, north) box
+def tiles_covering(bounds, zoom):
+    west, south, east, north = bounds
+    (x0, x1), (y0, y1) = mercator_tile(np.array([west, east]), np.array([north, south]), zoom)
+    n = 2 ** zoom
+    return [(zoom, x, y)
+            for x in range(max(int(x0), 0), min(int(x1), n - 1) + 1)
+            for y in range(max(int(y0), 0), min(int(y1), n - 1) + 1)]
+
+
+def _varint(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _zigzag(value):
+    return (value << 1) ^ (value >> 63)
+
+
+def _key(field, wire_type):
+    return _varint((field << 3) | wire_type)
+
+
+def _length_delimited(field, payload):
+    return _key(field, 2) + _varint(len(payload)) + payload
+
+
+def _packed(field, values):
+    return _length_delimited(field, b''.join(_varint(value) for value in values))
+
+
+def _encode_value(value):
+    if isinstance(value, (bool, np.bool_)):
+        return _key(7, 0) + _varint(int(value))
+    if isinstance(value, (int, np.integer)):
+        return _key(6, 0) + _varint(_zigzag(int(value)))
+    if isinstance(value, (float, np.floating)):
+        return _key(3, 1) + np.float64(value).astype('<f8').tobytes()
+    return _length_delimited(1, str(value).encode())
+
+
+# Signed area by the surveyor's formula; positive means an exterior ring in MVT's y-down grid
+def _ring_area(points):
+    x, y = points[:, 0], points[:, 1]
+    return (np.dot(x, np.roll(y, -1)) - np.dot(np.roll(x, -1), y)) / 2
+
+
+# Command stream for the polygon rings, cursor-relative as the MVT spec requires
+def _polygon_commands(geometry):
+    commands, cursor = [], np.zeros(2, dtype=np.int64)
+    for polygon in shapely.get_parts(geometry):
+        rings = [polygon.exterior] + list(polygon.interiors)
+        for ring_number, ring in enumerate(rings):
+            points = np.asarray(ring.coords, dtype=np.int64)[:-1]
+            if len(points) < 3:
+                continue
+            area = _ring_area(points)
+            if area == 0:
+                continue
+            if (area > 0) != (ring_number == 0):
+                points = points[::-1]
+            deltas = np.diff(np.vstack([cursor, points]), axis=0)
+            commands += [(1 << 3) | _MOVE_TO, _zigzag(int(deltas[0, 0])), _zigzag(int(deltas[0, 1])),
+                         ((len(points) - 1) << 3) | _LINE_TO]
+            commands += [_zigzag(int(delta)) for delta in deltas[1:].ravel()]
+            commands.append((1 << 3) | _CLOSE_PATH)
+            cursor = points[-1]
+    return commands
+
+
+# One MVT layer: features with a geometry command stream and key/value-indexed tags
+def encode_layer(name, features, extent=EXTENT):
+    keys, values, encoded = {}, {}, []
+    for feature_id, commands, properties in features:
+        tags = []
+        for column, value in properties.items():
+            if value is None or (isinstance(value, float) and math.isnan(value)):
+                continue
+            value_key = (type(value).__name__, value)
+            tags += [keys.setdefault(column, len(keys)), values.setdefault(value_key, len(values))]
+        feature = _key(1, 0) + _varint(feature_id) + _packed(2, tags) + _key(3, 0) + _varint(_POLYGON) + _packed(4, commands)
+        encoded.append(_length_delimited(2, feature))
+    layer = (_key(15, 0) + _varint(2) + _length_delimited(1, name.encode()) + b''.join(encoded)
+             + b''.join(_length_delimited(3, key.encode()) for key in keys)
+             + b''.join(_length_delimited(4, _encode_value(value)) for _, value in values)
+             + _key(5, 0) + _varint(extent))
+    return _length_delimited(3, layer)
+
+
+class TileLayer:
+    def __init__(self, name, gdf, columns=None, version='0'):
+        self.name = name
+        self.gdf = gdf
+        self.columns = columns or tile_columns(gdf)
+        self.version = version
+        self.tiers = geometry_tiers.tiers_for(gdf)
+        self.bounds = tuple(gdf.total_bounds)
+        self._properties = geometry_tiers.feature_properties(gdf, self.columns)
+
+    # Encoded MVT bytes for one tile; empty bytes when no tract touches it
+    def render(self, zoom, x, y):
+        west, south, east, north = tile_bounds(zoom, x, y)
+        margin_x, margin_y = (east - west) * BUFFER / EXTENT, (north - south) * BUFFER / EXTENT
+        query = shapely.box(west - margin_x, south - margin_y, east + margin_x, north + margin_y)
+        positions = np.sort(self.gdf.sindex.query(query, predicate='intersects'))
+        if not len(positions):
+            return b''
+
+        def to_tile(coords):
+            tile_x, tile_y = mercator_tile(coords[:, 0], coords[:, 1], zoom)
+            return np.column_stack([(tile_x - x) * EXTENT, (tile_y - y) * EXTENT])
+
+        geometries = shapely.transform(self.tiers.tier_geometries(zoom)[positions], to_tile)
+        geometries = shapely.clip_by_rect(geometries, -BUFFER, -BUFFER, EXTENT + BUFFER, EXTENT + BUFFER)
+        geometries = shapely.set_precision(geometries, 1.0)
+        features = []
+        for position, geometry in zip(positions, geometries):
+            commands = _polygon_commands(geometry) if not geometry.is_empty else []
+            if commands:
+                features.append((int(position) + 1, commands, self._properties[position]))
+        return encode_layer(self.name, features) if features else b''
+
+
+# Encoded tiles on disk, one file per layer version and z/x/y, written atomically
+class TileCache:
+    def __init__(self, root=DEFAULT_CACHE_DIR):
+        self.root = root
+
+    def path(self, layer, zoom, x, y):
+        return os.path.join(self.root, layer.name, layer.version, str(zoom), str(x), f"{y}.pbf")
+
+    def get(self, layer, zoom, x, y):
+        try:
+            with open(self.path(layer, zoom, x, y), 'rb') as handle:
+                return handle.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, layer, zoom, x, y, data):
+        path = self.path(layer, zoom, x, y)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        handle, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(handle, 'wb') as out:
+            out.write(data)
+        os.replace(temporary, path)
+
+
+# Tile bytes from the cache, rendering and storing them on a miss
+def get_tile(layer, zoom, x, y, cache=None):
+    data = cache.get(layer, zoom, x, y) if cache is not None else None
+    if data is None:
+        data = layer.render(zoom, x, y)
+        if cache is not None:
+            cache.put(layer, zoom, x, y, data)
+    return data
+
+
+# Render every tile covering the layer at the given zooms into the cache; returns the tile count
+def pregenerate(layer, zooms, cache):
+    count = 0
+    for zoom in zooms:
+        for _, x, y in tiles_covering(layer.bounds, zoom):
+            get_tile(layer, zoom, x, y, cache)
+            count += 1
+    return count
+
+
+class TileRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        match = TILE_PATH.match(self.path.split('?', 1)[0])
+        layer = self.server.layers.get(match.group('layer')) if match else None
+        if layer is None:
+            self.send_error(404)
+            return
+        zoom, x, y = (int(match.group(part)) for part in ('z', 'x', 'y'))
+        if zoom > 24 or x >= 2 ** zoom or y >= 2 ** zoom:
+            self.send_error(400)
+            return
+        data = get_tile(layer, zoom, x, y, self.server.cache)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/vnd.mapbox-vector-tile')
+        self.send_header('Content-Length', str(len(data)))
+        # The folium map lives in a Streamlit iframe on another port
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Cache-Control', 'public, max-age=86400')
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TileServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, cache=None, public_url=None):
+        super().__init__(address, TileRequestHandler)
+        self.layers = {}
+        self.cache = cache
+        self.public_url = public_url
+        self._lock = threading.Lock()
+
+    def add_layer(self, layer):
+        with self._lock:
+            self.layers[layer.name] = layer
+        return layer
+
+    # Base URL browsers fetch tiles from: `public_url`, else the bound address (a wildcard bind is reached as localhost)
+    def base_url(self):
+        if self.public_url:
+            return self.public_url.rstrip('/')
+        host, port = self.server_address[:2]
+        if host in ('', '0.0.0.0', '::'):
+            host = 'localhost'
+        return f"http://{host}:{port}"
+
+    # Leaflet URL template for a layer; the version query keeps browsers from reusing tiles of older data
+    def tile_url(self, name):
+        return f"{self.base_url()}/{name}/{{z}}/{{x}}/{{y}}.pbf?v={self.layers[name].version}"
+
+
+# Start a tile server on a daemon thread (port 0 picks a free port)
+def start_server(host='127.0.0.1', port=0, cache_dir=DEFAULT_CACHE_DIR, public_url=None):
+    server = TileServer((host, port), TileCache(cache_dir) if cache_dir else None, public_url)
+    threading.Thread(target=server.serve_forever, name='vector-tiles', daemon=True).start()
+    return server
+
+
+# JS style function for a tile layer: optional step-colormap fill and filters ({column: allowed values}); hidden features get []
+def style_js(style, fill_column=None, colormap=None, filters=None):
+    parts = ["function(properties) {",
+             f"var filters = {json.dumps(filters or {})};",
+             "for (var column in filters) { if (filters[column].indexOf(properties[column]) < 0) { return []; } }",
+             f"var style = {json.dumps(style)};"]
+    if colormap is not None:
+        edges = [float(edge) for edge in colormap.index]
+        colors = [colormap.rgb_hex_str((low + high) / 2) for low, high in zip(edges, edges[1:])]
+        parts += [f"var edges = {json.dumps(edges)}, colors = {json.dumps(colors)}, value = properties[{json.dumps(fill_column)}];",
+                  "var bin = 0; while (bin < colors.length - 1 && value >= edges[bin + 1]) { bin++; }",
+                  "style.fillColor = colors[bin];"]
+    parts += ["return style;", "}"]
+    return ' '.join(parts)
+
+
+# folium layer drawing one server layer, with hover tooltips listing `fields` under `aliases`
+def folium_layer(url, layer_name, style, fields, aliases, name=None):
+    from branca.element import MacroElement
+    from folium.plugins import VectorGridProtobuf
+    from folium.template import Template
+
+    options = (f'{{"vectorTileLayerStyles": {{{json.dumps(layer_name)}: {style}}}, '
+               f'"interactive": true, "maxNativeZoom": {MAX_ZOOM}}}')
+    layer = VectorGridProtobuf(url, name or layer_name, options)
+    tooltip = MacroElement()
+    tooltip._template = Template("""
+        {% macro script(this, kwargs) %}
+        {{ this._parent.get_name() }}.bindTooltip(function(feature) {
+            var rows = {{ this.rows }};
+            return rows.map(function(row) {
+                return '<b>' + row[1] + '</b> ' + feature.properties[row[0]];
+            }).join('<br>');
+        }, {sticky: true});
+        {% endmacro %}
+    """)
+    tooltip.rows = json.dumps(list(zip(fields, aliases)))
+    layer.add_child(tooltip)
+    return layer
+
+
+# TileLayer for a tract CSV, read the same way the app reads it
+def layer_from_csv(name, path):
+    import geopandas as gpd
+    import pandas as pd
+    from shapely import wkt
+
+    data = pd.read_csv(path)
+    gdf = gpd.GeoDataFrame(data, geometry=data['geometry'].map(wkt.loads), crs=4326)
+    return TileLayer(name, gdf, version=data_versioning.version(path))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve (or pre-generate) vector tiles for the tract layers.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--public-url', help="base URL browsers reach the server at, e.g. https://example.org/tiles")
+    parser.add_argument('--layers', nargs='+', choices=list(DEFAULT_LAYERS), default=list(DEFAULT_LAYERS))
+    parser.add_argument('--pregenerate', action='store_true', help="write the tiles for --zooms to the cache and exit")
+    parser.add_argument('--zooms', nargs='+', type=int, default=[10, 11, 12, 13, 14])
+    args = parser.parse_args(argv)
+
+    layers = [layer_from_csv(name, DEFAULT_LAYERS[name]) for name in args.layers]
+    if args.pregenerate:
+        cache = TileCache(args.cache_dir)
+        for layer in layers:
+            print(f"{layer.name}: {pregenerate(layer, args.zooms, cache)} tiles")
+        return
+
+    server = TileServer((args.host, args.port), TileCache(args.cache_dir), args.public_url)
+    for layer in layers:
+        server.add_layer(layer)
+        print(server.tile_url(layer.name))
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
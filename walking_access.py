@@ -0,0 +1,461 @@
+"""Network walking distances from supermarkets to tract populations.
+
+The atlas's low-access flags measure straight-line distance ("more than
+1 mile / 1/2 mile from a supermarket").  In Brooklyn, rail yards, the
+Gowanus Canal, the expressways and dead-end blocks make the walk much
+longer than the straight line.  This module measures the walk on a local
+street-network extract instead:
+
+- ``load_graph`` reads an OSMnx GraphML file, an OSM XML extract (.osm) or
+  an OSM PBF extract (.pbf, needs ``osmium``) into a ``StreetGraph``.  The
+  graph is a compact CSR adjacency: ``indptr``/``indices`` int32 arrays
+  and float32 edge lengths in meters, every street walkable both ways.
+  Parsing an extract is slow, so the CSR arrays are saved as ``.npz`` once
+  per file version and read back from there.
+- ``node_distances`` runs one multi-source Dijkstra from every store at
+  once.  A virtual source node links to the street node nearest each
+  store, weighted by the store's distance to it, and scipy's
+  ``csgraph.dijkstra`` runs from that node alone.  The result is cached on
+  disk per (store set, graph version).
+- ``tract_access`` scatters ``points_per_tract`` population points over
+  each tract on a regular grid, each carrying an equal share of the
+  tract's population.  It snaps them to the graph and reports the
+  population-weighted mean walk, plus the shares of residents beyond a
+  half mile and a mile of walking.
+
+``--benchmark`` times each stage on a synthetic street grid the size of
+Brooklyn's walking network, so no extract is needed to measure it.
+
+Example:
+    python walking_access.py --graph brooklyn_walk.graphml --stores supermarket_locations.csv
+    python walking_access.py --benchmark --stores-count 300
+"""
+import argparse
+import hashlib
+import json
+import os
+import tempfile
+import time
+import xml.etree.ElementTree as ElementTree
+
+import numpy as np
+import pandas as pd
+
+import data_versioning
+
+EARTH_RADIUS_METERS = 6_371_008.8
+HALF_MILE_METERS = 804.672
+ONE_MILE_METERS = 1609.344
+# Average walking speed, for reporting distances as minutes
+WALKING_METERS_PER_MINUTE = 80.0
+DEFAULT_POINTS_PER_TRACT = 16
+DEFAULT_CACHE_DIR = os.path.join('.cache', 'walking_access')
+# OSM highway values pedestrians cannot use
+NOT_WALKABLE = {'motorway', 'motorway_link', 'trunk', 'trunk_link', 'bus_guideway', 'busway', 'raceway',
+                'construction', 'proposed', 'abandoned', 'platform'}
+# Edges to the virtual source must have a positive weight; csgraph would drop a zero
+_MIN_OFFSET = 1e-3
+
+
+# Planar meters around a reference latitude; accurate enough across a city
+def _project(lon, lat, reference_lat):
+    lon, lat = np.radians(np.asarray(lon, dtype=float)), np.radians(np.asarray(lat, dtype=float))
+    return np.column_stack([EARTH_RADIUS_METERS * lon * np.cos(np.radians(reference_lat)), EARTH_RADIUS_METERS * lat])
+
+
+def _segment_meters(lon, lat, u, v):
+    points = _project(lon, lat, float(np.mean(lat)) if len(lat) else 0.0)
+    return np.hypot(*(points[u] - points[v]).T)
+
+
+# Write a file through `write(f)` into a temporary file and rename it into place, so readers never see half of it
+def _write_atomic(path, write):
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# Undirected street graph as CSR arrays; node i sits at (lon[i], lat[i])
+class StreetGraph:
+    def __init__(self, indptr, indices, lengths, lon, lat, version=None):
+        self.indptr = indptr
+        self.indices = indices
+        self.lengths = lengths
+        self.lon = lon
+        self.lat = lat
+        # Version of the extract it was read from; part of the node distance cache key
+        self.version = version
+        self._tree = None
+
+    @property
+    def node_count(self):
+        return len(self.lon)
+
+    @property
+    def edge_count(self):
+        return len(self.indices) // 2
+
+    @property
+    def nbytes(self):
+        return sum(array.nbytes for array in [self.indptr, self.indices, self.lengths, self.lon, self.lat])
+
+    # Nearest street node of each point and the straight-line meters to it
+    def snap(self, lon, lat):
+        from scipy.spatial import cKDTree
+
+        reference_lat = float(self.lat.mean())
+        if self._tree is None:
+            self._tree = cKDTree(_project(self.lon, self.lat, reference_lat))
+        meters, nodes = self._tree.query(_project(lon, lat, reference_lat))
+        return nodes, meters
+
+    def save(self, path):
+        _write_atomic(path, lambda f: np.savez(f, indptr=self.indptr, indices=self.indices, lengths=self.lengths,
+                                               lon=self.lon, lat=self.lat, version=np.array(self.version or '')))
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as arrays:
+            return cls(arrays['indptr'], arrays['indices'], arrays['lengths'], arrays['lon'], arrays['lat'],
+                       str(arrays['version']) or None)
+
+
+# StreetGraph from node coordinates and (u, v, meters) street segments; parallel segments keep the shortest
+def from_edges(lon, lat, u, v, lengths, version=None):
+    from scipy import sparse
+
+    u, v, lengths = np.asarray(u), np.asarray(v), np.asarray(lengths, dtype=float)
+    keep = u != v
+    u, v, lengths = u[keep], v[keep], np.maximum(lengths[keep], _MIN_OFFSET)
+    rows, columns = np.concatenate([u, v]), np.concatenate([v, u])
+    lengths = np.concatenate([lengths, lengths])
+    # Shortest first, then the first of each (row, column) pair
+    order = np.lexsort((lengths, columns, rows))
+    rows, columns, lengths = rows[order], columns[order], lengths[order]
+    first = np.ones(len(rows), dtype=bool)
+    first[1:] = (rows[1:] != rows[:-1]) | (columns[1:] != columns[:-1])
+    matrix = sparse.csr_matrix((lengths[first], (rows[first], columns[first])), shape=(len(lon), len(lon)))
+    return StreetGraph(matrix.indptr.astype(np.int32), matrix.indices.astype(np.int32), matrix.data.astype(np.float32),
+                       np.asarray(lon, dtype=np.float64), np.asarray(lat, dtype=np.float64), version)
+
+
+# Renumber the nodes segments use as 0..n-1 and build the graph
+def _compact(node_ids, lon, lat, u, v, lengths=None, version=None):
+    used, inverse = np.unique(np.concatenate([u, v]), return_inverse=True)
+    positions = np.searchsorted(node_ids, used) if node_ids is not None else used
+    lon, lat = np.asarray(lon)[positions], np.asarray(lat)[positions]
+    u, v = inverse[:len(u)], inverse[len(u):]
+    if lengths is None:
+        lengths = _segment_meters(lon, lat, u, v)
+    return from_edges(lon, lat, u, v, lengths, version)
+
+
+def _local(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+# OSMnx GraphML: node x/y attributes and edge lengths in meters (computed where an edge has none)
+def read_graphml(path, version=None):
+    names, ids, lon, lat, u, v, lengths = {}, {}, [], [], [], [], []
+    for _, element in ElementTree.iterparse(path, events=('end',)):
+        tag = _local(element.tag)
+        if tag == 'key':
+            names[element.get('id')] = element.get('attr.name')
+        elif tag == 'node':
+            data = {names.get(item.get('key')): item.text for item in element if _local(item.tag) == 'data'}
+            ids[element.get('id')] = len(lon)
+            lon.append(float(data['x']))
+            lat.append(float(data['y']))
+            element.clear()
+        elif tag == 'edge':
+            data = {names.get(item.get('key')): item.text for item in element if _local(item.tag) == 'data'}
+            u.append(ids[element.get('source')])
+            v.append(ids[element.get('target')])
+            lengths.append(float(data['length']) if data.get('length') else np.nan)
+            element.clear()
+    u, v, lengths = np.array(u, dtype=np.int64), np.array(v, dtype=np.int64), np.array(lengths)
+    missing = np.isnan(lengths)
+    lengths[missing] = _segment_meters(np.array(lon), np.array(lat), u[missing], v[missing])
+    return _compact(None, lon, lat, u, v, lengths, version)
+
+
+def _walkable(tags):
+    highway = tags.get('highway')
+    return highway is not None and highway not in NOT_WALKABLE and tags.get('foot') != 'no' and tags.get('access') != 'private'
+
+
+# OSM XML extract: every walkable way, split into segments between consecutive nodes
+def read_osm_xml(path, version=None):
+    node_ids, lon, lat, u, v = [], [], [], [], []
+    for _, element in ElementTree.iterparse(path, events=('end',)):
+        tag = element.tag
+        if tag == 'node':
+            node_ids.append(int(element.get('id')))
+            lon.append(float(element.get('lon')))
+            lat.append(float(element.get('lat')))
+            element.clear()
+        elif tag == 'way':
+            tags = {item.get('k'): item.get('v') for item in element if item.tag == 'tag'}
+            if _walkable(tags):
+                refs = [int(item.get('ref')) for item in element if item.tag == 'nd']
+                u.extend(refs[:-1])
+                v.extend(refs[1:])
+            element.clear()
+        elif tag == 'relation':
+            element.clear()
+    return _osm_graph(node_ids, lon, lat, u, v, version)
+
+
+# OSM PBF extract, read with pyosmium
+def read_osm_pbf(path, version=None):
+    import osmium
+
+    u, v, nodes = [], [], {}
+
+    class WalkableWays(osmium.SimpleHandler):
+        def way(self, way):
+            if not _walkable(dict(way.tags)):
+                return
+            refs = []
+            for node in way.nodes:
+                if node.location.valid():
+                    nodes[node.ref] = (node.location.lon, node.location.lat)
+                    refs.append(node.ref)
+            u.extend(refs[:-1])
+            v.extend(refs[1:])
+
+    WalkableWays().apply_file(path, locations=True)
+    node_ids = sorted(nodes)
+    return _osm_graph(node_ids, [nodes[node][0] for node in node_ids], [nodes[node][1] for node in node_ids], u, v, version)
+
+
+def _osm_graph(node_ids, lon, lat, u, v, version):
+    node_ids = np.asarray(node_ids, dtype=np.int64)
+    order = np.argsort(node_ids, kind='stable')
+    known = node_ids[order]
+    u, v = np.asarray(u, dtype=np.int64), np.asarray(v, dtype=np.int64)
+    # Ways can reference nodes clipped out of the extract
+    inside = np.isin(u, known) & np.isin(v, known)
+    return _compact(known, np.asarray(lon)[order], np.asarray(lat)[order], u[inside], v[inside], version=version)
+
+
+READERS = {'.graphml': read_graphml, '.osm': read_osm_xml, '.pbf': read_osm_pbf}
+
+
+# Street graph of an extract, parsed once per file version and then read from its cached CSR arrays
+def load_graph(path, cache_dir=DEFAULT_CACHE_DIR):
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in READERS:
+        raise ValueError(f"Unsupported street network file {path!r}; expected one of {sorted(READERS)}")
+    version = data_versioning.version(path)
+    cached = os.path.join(cache_dir, f"graph-{version}.npz")
+    if os.path.exists(cached):
+        return StreetGraph.load(cached)
+    graph = READERS[extension](path, version)
+    graph.save(cached)
+    return graph
+
+
+# Store coordinates from a CSV with longitude/latitude columns, or from a point layer geopandas can read
+def read_stores(path):
+    if path.endswith('.csv'):
+        frame = pd.read_csv(path)
+        columns = {column.lower(): column for column in frame.columns}
+        lon = next((columns[name] for name in ['longitude', 'lon', 'lng', 'x'] if name in columns), None)
+        lat = next((columns[name] for name in ['latitude', 'lat', 'y'] if name in columns), None)
+        if lon is None or lat is None:
+            raise ValueError(f"{path} needs longitude and latitude columns")
+        return frame[lon].to_numpy(dtype=float), frame[lat].to_numpy(dtype=float)
+    import geopandas as gpd
+
+    points = gpd.read_parquet(path) if path.endswith('.parquet') else gpd.read_file(path)
+    points = points.to_crs(epsg=4326).geometry.representative_point()
+    return points.x.to_numpy(), points.y.to_numpy()
+
+
+# Order-independent identity of a store set (coordinates to ~1 cm)
+def store_fingerprint(lon, lat):
+    points = np.round(np.column_stack([lon, lat]), 7)
+    points = points[np.lexsort(points.T[::-1])]
+    return hashlib.blake2b(points.tobytes(), digest_size=16).hexdigest()
+
+
+# Walking meters from the nearest store to every node: one Dijkstra from a virtual node linked to all stores
+def multi_source_distances(graph, source_nodes, source_meters):
+    from scipy import sparse
+    from scipy.sparse.csgraph import dijkstra
+
+    n = graph.node_count
+    # A node near several stores keeps its shortest link
+    order = np.lexsort((source_meters, source_nodes))
+    source_nodes, source_meters = np.asarray(source_nodes)[order], np.asarray(source_meters)[order]
+    first = np.ones(len(source_nodes), dtype=bool)
+    first[1:] = source_nodes[1:] != source_nodes[:-1]
+    sources, offsets = source_nodes[first], np.maximum(source_meters[first], _MIN_OFFSET)
+    indptr = np.append(graph.indptr, graph.indptr[-1] + len(sources)).astype(np.int32)
+    indices = np.concatenate([graph.indices, sources.astype(np.int32)])
+    lengths = np.concatenate([graph.lengths, offsets.astype(np.float32)])
+    augmented = sparse.csr_matrix((lengths, indices, indptr), shape=(n + 1, n + 1))
+    return dijkstra(augmented, directed=True, indices=n)[:n]
+
+
+# Walking meters from the nearest store to every node of the graph, cached on disk per (store set, graph version)
+def node_distances(graph, store_lon, store_lat, cache_dir=DEFAULT_CACHE_DIR):
+    path = None
+    if graph.version and cache_dir:
+        path = os.path.join(cache_dir, f"distances-{graph.version}-{store_fingerprint(store_lon, store_lat)}.npy")
+        if os.path.exists(path):
+            return np.load(path)
+    nodes, meters = graph.snap(store_lon, store_lat)
+    distances = multi_source_distances(graph, nodes, meters).astype(np.float32)
+    if path is not None:
+        _write_atomic(path, lambda f: np.save(f, distances))
+    return distances
+
+
+# Up to `per_tract` points on a regular grid inside each tract (its representative point when none land inside).
+# Returns lon, lat and the row position of each point's tract
+def population_points(gdf, per_tract=DEFAULT_POINTS_PER_TRACT):
+    import shapely
+
+    geometries = gdf.geometry.values
+    bounds = shapely.bounds(geometries)
+    fill = np.divide(shapely.area(geometries), (bounds[:, 2] - bounds[:, 0]) * (bounds[:, 3] - bounds[:, 1]),
+                     out=np.ones(len(geometries)), where=shapely.area(geometries) > 0)
+    lon, lat, tracts = [], [], []
+    for position, geometry in enumerate(geometries):
+        # Enough grid cells over the bounding box for ~per_tract of them to fall inside the polygon
+        side = max(1, int(np.ceil(np.sqrt(per_tract / max(fill[position], 0.05)))))
+        x0, y0, x1, y1 = bounds[position]
+        xs, ys = np.meshgrid(x0 + (np.arange(side) + 0.5) * (x1 - x0) / side, y0 + (np.arange(side) + 0.5) * (y1 - y0) / side)
+        xs, ys = xs.ravel(), ys.ravel()
+        inside = shapely.contains_xy(geometry, xs, ys)
+        if not inside.any():
+            point = shapely.point_on_surface(geometry)
+            xs, ys, inside = np.array([point.x]), np.array([point.y]), np.array([True])
+        chosen = np.flatnonzero(inside)
+        chosen = chosen[np.linspace(0, len(chosen) - 1, min(per_tract, len(chosen))).astype(int)]
+        lon.append(xs[chosen])
+        lat.append(ys[chosen])
+        tracts.append(np.full(len(chosen), position))
+    return np.concatenate(lon), np.concatenate(lat), np.concatenate(tracts)
+
+
+# Walking access of each tract, indexed like the frame: the population-weighted mean walk to the nearest store
+# (meters and minutes) and the shares of residents beyond a half mile and a mile of walking
+def tract_access(graph, store_lon, store_lat, gdf, population_column='Pop2010', per_tract=DEFAULT_POINTS_PER_TRACT,
+                 cache_dir=DEFAULT_CACHE_DIR):
+    distances = node_distances(graph, store_lon, store_lat, cache_dir)
+    lon, lat, tracts = population_points(gdf, per_tract)
+    nodes, offsets = graph.snap(lon, lat)
+    walk = distances[nodes] + offsets
+    # Each point carries an equal share of its tract's population (equal shares where the population is unknown)
+    points = np.bincount(tracts, minlength=len(gdf))
+    population = (pd.to_numeric(gdf[population_column], errors='coerce').fillna(0).to_numpy(dtype=float)
+                  if population_column in gdf.columns else np.zeros(len(gdf)))
+    population = np.where(population > 0, population, 1.0)
+    weights = (population / points)[tracts]
+    total = np.bincount(tracts, weights, len(gdf))
+    reachable = np.isfinite(walk)
+    mean = np.bincount(tracts[reachable], (weights * walk)[reachable], len(gdf)) / np.bincount(tracts[reachable], weights[reachable], len(gdf))
+    return pd.DataFrame({
+        'walk_meters': mean,
+        'walk_minutes': mean / WALKING_METERS_PER_MINUTE,
+        'share_beyond_half_mile': np.bincount(tracts, weights * (walk > HALF_MILE_METERS), len(gdf)) / total,
+        'share_beyond_1_mile': np.bincount(tracts, weights * (walk > ONE_MILE_METERS), len(gdf)) / total,
+    }, index=gdf.index)
+
+
+# Jittered street grid over a bounding box with `spacing` meters between intersections; `missing` of the blocks'
+# edges are removed as barriers. Brooklyn's walking network has ~50k intersections, about an 80 m grid over its tracts
+def synthetic_grid(bounds, spacing=80.0, missing=0.1, seed=0):
+    rng = np.random.default_rng(seed)
+    x0, y0, x1, y1 = bounds
+    meters_per_degree = EARTH_RADIUS_METERS * np.pi / 180
+    columns = int((x1 - x0) * meters_per_degree * np.cos(np.radians((y0 + y1) / 2)) / spacing) + 1
+    rows = int((y1 - y0) * meters_per_degree / spacing) + 1
+    lon, lat = np.meshgrid(np.linspace(x0, x1, columns), np.linspace(y0, y1, rows))
+    jitter = 0.2 * spacing / meters_per_degree
+    lon, lat = lon.ravel() + rng.uniform(-jitter, jitter, lon.size), lat.ravel() + rng.uniform(-jitter, jitter, lat.size)
+    ids = np.arange(rows * columns).reshape(rows, columns)
+    u = np.concatenate([ids[:, :-1].ravel(), ids[:-1].ravel()])
+    v = np.concatenate([ids[:, 1:].ravel(), ids[1:].ravel()])
+    keep = rng.random(len(u)) >= missing
+    return from_edges(lon, lat, u[keep], v[keep], _segment_meters(lon, lat, u[keep], v[keep]), version=f"synthetic-{seed}")
+
+
+# Seconds for each stage of tract_access on the synthetic grid covering `gdf`, with `stores` random store locations
+def benchmark(gdf, stores=300, spacing=80.0, per_tract=DEFAULT_POINTS_PER_TRACT, repeats=5, seed=0):
+    import shapely
+
+    results = {}
+    started = time.perf_counter()
+    graph = synthetic_grid(gdf.total_bounds, spacing, seed=seed)
+    results['build_graph'] = time.perf_counter() - started
+    results['nodes'], results['edges'], results['graph_bytes'] = graph.node_count, graph.edge_count, graph.nbytes
+
+    rng = np.random.default_rng(seed)
+    points = shapely.point_on_surface(gdf.geometry.values[rng.integers(0, len(gdf), stores)])
+    store_lon, store_lat = shapely.get_x(points), shapely.get_y(points)
+    started = time.perf_counter()
+    nodes, meters = graph.snap(store_lon, store_lat)
+    results['snap_stores'] = time.perf_counter() - started
+    timings = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        multi_source_distances(graph, nodes, meters)
+        timings.append(time.perf_counter() - started)
+    results['dijkstra'] = float(np.median(timings))
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        started = time.perf_counter()
+        access = tract_access(graph, store_lon, store_lat, gdf, per_tract=per_tract, cache_dir=cache_dir)
+        results['tract_access_cold'] = time.perf_counter() - started
+        started = time.perf_counter()
+        tract_access(graph, store_lon, store_lat, gdf, per_tract=per_tract, cache_dir=cache_dir)
+        results['tract_access_cached'] = time.perf_counter() - started
+    results['tracts'], results['mean_walk_meters'] = len(gdf), float(access['walk_meters'].mean())
+    return results
+
+
+def main(argv=None):
+    from borough_partitions import read_tracts
+
+    parser = argparse.ArgumentParser(description="Network walking distance from supermarkets to each tract's residents.")
+    parser.add_argument('--tracts', default='supermarkets.csv', help="WKT CSV or GeoParquet tract table")
+    parser.add_argument('--graph', help="street network extract: OSMnx .graphml, OSM .osm or .pbf")
+    parser.add_argument('--stores', help="store locations: CSV with longitude/latitude columns, or a point layer")
+    parser.add_argument('--points-per-tract', type=int, default=DEFAULT_POINTS_PER_TRACT)
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR)
+    parser.add_argument('--output', help="write the per-tract table to this CSV")
+    parser.add_argument('--benchmark', action='store_true', help="time every stage on a Brooklyn-sized synthetic street grid")
+    parser.add_argument('--stores-count', type=int, default=300, help="random stores for --benchmark")
+    parser.add_argument('--spacing', type=float, default=80.0, help="grid spacing in meters for --benchmark")
+    args = parser.parse_args(argv)
+
+    gdf = read_tracts(args.tracts)
+    if args.benchmark:
+        print(json.dumps(benchmark(gdf, args.stores_count, args.spacing, args.points_per_tract), indent=2))
+        return
+    if not args.graph or not args.stores:
+        parser.error("--graph and --stores are required unless --benchmark is given")
+    graph = load_graph(args.graph, args.cache_dir)
+    store_lon, store_lat = read_stores(args.stores)
+    access = tract_access(graph, store_lon, store_lat, gdf, per_tract=args.points_per_tract, cache_dir=args.cache_dir)
+    if 'TRACTCE' in gdf.columns:
+        access.insert(0, 'TRACTCE', gdf['TRACTCE'])
+    if args.output:
+        access.to_csv(args.output, index=False)
+    print(access.describe().round(3).to_string())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Background warm-up of the app's default-state artifacts.
+
+Without a warm-up, the first visitor after a deploy pays for the heavy
+imports, WKT parsing, geometry tiers and Plotly's first-figure setup.  A
+``Warmup`` runs a list of named tasks on a daemon thread, so the server
+keeps answering while the work happens.  The tasks only fill the caches
+the app already uses (``st.cache_resource``/``st.cache_data``, the
+geometry tiers, the lazy modules), so the results are shared with every
+session.
+
+Tasks are single-flight.  ``join`` runs a task that has not started yet
+in the caller's thread, waits for one that is in flight, and returns
+immediately once it is done.  A session that arrives early therefore
+shares the warm-up's work rather than repeating it.  While a session is
+joining, the background thread holds off on starting its next task.  The
+cached loaders underneath also lock per key, so work done outside a task
+is never duplicated either.
+
+The background thread runs outside any session, so it has no Streamlit
+ScriptRunContext, and Streamlit logs a warning about that on every cached
+call.  ``quiet_thread_warnings`` drops those records when they come from
+the warm-up thread; the same warning from any other thread is still
+logged.
+
+``status`` reports readiness, per-task timings and the time to warm.
+"""
+import logging
+import threading
+import time
+
+PENDING, RUNNING, DONE, FAILED = 'pending', 'running', 'done', 'failed'
+THREAD_NAME = 'warmup'
+
+
+# Logging filter dropping the warm-up thread's records whose message contains `text`
+class _WarmupThreadFilter(logging.Filter):
+    def __init__(self, text):
+        super().__init__()
+        self.text = text
+
+    def filter(self, record):
+        return record.threadName != THREAD_NAME or self.text not in record.getMessage()
+
+
+# Silence a logger's warnings containing `text` inside the warm-up thread (installed once per logger and text)
+def quiet_thread_warnings(logger_name, text):
+    logger = logging.getLogger(logger_name)
+    if not any(isinstance(f, _WarmupThreadFilter) and f.text == text for f in logger.filters):
+        logger.addFilter(_WarmupThreadFilter(text))
+
+
+class _Task:
+    def __init__(self, name, group, func):
+        self.name = name
+        self.group = group
+        self.func = func
+        self.state = PENDING
+        self.runner = None
+        self.seconds = None
+        self.error = None
+        self.finished = threading.Event()
+
+
+class Warmup:
+    def __init__(self, tasks):
+        self._tasks = [_Task(name, group, func) for name, group, func in tasks]
+        self._lock = threading.Lock()
+        self._joiners = 0
+        self._no_joiners = threading.Condition(self._lock)
+        self._thread = None
+        self.started_at = None
+        self.finished_at = None
+
+    # Run every task on a daemon thread; returns self so it can be cached as a resource
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self.started_at = time.perf_counter()
+                self._thread = threading.Thread(target=self._run_all, name=THREAD_NAME, daemon=True)
+                self._thread.start()
+        return self
+
+    def _run_all(self):
+        for task in self._tasks:
+            # Sessions joining their page's tasks go first; the background thread would only compete with them for the GIL
+            with self._no_joiners:
+                self._no_joiners.wait_for(lambda: self._joiners == 0)
+            self._join_task(task)
+        self.finished_at = time.perf_counter()
+
+    def _join_task(self, task):
+        with self._lock:
+            claimed = task.state == PENDING
+            if claimed:
+                task.state = RUNNING
+                task.runner = threading.current_thread().name
+        if not claimed:
+            task.finished.wait()
+            return
+        start = time.perf_counter()
+        try:
+            task.func()
+            task.state = DONE
+        except Exception as error:
+            # A failed task only means that artifact stays cold; the page computes it as usual
+            task.error = f"{type(error).__name__}: {error}"
+            task.state = FAILED
+        finally:
+            task.seconds = time.perf_counter() - start
+            task.finished.set()
+
+    # Join the tasks of a group (e.g. the page being opened): run pending ones here, wait for running ones
+    def join(self, group):
+        with self._lock:
+            self._joiners += 1
+        try:
+            for task in self._tasks:
+                if task.group == group:
+                    self._join_task(task)
+        finally:
+            with self._no_joiners:
+                self._joiners -= 1
+                self._no_joiners.notify_all()
+
+    @property
+    def ready(self):
+        return all(task.finished.is_set() for task in self._tasks)
+
+    def wait(self, timeout=None):
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        for task in self._tasks:
+            remaining = None if deadline is None else max(deadline - time.perf_counter(), 0)
+            if not task.finished.wait(remaining):
+                return False
+        return True
+
+    def status(self):
+        end = self.finished_at if self.finished_at is not None else time.perf_counter()
+        return {
+            'ready': self.ready,
+            'seconds': None if self.started_at is None else end - self.started_at,
+            'tasks': [{'name': task.name, 'group': task.group, 'state': task.state, 'runner': task.runner,
+                       'seconds': task.seconds, 'error': task.error} for task in self._tasks],
+        }